@@ -0,0 +1,126 @@
+"""
+Análise de equipes: fraquezas, resistências e cobertura a partir da matriz de efetividade dos tipos
+"""
+import json
+import threading
+import numpy as np
+from models import db, TipoCatalogo
+from catalog import versao_catalogo, indices_catalogo
+
+_matriz_lock = threading.Lock()
+_matriz = None
+
+class MatrizTipos:
+    """Matriz de efetividade (atacante x defensor) montada das relações de dano do catálogo de tipos.
+
+    As equipes viram arrays de índices de tipo (dois por membro); a posição
+    extra `self.vazio` representa "sem tipo" e é neutra na defesa e nula no
+    ataque, de modo que equipes menores que MAX_EQUIPE e membros de um só
+    tipo entram no mesmo cálculo vetorizado.
+    """
+
+    def __init__(self, versao, linhas):
+        self.versao = versao
+        self.nomes = [nome for nome, _ in linhas]
+        self.indice = {nome: i for i, nome in enumerate(self.nomes)}
+        n = len(self.nomes)
+        self.vazio = n
+
+        efetividade = np.ones((n, n))
+        for atacante, relacoes in linhas:
+            relacoes = json.loads(relacoes)
+            for chave, fator in (('double_damage_to', 2.0), ('half_damage_to', 0.5), ('no_damage_to', 0.0)):
+                for defensor in relacoes.get(chave, []):
+                    if defensor in self.indice:
+                        efetividade[self.indice[atacante], self.indice[defensor]] = fator
+        self.efetividade = efetividade
+        # Defesa: coluna extra de 1 (sem segundo tipo não altera o dano recebido)
+        self._defesa = np.ones((n, n + 1))
+        self._defesa[:, :n] = efetividade
+        # Ataque: linha extra de 0 (membro vazio não acerta nada)
+        self._ataque = np.zeros((n + 1, n))
+        self._ataque[:n] = efetividade
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def codificar(self, equipes, tamanho):
+        """Array (equipes, tamanho, 2) com os índices dos tipos de cada membro; tipos desconhecidos viram vazio"""
+        tipos = np.full((len(equipes), tamanho, 2), self.vazio, dtype=np.intp)
+        for e, membros in enumerate(equipes):
+            for m, tipos_membro in enumerate(membros):
+                for s, tipo in enumerate(tipos_membro[:2]):
+                    tipos[e, m, s] = self.indice.get(tipo, self.vazio)
+        return tipos
+
+    def perfis(self, tipos):
+        """Perfis de várias equipes de uma vez a partir de codificar().
+
+        Retorna arrays (equipes, tipos): quantos membros são fracos, resistentes
+        e imunes a cada tipo atacante, o melhor multiplicador que a equipe
+        consegue contra cada tipo defensor e a pontuação de cada equipe.
+        """
+        # dano[e, m, a] = efetividade de `a` contra o primeiro tipo * contra o segundo
+        dano = self._defesa[:, tipos[..., 0]] * self._defesa[:, tipos[..., 1]]
+        dano = np.moveaxis(dano, 0, -1)
+        fracos = (dano > 1).sum(axis=1)
+        resistentes = (dano < 1).sum(axis=1)
+        imunes = (dano == 0).sum(axis=1)
+        # Cobertura pelos tipos dos próprios membros (STAB): melhor ataque contra cada defensor
+        cobertura = np.maximum(self._ataque[tipos[..., 0]], self._ataque[tipos[..., 1]]).max(axis=1)
+        # Tipos cobertos com superefetivo menos tipos que acertam mais membros do que a equipe resiste
+        pontuacao = (cobertura > 1).sum(axis=1) - (fracos > resistentes).sum(axis=1)
+        return {'fracos': fracos, 'resistentes': resistentes, 'imunes': imunes,
+                'cobertura': cobertura, 'pontuacao': pontuacao}
+
+def matriz_tipos():
+    """Matriz da versão atual do catálogo, remontada quando uma nova sincronização é publicada"""
+    global _matriz
+    versao = versao_catalogo()
+    if _matriz is None or _matriz.versao != versao:
+        with _matriz_lock:
+            if _matriz is None or _matriz.versao != versao:
+                linhas = db.session.query(TipoCatalogo.Nome, TipoCatalogo.RelacoesDano) \
+                    .order_by(TipoCatalogo.IDTipo).all()
+                _matriz = MatrizTipos(versao, linhas)
+    return _matriz
+
+def tipos_do_catalogo(codigo):
+    """Tipos do pokémon (por nome ou número) segundo o catálogo, ou None se não estiver nele"""
+    indices = indices_catalogo()
+    codigo = str(codigo).strip().lower()
+    # isdigit() aceita dígitos Unicode ("²") que int() rejeita: só números ASCII viram id
+    pokemon_id = int(codigo) if codigo.isascii() and codigo.isdecimal() else indices.id_por_nome.get(codigo)
+    posicao = indices.catalogo.posicao(pokemon_id) if pokemon_id is not None else None
+    return indices.catalogo.tipos(posicao) if posicao is not None else None
+
+def _nomes(matriz, mascara):
+    return [matriz.nomes[i] for i in np.flatnonzero(mascara)]
+
+def resumir_perfil(matriz, perfis, e):
+    """Pontuação, tipos que expõem a equipe `e` e tipos que ela acerta com superefetivo"""
+    return {
+        'pontuacao': int(perfis['pontuacao'][e]),
+        'fraquezasExpostas': _nomes(matriz, perfis['fracos'][e] > perfis['resistentes'][e]),
+        'superEfetivo': _nomes(matriz, perfis['cobertura'][e] > 1),
+    }
+
+def descrever_perfil(matriz, perfis, e):
+    """Perfil completo da equipe `e` de perfis() no formato da API"""
+    fracos, resistentes, imunes = perfis['fracos'][e], perfis['resistentes'][e], perfis['imunes'][e]
+    return {
+        **resumir_perfil(matriz, perfis, e),
+        'fraquezas': sorted((
+            {'tipo': matriz.nomes[a], 'fracos': int(fracos[a]), 'resistentes': int(resistentes[a])}
+            for a in np.flatnonzero(fracos)
+        ), key=lambda f: (f['resistentes'] - f['fracos'], f['tipo'])),
+        'resistencias': [
+            {'tipo': matriz.nomes[a], 'resistentes': int(resistentes[a]), 'imunes': int(imunes[a])}
+            for a in np.flatnonzero(resistentes)
+        ],
+        'semCobertura': _nomes(matriz, perfis['cobertura'][e] < 1),
+    }
+
+def ranking(perfis, limite=None):
+    """Índices das equipes da maior para a menor pontuação (empates na ordem original)"""
+    return [int(e) for e in np.argsort(-perfis['pontuacao'], kind='stable')[:limite]]
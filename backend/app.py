@@ -6,47 +6,80 @@ from datetime import timedelta
 import os
 
 # Importar os modelos e blueprints
+from db_config import url_banco, opcoes_engine, configurar_sqlite
 from models import db
 from routes.auth import bp_auth
 from routes.pokemon import bp_pokemon
 from routes.user_pokemon import bp_user_pokemon
 from routes.users import bp_users
+from tipos import carregar_tipos
+from catalog import indices_catalogo
+from paginacao import CABECALHO_PROXIMO
+from pokeapi_cache import cache as cache_pokeapi
 
-app = Flask(__name__)
+def create_app():
+    """Cria e configura a aplicação Flask"""
+    app = Flask(__name__)
 
-# CORS CONFIGURADO
-CORS(app, 
-     origins=['http://localhost:4200', 'http://127.0.0.1:4200', 'http://localhost:5000', 'http://127.0.0.1:5000'],
-     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization'],
-     supports_credentials=True)
+    # CORS CONFIGURADO
+    CORS(app, 
+         origins=['http://localhost:4200', 'http://127.0.0.1:4200', 'http://localhost:5000', 'http://127.0.0.1:5000'],
+         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+         allow_headers=['Content-Type', 'Authorization'],
+         expose_headers=[CABECALHO_PROXIMO],
+         supports_credentials=True)
 
-# Configurações de banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///pokeapi.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Configurações de banco de dados
+    database_url = url_banco()
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url.render_as_string(hide_password=False)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(database_url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Configurações de JWT
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'fallback-key-development')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
-app.config['JWT_ALGORITHM'] = 'HS256'
-app.config['JWT_ENCODE_ISSUER'] = None
-app.config['JWT_DECODE_ISSUER'] = None
+    # Configurações de JWT
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'fallback-key-development')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config['JWT_ALGORITHM'] = 'HS256'
+    app.config['JWT_ENCODE_ISSUER'] = None
+    app.config['JWT_DECODE_ISSUER'] = None
 
-db.init_app(app)
-jwt = JWTManager(app)
+    db.init_app(app)
+    with app.app_context():
+        configurar_sqlite(db.engine)
+    JWTManager(app)
+
+    # Registra os blueprints
+    app.register_blueprint(bp_auth)
+    app.register_blueprint(bp_pokemon)
+    app.register_blueprint(bp_user_pokemon)
+    app.register_blueprint(bp_users)
+
+    @app.route('/')
+    def home():
+        return 'API PokeAPI está funcionando!'
 
-# Registra os blueprints
-app.register_blueprint(bp_auth)
-app.register_blueprint(bp_pokemon)
-app.register_blueprint(bp_user_pokemon)
-app.register_blueprint(bp_users)
+    return app
+
+def aquecer(app):
+    """Carrega os caches de leitura (tipos e índices do catálogo) no processo atual.
+
+    Chamado no processo principal do gunicorn antes do fork, para que os
+    workers herdem os dados já carregados. Também limpa as entradas vencidas
+    do cache da PokeAPI em disco.
+    """
+    with app.app_context():
+        carregar_tipos()
+        indices_catalogo()
+        removidas = cache_pokeapi.remover_expirados()
+        if removidas:
+            print(f"INFO: {removidas} respostas vencidas removidas do cache da PokeAPI")
+        # Conexões abertas não podem ser compartilhadas com os processos filhos
+        db.engine.dispose()
 
-@app.route('/')
-def home():
-    return 'API PokeAPI está funcionando!'
+app = create_app()
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        carregar_tipos()
     
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,200 @@
+"""
+Catálogo local de Pokémon, preenchido pelo sync_catalog.py
+"""
+from bisect import bisect_right
+import glob
+import os
+import threading
+import time
+from models import db, PokemonCatalogo, CatalogoVersao
+from name_index import IndiceNomes
+from catalogo_compacto import CatalogoCompacto
+from db_config import INSTANCE_PATH
+import pokeapi_client
+
+POKEAPI_URL = 'https://pokeapi.co/api/v2/pokemon'
+
+TOTAL_POKEMON = 1025
+
+# Intervalo (segundos) entre consultas à versão do catálogo no banco
+INTERVALO_VERIFICACAO_VERSAO = 30
+
+# Diretório dos snapshots binários do catálogo (um por versão, abertos com mmap)
+CATALOGO_SNAPSHOT_DIR = os.getenv('CATALOGO_SNAPSHOT_DIR', INSTANCE_PATH)
+
+_versao = None
+_versao_lida_em = None
+
+_indices_lock = threading.Lock()
+_indices = None
+_indice_pokeapi = None
+
+class IndicesCatalogo:
+    """Índices em memória de uma versão do catálogo: nomes e membros de cada geração.
+
+    Os dados de cada Pokémon ficam no CatalogoCompacto; aqui só o que as buscas precisam.
+    """
+
+    def __init__(self, catalogo):
+        self.versao = catalogo.versao
+        self.catalogo = catalogo
+        entradas = [(catalogo.ids[i], catalogo.nome(i)) for i in range(len(catalogo))]
+        self.nomes = IndiceNomes(entradas)
+        self.id_por_nome = {nome: pokemon_id for pokemon_id, nome in entradas}
+        # geração -> ids em ordem de Pokédex
+        self.geracoes = {}
+        for i, (pokemon_id, _) in enumerate(entradas):
+            self.geracoes.setdefault(catalogo.geracao(i), []).append(pokemon_id)
+
+    def __len__(self):
+        return len(self.catalogo)
+
+def caminho_snapshot(versao):
+    return os.path.join(CATALOGO_SNAPSHOT_DIR, f"catalogo-v{versao}.bin")
+
+def gerar_snapshot(versao):
+    """Monta o catálogo compacto a partir do banco e grava o snapshot da versão"""
+    linhas = db.session.query(
+        PokemonCatalogo.IDPokemon, PokemonCatalogo.Nome, PokemonCatalogo.ImagemUrl,
+        PokemonCatalogo.Tipos, PokemonCatalogo.Geracao
+    ).all()
+    catalogo = CatalogoCompacto.de_linhas(versao, linhas)
+    if versao and linhas:
+        try:
+            catalogo.salvar(caminho_snapshot(versao))
+            # Workers que ainda mapeiam um snapshot antigo continuam lendo o arquivo removido
+            for antigo in glob.glob(os.path.join(CATALOGO_SNAPSHOT_DIR, 'catalogo-v*.bin')):
+                versao_antiga = os.path.basename(antigo)[len('catalogo-v'):-len('.bin')]
+                if versao_antiga.isdigit() and int(versao_antiga) < versao:
+                    os.remove(antigo)
+        except OSError as e:
+            print(f"AVISO: Não foi possível gravar o snapshot do catálogo: {e}")
+    return catalogo
+
+def carregar_catalogo(versao):
+    """Catálogo compacto da versão: mapeia o snapshot se existir, senão monta do banco e o grava"""
+    try:
+        catalogo = CatalogoCompacto.abrir(caminho_snapshot(versao))
+        if catalogo.versao == versao:
+            return catalogo
+    except (OSError, ValueError):
+        pass
+    return gerar_snapshot(versao)
+
+def versao_catalogo():
+    """Versão do catálogo (id da última sincronização; 0 se nunca sincronizado)"""
+    global _versao, _versao_lida_em
+    agora = time.monotonic()
+    if _versao_lida_em is None or agora - _versao_lida_em > INTERVALO_VERIFICACAO_VERSAO:
+        _versao = db.session.query(db.func.max(CatalogoVersao.IDCatalogoVersao)).scalar() or 0
+        _versao_lida_em = agora
+    return _versao
+
+def indices_catalogo():
+    """Índices da versão atual do catálogo, remontados quando uma nova sincronização é publicada"""
+    global _indices
+    versao = versao_catalogo()
+    if _indices is None or _indices.versao != versao:
+        with _indices_lock:
+            if _indices is None or _indices.versao != versao:
+                _indices = IndicesCatalogo(carregar_catalogo(versao))
+    return _indices
+
+def catalogo_disponivel():
+    """Indica se o catálogo local já foi sincronizado"""
+    return len(indices_catalogo()) > 0
+
+def tipo_principal(codigo):
+    """Nome do tipo principal do pokémon (por nome ou número) segundo o catálogo, ou None"""
+    indices = indices_catalogo()
+    codigo = codigo.strip().lower()
+    pokemon_id = int(codigo) if codigo.isascii() and codigo.isdecimal() else indices.id_por_nome.get(codigo)
+    posicao = indices.catalogo.posicao(pokemon_id) if pokemon_id is not None else None
+    tipos = indices.catalogo.tipos(posicao) if posicao is not None else None
+    return tipos[0] if tipos else None
+
+def _nomes_da_pokeapi():
+    """Lista (id, nome) de todos os Pokémon direto da PokeAPI, para quando não há catálogo"""
+    dados = pokeapi_client.buscar_json(POKEAPI_URL, params={'limit': TOTAL_POKEMON, 'offset': 0})
+    if dados is None:
+        return None
+    return [(int(poke['url'].rstrip('/').rsplit('/', 1)[-1]), poke['name']) for poke in dados['results']]
+
+def indice_nomes():
+    """Índice de nomes do catálogo ou, antes da primeira sincronização, da lista da PokeAPI"""
+    global _indice_pokeapi
+    if catalogo_disponivel():
+        return indices_catalogo().nomes
+
+    if _indice_pokeapi is None:
+        with _indices_lock:
+            if _indice_pokeapi is None:
+                entradas = _nomes_da_pokeapi()
+                if entradas is None:
+                    return IndiceNomes([])
+                _indice_pokeapi = IndiceNomes(entradas)
+    return _indice_pokeapi
+
+def filtrar_ids(nome=None, pokemon_id=None, geracao=None, modo='contem'):
+    """Ids que atendem aos filtros de /pokemon, em ordem de Pokédex, sem ir ao banco"""
+    indices = indices_catalogo()
+    catalogo = indices.catalogo
+    ids = None
+    if pokemon_id:
+        ids = [int(pokemon_id)] if catalogo.posicao(int(pokemon_id)) is not None else []
+    if nome:
+        encontrados = indices.nomes.buscar(nome, modo)
+        if ids is None:
+            ids = encontrados
+        else:
+            encontrados = set(encontrados)
+            ids = [i for i in ids if i in encontrados]
+    if geracao:
+        geracao = int(geracao)
+        if ids is None:
+            ids = indices.geracoes.get(geracao, [])
+        else:
+            ids = [i for i in ids if catalogo.geracao(catalogo.posicao(i)) == geracao]
+    if ids is None:
+        ids = indices.nomes.ids
+    return ids
+
+def paginar_ids(ids, limit, offset=0, apos_id=None):
+    """Página de uma lista de ids em ordem crescente, por offset ou por keyset (ids depois de `apos_id`).
+
+    Com keyset a página começa por busca binária, então páginas profundas custam
+    o mesmo que a primeira. Retorna (página, se há mais depois dela).
+    """
+    inicio = bisect_right(ids, apos_id) if apos_id is not None else offset
+    return ids[inicio:inicio + limit], inicio + limit < len(ids)
+
+def buscar_no_catalogo(nome=None, pokemon_id=None, geracao=None, limit=20, offset=0, modo='contem', apos_id=None):
+    """Ids de uma página do catálogo com os mesmos filtros de /pokemon, em ordem de Pokédex.
+
+    Retorna (ids, se há próxima página); tudo em memória, sem ir ao banco.
+    """
+    ids = filtrar_ids(nome=nome, pokemon_id=pokemon_id, geracao=geracao, modo=modo)
+    return paginar_ids(ids, limit, offset=offset, apos_id=apos_id)
+
+def percorrer_catalogo(nome=None, pokemon_id=None, geracao=None, modo='contem', apos_id=None):
+    """Itera os ids do catálogo que atendem aos filtros (todos, sem paginar), em ordem de Pokédex"""
+    ids = filtrar_ids(nome=nome, pokemon_id=pokemon_id, geracao=geracao, modo=modo)
+    inicio = bisect_right(ids, apos_id) if apos_id is not None else 0
+    for i in range(inicio, len(ids)):
+        yield ids[i]
+
+def json_listagem(ids, favoritos=(), equipe=()):
+    """Objetos da listagem de /pokemon já codificados em JSON (bytes), um por id.
+
+    Cada objeto é o fragmento pré-codificado do snapshot com as flags do
+    usuário na frente; `favoritos` e `equipe` são códigos (nomes).
+    """
+    indices = indices_catalogo()
+    catalogo = indices.catalogo
+    ids_favoritos = {indices.id_por_nome[codigo] for codigo in favoritos if codigo in indices.id_por_nome}
+    ids_equipe = {indices.id_por_nome[codigo] for codigo in equipe if codigo in indices.id_por_nome}
+    for pokemon_id in ids:
+        posicao = catalogo.posicao(pokemon_id)
+        # Ids de uma versão anterior do catálogo podem ter sumido na atual
+        if posicao is not None:
+            yield catalogo.json_listagem(posicao, pokemon_id in ids_favoritos, pokemon_id in ids_equipe)
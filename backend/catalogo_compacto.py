@@ -0,0 +1,180 @@
+"""
+Representação compacta do catálogo em memória: arrays paralelos e tabelas de textos,
+gravável num snapshot binário que os workers abrem com mmap (páginas compartilhadas)
+"""
+from array import array
+from bisect import bisect_left
+import json
+import mmap
+import os
+import struct
+import sys
+
+# magic, marca de ordem dos bytes, versão do catálogo, total de Pokémon, total de tipos
+_CABECALHO = struct.Struct('=8sIIII')
+_MAGIC = b'PKCAT003'
+_ORDEM = 0x01020304
+
+# Início de cada objeto da listagem, pelas flags (equipe, favorito); as chaves vão em ordem
+# alfabética, como no jsonify, e o restante do objeto é o fragmento pré-codificado da entrada
+_PREFIXOS = {
+    (equipe, favorito): b'{"equipe":%s,"favorito":%s,' % (
+        b'true' if equipe else b'false', b'true' if favorito else b'false'
+    )
+    for equipe in (False, True) for favorito in (False, True)
+}
+
+def _alinhar(tamanho):
+    return (tamanho + 7) & ~7
+
+def fragmento_json(pokemon_id, nome, imagem_url):
+    """Parte fixa do objeto da listagem: '"id":..,"imagem":..,"nome":..}'"""
+    return json.dumps({'id': pokemon_id, 'imagem': imagem_url, 'nome': nome},
+                      separators=(',', ':'), sort_keys=True)[1:]
+
+class TabelaTextos:
+    """Textos UTF-8 concatenados + offsets; decodifica só o item acessado"""
+    __slots__ = ('_offsets', '_dados')
+
+    def __init__(self, offsets, dados):
+        self._offsets = offsets
+        self._dados = dados
+
+    @staticmethod
+    def codificar(textos):
+        """(offsets, bytes) de uma lista de textos"""
+        offsets = array('I', [0])
+        partes = []
+        for texto in textos:
+            dado = (texto or '').encode('utf-8')
+            partes.append(dado)
+            offsets.append(offsets[-1] + len(dado))
+        return offsets, b''.join(partes)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self._dados[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+class CatalogoCompacto:
+    """Catálogo em arrays paralelos ordenados por id.
+
+    Cada Pokémon ocupa uma posição: id (uint32), geração e os dois tipos
+    (uint8, índice na tabela de tipos; 0 = sem tipo), mais nome e o fragmento
+    JSON já codificado da listagem (com a imagem) nas tabelas de textos. Os arrays
+    são views sobre um único buffer, que pode ser bytes ou um mmap do
+    snapshot em disco.
+    """
+
+    def __init__(self, buffer):
+        visao = memoryview(buffer)
+        magic, ordem, self.versao, total, total_tipos = _CABECALHO.unpack_from(visao)
+        if magic != _MAGIC or ordem != _ORDEM:
+            raise ValueError('Snapshot do catálogo inválido ou de outra arquitetura')
+        self._buffer = buffer
+        posicao = _alinhar(_CABECALHO.size)
+
+        def secao(formato, quantidade):
+            nonlocal posicao
+            tamanho = quantidade * struct.calcsize(formato)
+            if posicao + tamanho > len(visao):
+                raise ValueError('Snapshot do catálogo truncado')
+            dados = visao[posicao:posicao + tamanho]
+            posicao = _alinhar(posicao + tamanho)
+            return dados.cast(formato) if formato != 'B' else dados
+
+        self.ids = secao('I', total)
+        self._geracoes = secao('B', total)
+        self._tipo1 = secao('B', total)
+        self._tipo2 = secao('B', total)
+        offsets_nomes = secao('I', total + 1)
+        offsets_tipos = secao('I', total_tipos + 1)
+        offsets_fragmentos = secao('I', total + 1)
+        self._nomes = TabelaTextos(offsets_nomes, secao('B', offsets_nomes[-1]))
+        tabela_tipos = TabelaTextos(offsets_tipos, secao('B', offsets_tipos[-1]))
+        self._offsets_fragmentos = offsets_fragmentos
+        self._fragmentos = secao('B', offsets_fragmentos[-1])
+        # Poucos tipos, acessados o tempo todo: decodificados uma vez
+        self._tabela_tipos = [None] + [sys.intern(tabela_tipos[i]) for i in range(len(tabela_tipos))]
+
+    # ========== CONSTRUÇÃO E SNAPSHOT ==========
+
+    @staticmethod
+    def serializar(versao, linhas):
+        """Bytes do snapshot a partir de linhas (id, nome, imagem, tipos separados por vírgula, geração)"""
+        linhas = sorted(linhas, key=lambda linha: linha[0])
+        tabela_tipos = sorted({t for linha in linhas if linha[3] for t in linha[3].split(',')})
+        indice_tipo = {tipo: i + 1 for i, tipo in enumerate(tabela_tipos)}
+        if len(indice_tipo) > 255:
+            raise ValueError('Tipos demais para o snapshot do catálogo')
+
+        tipo1 = array('B')
+        tipo2 = array('B')
+        for linha in linhas:
+            tipos = linha[3].split(',') if linha[3] else []
+            tipo1.append(indice_tipo[tipos[0]] if tipos else 0)
+            tipo2.append(indice_tipo[tipos[1]] if len(tipos) > 1 else 0)
+        offsets_nomes, nomes = TabelaTextos.codificar(linha[1] for linha in linhas)
+        offsets_tipos, tipos = TabelaTextos.codificar(tabela_tipos)
+        offsets_fragmentos, fragmentos = TabelaTextos.codificar(
+            fragmento_json(linha[0], linha[1], linha[2]) for linha in linhas
+        )
+
+        partes = [_CABECALHO.pack(_MAGIC, _ORDEM, versao, len(linhas), len(tabela_tipos))]
+        tamanho = _CABECALHO.size
+        for secao in (
+            array('I', (linha[0] for linha in linhas)).tobytes(),
+            bytes(linha[4] or 0 for linha in linhas),
+            tipo1.tobytes(), tipo2.tobytes(),
+            offsets_nomes.tobytes(), offsets_tipos.tobytes(),
+            offsets_fragmentos.tobytes(),
+            nomes, tipos, fragmentos,
+        ):
+            partes.append(b'\0' * (_alinhar(tamanho) - tamanho))
+            partes.append(secao)
+            tamanho = _alinhar(tamanho) + len(secao)
+        return b''.join(partes)
+
+    @classmethod
+    def de_linhas(cls, versao, linhas):
+        return cls(cls.serializar(versao, linhas))
+
+    @classmethod
+    def abrir(cls, caminho):
+        """Mapeia o snapshot em memória (somente leitura); as páginas são compartilhadas entre processos"""
+        with open(caminho, 'rb') as arquivo:
+            return cls(mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def salvar(self, caminho):
+        """Grava o snapshot de forma atômica (arquivo temporário + rename)"""
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(self._buffer)
+        os.replace(temporario, caminho)
+
+    # ========== CONSULTA ==========
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posicao(self, pokemon_id):
+        """Posição do Pokémon nos arrays, ou None se não estiver no catálogo"""
+        i = bisect_left(self.ids, pokemon_id)
+        return i if i < len(self.ids) and self.ids[i] == pokemon_id else None
+
+    def nome(self, i):
+        return self._nomes[i]
+
+    def geracao(self, i):
+        return self._geracoes[i] or None
+
+    def tipos(self, i):
+        """Tipos do Pokémon na ordem dos slots da PokeAPI"""
+        return tuple(self._tabela_tipos[t] for t in (self._tipo1[i], self._tipo2[i]) if t)
+
+    def json_listagem(self, i, favorito, equipe):
+        """Objeto da listagem de /pokemon já em JSON: só as flags do usuário são montadas na hora"""
+        offsets = self._offsets_fragmentos
+        return _PREFIXOS[equipe, favorito] + self._fragmentos[offsets[i]:offsets[i + 1]]
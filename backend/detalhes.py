@@ -0,0 +1,88 @@
+"""
+Detalhes de cada Pokémon em arquivos JSON pré-gerados (e pré-comprimidos) pelo sync_catalog,
+servidos por /pokemon/<codigo> direto do disco
+"""
+import gzip
+import json
+import os
+from db_config import INSTANCE_PATH
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o módulo, só gzip
+    brotli = None
+
+POKEMON_DETALHES_DIR = os.getenv('POKEMON_DETALHES_DIR', os.path.join(INSTANCE_PATH, 'detalhes'))
+
+# Codificações pré-geradas, na ordem de preferência quando o cliente aceita várias
+EXTENSOES = {'br': '.br', 'gzip': '.gz'}
+
+def recortar_detalhe(poke_data):
+    """Subconjunto do recurso /pokemon da PokeAPI usado pelos clientes (mesmas chaves)"""
+    return {
+        'id': poke_data['id'],
+        'name': poke_data['name'],
+        'height': poke_data.get('height'),
+        'weight': poke_data.get('weight'),
+        'sprites': {'front_default': poke_data.get('sprites', {}).get('front_default')},
+        'types': [
+            {'slot': t['slot'], 'type': {'name': t['type']['name'], 'url': t['type'].get('url')}}
+            for t in poke_data.get('types', [])
+        ],
+        'stats': [
+            {'base_stat': s['base_stat'], 'effort': s.get('effort', 0),
+             'stat': {'name': s['stat']['name'], 'url': s['stat'].get('url')}}
+            for s in poke_data.get('stats', [])
+        ],
+    }
+
+def codificacoes_disponiveis():
+    return [c for c in EXTENSOES if c != 'br' or brotli is not None]
+
+def caminho_detalhe(pokemon_id, codificacao=None):
+    caminho = os.path.join(POKEMON_DETALHES_DIR, f"{int(pokemon_id)}.json")
+    return caminho + EXTENSOES[codificacao] if codificacao else caminho
+
+def _gravar(caminho, dados):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(dados)
+    os.replace(temporario, caminho)
+
+def gravar_detalhes(pokemons):
+    """Gera o JSON de cada Pokémon e suas versões comprimidas; retorna quantos arquivos mudaram.
+
+    Arquivos sem mudança não são regravados, então a ETag (data + tamanho) que
+    os clientes guardaram continua válida.
+    """
+    os.makedirs(POKEMON_DETALHES_DIR, exist_ok=True)
+    alterados = 0
+    for poke_data in pokemons:
+        dados = json.dumps(recortar_detalhe(poke_data), separators=(',', ':'), sort_keys=True).encode('utf-8')
+        caminho = caminho_detalhe(poke_data['id'])
+        try:
+            with open(caminho, 'rb') as arquivo:
+                if arquivo.read() == dados and all(
+                    os.path.exists(caminho_detalhe(poke_data['id'], c)) for c in codificacoes_disponiveis()
+                ):
+                    continue
+        except FileNotFoundError:
+            pass
+        # As versões comprimidas primeiro: o .json é o marcador de que o conjunto está completo
+        _gravar(caminho_detalhe(poke_data['id'], 'gzip'), gzip.compress(dados, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _gravar(caminho_detalhe(poke_data['id'], 'br'), brotli.compress(dados, quality=11))
+        _gravar(caminho, dados)
+        alterados += 1
+    return alterados
+
+def arquivo_detalhe(pokemon_id, accept_encodings):
+    """(caminho, Content-Encoding ou None) do melhor arquivo para o Accept-Encoding; None se não foi gerado"""
+    caminho = caminho_detalhe(pokemon_id)
+    if not os.path.exists(caminho):
+        return None
+    aceitas = [c for c in codificacoes_disponiveis() if accept_encodings[c]]
+    for codificacao in sorted(aceitas, key=lambda c: -accept_encodings[c]):
+        if os.path.exists(caminho_detalhe(pokemon_id, codificacao)):
+            return caminho_detalhe(pokemon_id, codificacao), codificacao
+    return caminho, None
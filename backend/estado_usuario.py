@@ -0,0 +1,52 @@
+"""
+Favoritos e equipe de cada usuário em memória, para marcar as listagens de /pokemon sem ir ao banco
+"""
+import os
+from models import db, PokemonUsuario
+from http_cache import revisao_usuario
+from pokeapi_cache import CacheMemoria
+
+ESTADO_USUARIO_CACHE_MAX = int(os.getenv('ESTADO_USUARIO_CACHE_MAX', 4096))
+
+class EstadoUsuario:
+    """Códigos favoritos e da equipe de um usuário numa revisão"""
+    __slots__ = ('revisao', 'favoritos', 'equipe')
+
+    def __init__(self, revisao, favoritos, equipe):
+        self.revisao = revisao
+        self.favoritos = favoritos
+        self.equipe = equipe
+
+# IDUsuario -> EstadoUsuario; LRU por processo
+_cache = CacheMemoria(ESTADO_USUARIO_CACHE_MAX)
+
+def _carregar(user_id, revisao):
+    favoritos = []
+    equipe = []
+    linhas = db.session.query(PokemonUsuario.Codigo, PokemonUsuario.Favorito, PokemonUsuario.GrupoBatalha) \
+        .filter(PokemonUsuario.IDUsuario == user_id)
+    for codigo, favorito, grupo_batalha in linhas:
+        if favorito:
+            favoritos.append(codigo)
+        if grupo_batalha:
+            equipe.append(codigo)
+    return EstadoUsuario(revisao, frozenset(favoritos), frozenset(equipe))
+
+def estado_usuario(user_id):
+    """Favoritos/equipe do usuário; só consulta PokemonUsuario se a revisão mudou.
+
+    A revisão vem do banco (a mesma leitura da ETag), então uma escrita feita
+    em outro worker também invalida a entrada deste processo.
+    """
+    user_id = int(user_id)
+    revisao = revisao_usuario(user_id)
+    estado = _cache.get(user_id)
+    if estado is None or estado.revisao != revisao:
+        estado = _carregar(user_id, revisao)
+        _cache.set(user_id, estado)
+    return estado
+
+def invalidar_estado(*user_ids):
+    """Descarta as entradas dos usuários neste processo (chamar após alterar favoritos/equipe)"""
+    for user_id in user_ids:
+        _cache.remover(int(user_id))
@@ -0,0 +1,68 @@
+"""
+Configuração do gunicorn (servidor de produção): gunicorn -c gunicorn.conf.py app:app
+"""
+import os
+
+# gevent (padrão): cada requisição é um greenlet, e a espera pela PokeAPI não prende
+# uma thread do sistema; gthread: GUNICORN_THREADS threads por worker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+
+if worker_class == 'gevent':
+    # Antes de carregar a aplicação (preload_app): sockets, locks, threads e sleep
+    # viram cooperativos, e o cliente da PokeAPI (cache, single-flight, pool keep-alive)
+    # funciona sem mudanças com milhares de requisições por processo
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()  # consultas ao PostgreSQL também liberam o greenlet
+    except ImportError:
+        pass
+
+import multiprocessing
+import sys
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Requisições simultâneas por worker gevent
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# A aplicação é carregada uma vez no processo principal; os workers herdam
+# por copy-on-write o catálogo e os caches aquecidos em when_ready
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+# Ao receber SIGTERM, os workers terminam as requisições em andamento por até este tempo
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recicla workers periodicamente (0 desativa)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+accesslog = '-'
+errorlog = '-'
+
+def on_starting(server):
+    """Migra o banco uma única vez, no processo principal, antes de criar os workers"""
+    from migrate_db import migrate_database
+    print("=== Executando migração do banco de dados ===")
+    if not migrate_database():
+        print("ERRO: Falha na migração do banco de dados")
+        sys.exit(1)
+
+def when_ready(server):
+    from app import app, aquecer
+    aquecer(app)
+    print("INFO: Catálogo e tipos carregados; iniciando workers")
+
+def post_fork(server, worker):
+    # O pool de conexões do processo principal não pode ser reutilizado no filho
+    from app import app
+    from models import db
+    from tipos import iniciar_preenchimento
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Retoma os tipos pendentes de execuções anteriores sem esperar um novo agendamento
+    iniciar_preenchimento(app)
@@ -0,0 +1,57 @@
+"""
+Cache HTTP das respostas da API: ETag a partir de contadores de versão e 304 Not Modified
+"""
+from functools import wraps
+from flask import current_app, g, make_response, request
+from models import db, Usuario
+
+# Respostas dependem do usuário (favoritos/equipe): só o navegador guarda, e sempre revalida
+CACHE_CONTROL_USUARIO = 'private, no-cache'
+
+def revisao_usuario(user_id):
+    """Revisão dos favoritos/equipe do usuário, incrementada a cada alteração.
+
+    Lida uma vez por requisição: a ETag e o cache de estado do usuário usam o mesmo valor.
+    """
+    revisoes = g.setdefault('revisoes_usuario', {})
+    user_id = int(user_id)
+    if user_id not in revisoes:
+        revisoes[user_id] = db.session.query(Usuario.RevisaoPokemon) \
+            .filter(Usuario.IDUsuario == user_id).scalar() or 0
+    return revisoes[user_id]
+
+def incrementar_revisao(*user_ids):
+    """Invalida as respostas em cache dos usuários; deve rodar na mesma transação da escrita"""
+    if user_ids:
+        revisoes = g.get('revisoes_usuario', {})
+        for user_id in user_ids:
+            revisoes.pop(int(user_id), None)
+        Usuario.query.filter(Usuario.IDUsuario.in_([int(u) for u in user_ids])).update(
+            {Usuario.RevisaoPokemon: Usuario.RevisaoPokemon + 1}, synchronize_session=False
+        )
+
+def etag_condicional(calcular_etag, cache_control=CACHE_CONTROL_USUARIO):
+    """Decorator de view: responde 304 sem montar o corpo se If-None-Match bater com a ETag.
+
+    `calcular_etag` deve ser barato (só contadores de versão); se retornar None
+    a view roda normalmente, sem cabeçalhos de cache. Deve retornar None quando
+    a view não responderia 200 (parâmetros inválidos, 404): o 304 mascararia o erro.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = calcular_etag()
+            if etag is None:
+                return current_app.ensure_sync(view)(*args, **kwargs)
+
+            if request.if_none_match.contains(etag):
+                resposta = current_app.response_class(status=304)
+            else:
+                resposta = make_response(current_app.ensure_sync(view)(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = cache_control
+            return resposta
+        return wrapper
+    return decorator
@@ -1,127 +1,233 @@
 #!/usr/bin/env python3
 """
-Script de migração do banco de dados para Docker
+Script de migração do banco de dados (SQLite, PostgreSQL, MySQL ou qualquer banco do SQLAlchemy)
 """
-import sqlite3
-import os
+import re
 import sys
+from datetime import datetime
+from sqlalchemy import create_engine, event, inspect, select, insert, update, delete, func, and_, text
+from sqlalchemy.schema import CreateIndex
+from db_config import url_banco, opcoes_engine, configurar_sqlite
+from models import db, Usuario, TipoPokemon, PokemonUsuario
 
-def create_tables_if_not_exist(cursor):
-    """Cria as tabelas se elas não existirem"""
-    # Verificar se a tabela usuario existe
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='usuario'")
-    if not cursor.fetchone():
-        print("INFO: Criando tabela 'usuario'...")
-        cursor.execute("""
-            CREATE TABLE usuario (
-                IDUsuario INTEGER PRIMARY KEY AUTOINCREMENT,
-                Nome VARCHAR(100) NOT NULL,
-                Login VARCHAR(100) UNIQUE NOT NULL,
-                Email VARCHAR(100) UNIQUE NOT NULL,
-                Senha VARCHAR(200) NOT NULL,
-                Role VARCHAR(20) DEFAULT 'user' NOT NULL,
-                DtInclusao DATETIME DEFAULT CURRENT_TIMESTAMP,
-                DtAlteracao DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        print("INFO: Tabela 'usuario' criada com sucesso!")
-    
-    # Verificar se a tabela tipopokemon existe
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tipopokemon'")
-    if not cursor.fetchone():
-        print("INFO: Criando tabela 'tipopokemon'...")
-        cursor.execute("""
-            CREATE TABLE tipopokemon (
-                IDTipoPokemon INTEGER PRIMARY KEY AUTOINCREMENT,
-                Descricao VARCHAR(50) NOT NULL
-            )
-        """)
-        print("INFO: Tabela 'tipopokemon' criada com sucesso!")
-    
-    # Verificar se a tabela pokemonusuario existe
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='pokemonusuario'")
-    if not cursor.fetchone():
-        print("INFO: Criando tabela 'pokemonusuario'...")
-        cursor.execute("""
-            CREATE TABLE pokemonusuario (
-                IDPokemonUsuario INTEGER PRIMARY KEY AUTOINCREMENT,
-                IDUsuario INTEGER NOT NULL,
-                IDTipoPokemon INTEGER NOT NULL,
-                Codigo VARCHAR(50) NOT NULL,
-                ImagemUrl VARCHAR(200),
-                Nome VARCHAR(100) NOT NULL,
-                GrupoBatalha BOOLEAN DEFAULT 0,
-                Favorito BOOLEAN DEFAULT 0,
-                FOREIGN KEY (IDUsuario) REFERENCES usuario (IDUsuario),
-                FOREIGN KEY (IDTipoPokemon) REFERENCES tipopokemon (IDTipoPokemon)
-            )
-        """)
-        print("INFO: Tabela 'pokemonusuario' criada com sucesso!")
+def _ddl_transacional(engine):
+    """No SQLite, faz o BEGIN explícito para que ALTER/CREATE/DROP também sejam desfeitos em caso de erro"""
+    @event.listens_for(engine, 'connect')
+    def _sem_begin_implicito(dbapi_conn, connection_record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _begin(conn):
+        conn.exec_driver_sql('BEGIN')
+
+def create_tables_if_not_exist(engine):
+    """Cria as tabelas (com seus índices) que ainda não existirem"""
+    existentes = set(inspect(engine).get_table_names())
+    for tabela in db.metadata.sorted_tables:
+        if tabela.name not in existentes:
+            print(f"INFO: Criando tabela '{tabela.name}'...")
+            tabela.create(engine)
+            print(f"INFO: Tabela '{tabela.name}' criada com sucesso!")
+
+def _colunas(conn, tabela):
+    return {coluna['name']: coluna for coluna in inspect(conn).get_columns(tabela)}
+
+def _adicionar_coluna(conn, tabela, coluna, definicao):
+    quote = conn.dialect.identifier_preparer.quote
+    conn.execute(text(f"ALTER TABLE {quote(tabela)} ADD COLUMN {quote(coluna)} {definicao}"))
+
+def _tem_unico(conn, tabela, colunas):
+    """Indica se já há UNIQUE (constraint ou índice) exatamente sobre as colunas"""
+    inspetor = inspect(conn)
+    colunas = set(colunas)
+    if any(set(uc['column_names']) == colunas for uc in inspetor.get_unique_constraints(tabela)):
+        return True
+    # UNIQUE na definição da coluna vira um sqlite_autoindex, que o inspector omite por padrão
+    opcoes = {'include_auto_indexes': True} if conn.dialect.name == 'sqlite' else {}
+    return any(ix['unique'] and set(ix['column_names']) == colunas for ix in inspetor.get_indexes(tabela, **opcoes))
+
+def _permitir_tipo_pendente(conn):
+    """IDTipoPokemon passou a aceitar NULL (tipo pendente de preenchimento)"""
+    dialeto = conn.dialect.name
+    if dialeto == 'sqlite':
+        # O SQLite não altera NOT NULL com ALTER TABLE, então a tabela é recriada
+        conn.execute(text("ALTER TABLE pokemonusuario RENAME TO pokemonusuario_antiga"))
+        PokemonUsuario.__table__.create(conn)
+        conn.execute(text("""
+            INSERT INTO pokemonusuario (IDPokemonUsuario, IDUsuario, IDTipoPokemon, Codigo,
+                                        ImagemUrl, Nome, GrupoBatalha, Favorito)
+            SELECT IDPokemonUsuario, IDUsuario, IDTipoPokemon, Codigo, ImagemUrl, Nome, GrupoBatalha, Favorito
+            FROM pokemonusuario_antiga
+        """))
+        conn.execute(text("DROP TABLE pokemonusuario_antiga"))
+    elif dialeto in ('mysql', 'mariadb'):
+        conn.execute(text("ALTER TABLE pokemonusuario MODIFY IDTipoPokemon INTEGER NULL"))
+    else:
+        conn.execute(text('ALTER TABLE pokemonusuario ALTER COLUMN "IDTipoPokemon" DROP NOT NULL'))
+
+def _remover_tipos_duplicados(conn):
+    """Junta tipos com a mesma Descricao no de menor id, reapontando os pokémons"""
+    tipos = TipoPokemon.__table__
+    pokemons = PokemonUsuario.__table__
+    manter = {}
+    for tipo_id, descricao in conn.execute(
+            select(tipos.c.IDTipoPokemon, tipos.c.Descricao).order_by(tipos.c.IDTipoPokemon)):
+        if descricao not in manter:
+            manter[descricao] = tipo_id
+            continue
+        conn.execute(update(pokemons).where(pokemons.c.IDTipoPokemon == tipo_id)
+                     .values(IDTipoPokemon=manter[descricao]))
+        conn.execute(delete(tipos).where(tipos.c.IDTipoPokemon == tipo_id))
+
+def _remover_pokemons_duplicados(conn):
+    """Junta registros repetidos de (IDUsuario, Codigo) no mais antigo, mantendo as marcações"""
+    pokemons = PokemonUsuario.__table__
+    repetidos = select(pokemons.c.IDUsuario, pokemons.c.Codigo) \
+        .group_by(pokemons.c.IDUsuario, pokemons.c.Codigo).having(func.count() > 1).subquery()
+    linhas = conn.execute(
+        select(pokemons.c.IDPokemonUsuario, pokemons.c.IDUsuario, pokemons.c.Codigo,
+               pokemons.c.Favorito, pokemons.c.GrupoBatalha)
+        .join(repetidos, and_(pokemons.c.IDUsuario == repetidos.c.IDUsuario,
+                              pokemons.c.Codigo == repetidos.c.Codigo))
+        .order_by(pokemons.c.IDPokemonUsuario)
+    ).all()
+
+    grupos = {}
+    for linha in linhas:
+        grupos.setdefault((linha.IDUsuario, linha.Codigo), []).append(linha)
+    for grupo in grupos.values():
+        conn.execute(update(pokemons).where(pokemons.c.IDPokemonUsuario == grupo[0].IDPokemonUsuario).values(
+            Favorito=any(linha.Favorito for linha in grupo),
+            GrupoBatalha=any(linha.GrupoBatalha for linha in grupo)
+        ))
+        conn.execute(delete(pokemons).where(
+            pokemons.c.IDPokemonUsuario.in_([linha.IDPokemonUsuario for linha in grupo[1:]])
+        ))
+
+def _normalizar_predicado(predicado):
+    """WHERE de índice parcial sem aspas, parênteses e espaços, para comparar o modelo com o banco"""
+    return re.sub(r'[\s"`()]', '', str(predicado)).lower() if predicado is not None else None
+
+def _predicado_modelo(conn, indice):
+    ddl = str(CreateIndex(indice).compile(dialect=conn.dialect))
+    return _normalizar_predicado(ddl.split(' WHERE ', 1)[1]) if ' WHERE ' in ddl else None
+
+def _predicado_banco(conn, indice_refletido):
+    opcoes = indice_refletido.get('dialect_options', {})
+    return _normalizar_predicado(opcoes.get(f"{conn.dialect.name}_where"))
+
+def _criar_indices(conn):
+    """Cria os índices declarados nos modelos que ainda não existirem.
+
+    Índices parciais cujo WHERE no banco difere do modelo são recriados, pois
+    o banco só usa o índice quando a consulta repete o mesmo predicado.
+    """
+    for tabela in db.metadata.sorted_tables:
+        existentes = {ix['name']: ix for ix in inspect(conn).get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name not in existentes:
+                print(f"INFO: Criando índice '{indice.name}'...")
+                indice.create(conn)
+            elif _predicado_banco(conn, existentes[indice.name]) != _predicado_modelo(conn, indice):
+                print(f"INFO: Recriando índice '{indice.name}' com o novo predicado...")
+                indice.drop(conn)
+                indice.create(conn)
 
 def migrate_database():
-    """Migra o banco de dados adicionando a coluna Role se necessário"""
-    db_path = '/app/instance/pokeapi.db'
-    
-    # Criar diretório instance se não existir
-    os.makedirs('/app/instance', exist_ok=True)
-    
-    # Conectar ao banco SQLite
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    """Cria as tabelas que faltam e aplica as mudanças de esquema pendentes"""
+    database_url = url_banco()
+    engine = create_engine(database_url, **opcoes_engine(database_url))
+    if engine.dialect.name == 'sqlite':
+        _ddl_transacional(engine)
+        configurar_sqlite(engine)
+    print(f"INFO: Migrando o banco {database_url.render_as_string(hide_password=True)}")
+
     try:
         # Primeiro, criar as tabelas se elas não existirem
-        create_tables_if_not_exist(cursor)
-        conn.commit()
-        
-        # Verificar se a coluna Role já existe
-        cursor.execute("PRAGMA table_info(usuario)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'Role' in columns:
-            print("INFO: Coluna 'Role' já existe na tabela 'usuario'")
-        else:
-            print("INFO: Adicionando coluna 'Role' à tabela 'usuario'...")
-            
-            # Adicionar a coluna Role com valor padrão 'user'
-            cursor.execute("ALTER TABLE usuario ADD COLUMN Role VARCHAR(20) DEFAULT 'user'")
-            
-            # Atualizar todos os usuários existentes para ter role 'user'
-            cursor.execute("UPDATE usuario SET Role = 'user' WHERE Role IS NULL")
-            
-            conn.commit()
-            print("INFO: Migração concluída com sucesso!")
-        
-        # Verificar se já existe um admin
-        cursor.execute("SELECT * FROM usuario WHERE Role = 'admin'")
-        if cursor.fetchone():
-            print("INFO: Usuário admin já existe!")
-        else:
-            print("INFO: Criando usuário administrador...")
-            
-            # Criar usuário admin (senha: admin123)
-            from werkzeug.security import generate_password_hash
-            password_hash = generate_password_hash('admin123')
-            
-            cursor.execute("""
-                INSERT INTO usuario (Nome, Login, Email, Senha, Role, DtInclusao, DtAlteracao)
-                VALUES (?, ?, ?, ?, ?, datetime('now'), datetime('now'))
-            """, ('Administrador', 'admin', 'admin@pokedex.com', password_hash, 'admin'))
-            
-            conn.commit()
-            print("INFO: Usuário administrador criado com sucesso!")
-            print("INFO: Login: admin | Senha: admin123")
-        
+        create_tables_if_not_exist(engine)
+
+        with engine.begin() as conn:
+            # Verificar se a coluna Role já existe
+            if 'Role' in _colunas(conn, 'usuario'):
+                print("INFO: Coluna 'Role' já existe na tabela 'usuario'")
+            else:
+                print("INFO: Adicionando coluna 'Role' à tabela 'usuario'...")
+
+                # Adicionar a coluna Role com valor padrão 'user'
+                _adicionar_coluna(conn, 'usuario', 'Role', "VARCHAR(20) DEFAULT 'user'")
+
+                # Atualizar todos os usuários existentes para ter role 'user'
+                conn.execute(update(Usuario.__table__).where(Usuario.__table__.c.Role.is_(None)).values(Role='user'))
+                print("INFO: Migração concluída com sucesso!")
+
+        with engine.begin() as conn:
+            # Revisão dos favoritos/equipe, usada nas ETags das listagens
+            if 'RevisaoPokemon' not in _colunas(conn, 'usuario'):
+                print("INFO: Adicionando coluna 'RevisaoPokemon' à tabela 'usuario'...")
+                _adicionar_coluna(conn, 'usuario', 'RevisaoPokemon', 'INTEGER DEFAULT 0 NOT NULL')
+
+        with engine.begin() as conn:
+            # Verificar se a coluna HashOrigem já existe no catálogo
+            if 'HashOrigem' not in _colunas(conn, 'pokemoncatalogo'):
+                print("INFO: Adicionando coluna 'HashOrigem' à tabela 'pokemoncatalogo'...")
+                _adicionar_coluna(conn, 'pokemoncatalogo', 'HashOrigem', 'VARCHAR(40)')
+
+        with engine.begin() as conn:
+            # Descricao do tipo passou a ser única: junta duplicados e cria o índice único
+            if not _tem_unico(conn, 'tipopokemon', ['Descricao']):
+                print("INFO: Removendo tipos duplicados e tornando 'Descricao' única...")
+                _remover_tipos_duplicados(conn)
+                quote = conn.dialect.identifier_preparer.quote
+                conn.execute(text(f"CREATE UNIQUE INDEX uq_tipopokemon_descricao ON tipopokemon ({quote('Descricao')})"))
+
+        with engine.begin() as conn:
+            # Codigo passou a ser único por usuário: junta duplicados antes do índice único
+            unico = _tem_unico(conn, 'pokemonusuario', ['IDUsuario', 'Codigo'])
+            if not unico:
+                print("INFO: Removendo pokémons duplicados por usuário e criando índices em 'pokemonusuario'...")
+                _remover_pokemons_duplicados(conn)
+
+            if not _colunas(conn, 'pokemonusuario')['IDTipoPokemon']['nullable']:
+                print("INFO: Permitindo tipo pendente em 'pokemonusuario'...")
+                _permitir_tipo_pendente(conn)
+                unico = _tem_unico(conn, 'pokemonusuario', ['IDUsuario', 'Codigo'])
+
+            if not unico:
+                quote = conn.dialect.identifier_preparer.quote
+                conn.execute(text(
+                    f"CREATE UNIQUE INDEX uq_pokemonusuario_usuario_codigo "
+                    f"ON pokemonusuario ({quote('IDUsuario')}, {quote('Codigo')})"
+                ))
+            _criar_indices(conn)
+
+        with engine.begin() as conn:
+            usuarios = Usuario.__table__
+            # Verificar se já existe um admin
+            if conn.execute(select(usuarios.c.IDUsuario).where(usuarios.c.Role == 'admin')).first():
+                print("INFO: Usuário admin já existe!")
+            else:
+                print("INFO: Criando usuário administrador...")
+
+                # Criar usuário admin (senha: admin123)
+                from werkzeug.security import generate_password_hash
+                password_hash = generate_password_hash('admin123')
+
+                agora = datetime.utcnow()
+                conn.execute(insert(usuarios).values(
+                    Nome='Administrador', Login='admin', Email='admin@pokedex.com', Senha=password_hash,
+                    Role='admin', DtInclusao=agora, DtAlteracao=agora
+                ))
+                print("INFO: Usuário administrador criado com sucesso!")
+                print("INFO: Login: admin | Senha: admin123")
+
         return True
-        
+
     except Exception as e:
         print(f"ERRO durante a migração: {e}")
-        conn.rollback()
         return False
     finally:
-        conn.close()
+        engine.dispose()
 
 if __name__ == '__main__':
     success = migrate_database()
     sys.exit(0 if success else 1)
-
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import true
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -13,21 +14,63 @@ class Usuario(db.Model):
     Role = db.Column(db.String(20), default='user', nullable=False)  # 'admin' ou 'user'
     DtInclusao = db.Column(db.DateTime, default=datetime.utcnow)
     DtAlteracao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    RevisaoPokemon = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Muda a cada alteração em favoritos/equipe
     pokemons = db.relationship('PokemonUsuario', backref='usuario', lazy=True)
 
 class TipoPokemon(db.Model):
     __tablename__ = 'tipopokemon'
     IDTipoPokemon = db.Column(db.Integer, primary_key=True)
-    Descricao = db.Column(db.String(50), nullable=False)
+    Descricao = db.Column(db.String(50), unique=True, nullable=False)
 
 class PokemonUsuario(db.Model):
     __tablename__ = 'pokemonusuario'
     IDPokemonUsuario = db.Column(db.Integer, primary_key=True)
     IDUsuario = db.Column(db.Integer, db.ForeignKey('usuario.IDUsuario'), nullable=False)
-    IDTipoPokemon = db.Column(db.Integer, db.ForeignKey('tipopokemon.IDTipoPokemon'), nullable=False)
+    IDTipoPokemon = db.Column(db.Integer, db.ForeignKey('tipopokemon.IDTipoPokemon'))  # NULL enquanto o tipo é buscado
     Codigo = db.Column(db.String(50), nullable=False)
     ImagemUrl = db.Column(db.String(200))
     Nome = db.Column(db.String(100), nullable=False)
     GrupoBatalha = db.Column(db.Boolean, default=False)
     Favorito = db.Column(db.Boolean, default=False)
-    tipo = db.relationship('TipoPokemon')
\ No newline at end of file
+    tipo = db.relationship('TipoPokemon')
+    __table_args__ = (
+        # Também atende às consultas só por IDUsuario (prefixo do índice)
+        db.UniqueConstraint('IDUsuario', 'Codigo', name='uq_pokemonusuario_usuario_codigo'),
+    )
+
+# Índices parciais: só as linhas de favoritos / equipe / tipo pendente entram no índice.
+# As consultas precisam repetir o mesmo predicado (`.is_(True)`) para o banco usar o índice.
+db.Index('ix_pokemonusuario_favorito', PokemonUsuario.IDUsuario,
+         sqlite_where=PokemonUsuario.Favorito.is_(true()), postgresql_where=PokemonUsuario.Favorito.is_(true()))
+db.Index('ix_pokemonusuario_equipe', PokemonUsuario.IDUsuario,
+         sqlite_where=PokemonUsuario.GrupoBatalha.is_(true()),
+         postgresql_where=PokemonUsuario.GrupoBatalha.is_(true()))
+db.Index('ix_pokemonusuario_tipo_pendente', PokemonUsuario.Codigo,
+         sqlite_where=PokemonUsuario.IDTipoPokemon.is_(None), postgresql_where=PokemonUsuario.IDTipoPokemon.is_(None))
+
+class PokemonCatalogo(db.Model):
+    __tablename__ = 'pokemoncatalogo'
+    IDPokemon = db.Column(db.Integer, primary_key=True)  # Número da Pokédex nacional
+    Nome = db.Column(db.String(100), nullable=False, index=True)
+    ImagemUrl = db.Column(db.String(200))
+    Tipos = db.Column(db.String(100))  # Tipos separados por vírgula, na ordem dos slots da PokeAPI
+    Geracao = db.Column(db.Integer)
+    HashOrigem = db.Column(db.String(40))  # Hash dos dados da PokeAPI, para pular registros sem mudança
+    DtAtualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_pokemoncatalogo_geracao_id', 'Geracao', 'IDPokemon'),
+    )
+
+class CatalogoVersao(db.Model):
+    __tablename__ = 'catalogoversao'
+    IDCatalogoVersao = db.Column(db.Integer, primary_key=True)  # Incrementa a cada sincronização
+    TotalPokemon = db.Column(db.Integer, nullable=False)
+    DtSincronizacao = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TipoCatalogo(db.Model):
+    __tablename__ = 'tipocatalogo'
+    IDTipo = db.Column(db.Integer, primary_key=True)  # Id do tipo na PokeAPI
+    Nome = db.Column(db.String(50), unique=True, nullable=False)
+    RelacoesDano = db.Column(db.Text, nullable=False)  # JSON com double/half/no_damage_to (nomes dos tipos)
+    HashOrigem = db.Column(db.String(40))
+    DtAtualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,118 @@
+"""
+Índice em memória dos nomes de Pokémon para o filtro `nome` de /pokemon
+"""
+from bisect import bisect_left
+
+TAMANHO_NGRAMA = 3
+MODOS_BUSCA = ('contem', 'prefixo', 'aproximado')
+
+def _ngramas(texto, n):
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+def distancia_edicao(a, b, limite):
+    """Distância de Levenshtein entre a e b, parando assim que passar de `limite`"""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+class IndiceNomes:
+    """Índice de n-gramas (1 a 3 letras) sobre os nomes, em ordem de Pokédex.
+
+    As buscas retornam os ids já ordenados, então paginar é só fatiar a lista.
+    """
+
+    def __init__(self, entradas):
+        entradas = sorted((int(pokemon_id), nome.lower()) for pokemon_id, nome in entradas)
+        self.ids = [pokemon_id for pokemon_id, _ in entradas]
+        self.nomes = [nome for _, nome in entradas]
+
+        # n-grama -> posições (na ordem de Pokédex) dos nomes que o contêm
+        self._postings = {}
+        for posicao, nome in enumerate(self.nomes):
+            for n in range(1, TAMANHO_NGRAMA + 1):
+                for grama in _ngramas(nome, n):
+                    self._postings.setdefault(grama, []).append(posicao)
+
+        # Nomes ordenados alfabeticamente para busca por prefixo com bisect
+        self._ordem_alfabetica = sorted(range(len(self.nomes)), key=self.nomes.__getitem__)
+        self._nomes_ordenados = [self.nomes[p] for p in self._ordem_alfabetica]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def contem(self, termo):
+        """Ids dos Pokémon cujo nome contém o termo"""
+        termo = termo.lower()
+        if not termo:
+            return list(self.ids)
+        if len(termo) <= TAMANHO_NGRAMA:
+            return [self.ids[p] for p in self._postings.get(termo, [])]
+
+        # Interseção das listas dos trigramas, começando pela menor; depois confirma a substring
+        listas = sorted((self._postings.get(g, []) for g in _ngramas(termo, TAMANHO_NGRAMA)), key=len)
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            candidatos.intersection_update(lista)
+            if not candidatos:
+                return []
+        return [self.ids[p] for p in sorted(candidatos) if termo in self.nomes[p]]
+
+    def prefixo(self, termo):
+        """Ids dos Pokémon cujo nome começa com o termo"""
+        termo = termo.lower()
+        inicio = bisect_left(self._nomes_ordenados, termo)
+        posicoes = []
+        for i in range(inicio, len(self._nomes_ordenados)):
+            if not self._nomes_ordenados[i].startswith(termo):
+                break
+            posicoes.append(self._ordem_alfabetica[i])
+        return [self.ids[p] for p in sorted(posicoes)]
+
+    def aproximado(self, termo, max_erros=None):
+        """Busca tolerante a erros de digitação.
+
+        Aceita nomes que contêm o termo ou cujo início está a até `max_erros`
+        edições dele (1 erro até 5 letras, 2 a partir daí).
+        """
+        termo = termo.lower()
+        exatos = self.contem(termo)
+        if max_erros is None:
+            max_erros = 1 if len(termo) <= 5 else 2
+        if len(termo) <= max_erros:
+            return exatos
+
+        encontrados = set(exatos)
+        # Cada edição destrói no máximo dois bigramas do termo, então descarta
+        # sem calcular a distância os nomes que compartilham poucos bigramas
+        bigramas = _ngramas(termo, 2)
+        compartilhados = {}
+        for grama in bigramas:
+            for p in self._postings.get(grama, []):
+                compartilhados[p] = compartilhados.get(p, 0) + 1
+        minimo = len(bigramas) - 2 * max_erros
+        # Termo curto (mínimo <= 0): até nomes sem nenhum bigrama em comum podem estar perto
+        posicoes = compartilhados if minimo > 0 else range(len(self.nomes))
+        for p in posicoes:
+            if compartilhados.get(p, 0) < minimo or self.ids[p] in encontrados:
+                continue
+            nome = self.nomes[p]
+            for tamanho in range(len(termo) - max_erros, len(termo) + max_erros + 1):
+                if 0 < tamanho <= len(nome) and distancia_edicao(termo, nome[:tamanho], max_erros) <= max_erros:
+                    encontrados.add(self.ids[p])
+                    break
+        return sorted(encontrados)
+
+    def buscar(self, termo, modo='contem'):
+        if modo == 'prefixo':
+            return self.prefixo(termo)
+        if modo == 'aproximado':
+            return self.aproximado(termo)
+        return self.contem(termo)
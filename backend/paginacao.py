@@ -0,0 +1,31 @@
+"""
+Paginação por cursor (keyset): tokens opacos com a posição da última linha entregue
+"""
+import base64
+import binascii
+import json
+
+# Cabeçalho da resposta com o token da próxima página (ausente na última)
+CABECALHO_PROXIMO = 'X-Next-Cursor'
+
+def codificar_cursor(**posicao):
+    """Gera o token opaco do cursor a partir da posição (ex.: id=25, pos=20)"""
+    dados = json.dumps(posicao, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip('=')
+
+def decodificar_cursor(token):
+    """Lê um token gerado por codificar_cursor; ValueError se for inválido"""
+    try:
+        dados = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        posicao = json.loads(dados)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Cursor inválido') from e
+    if not isinstance(posicao, dict) or not all(isinstance(v, int) and v >= 0 for v in posicao.values()):
+        raise ValueError('Cursor inválido')
+    return posicao
+
+def com_proximo(resposta, token):
+    """Coloca o token da próxima página no cabeçalho da resposta"""
+    if token:
+        resposta.headers[CABECALHO_PROXIMO] = token
+    return resposta
@@ -0,0 +1,360 @@
+"""
+Cache em duas camadas para as respostas da PokeAPI:
+LRU em memória por processo + SQLite em disco compartilhado entre os workers
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+POKEAPI_CACHE_MEMORIA_MAX = int(os.getenv('POKEAPI_CACHE_MEMORIA_MAX', 2048))
+# Limite do LRU em memória pelo tamanho do JSON das respostas: um recurso /pokemon tem centenas de KB
+POKEAPI_CACHE_MEMORIA_MAX_BYTES = int(os.getenv('POKEAPI_CACHE_MEMORIA_MAX_BYTES', 64 * 1024 * 1024))
+POKEAPI_CACHE_PATH = os.getenv(
+    'POKEAPI_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'pokeapi_cache.db')
+)
+
+# TTL (segundos) por endpoint; a primeira regra que casar com a URL vale
+TTL_POR_ENDPOINT = [
+    (re.compile(r'/pokemon/[^/?]+/?$'), int(os.getenv('POKEAPI_CACHE_TTL_POKEMON', 7 * 24 * 3600))),
+    (re.compile(r'/generation/[^/?]+/?$'), int(os.getenv('POKEAPI_CACHE_TTL_GERACAO', 30 * 24 * 3600))),
+    (re.compile(r'/pokemon/?\?'), int(os.getenv('POKEAPI_CACHE_TTL_LISTA', 24 * 3600))),
+]
+TTL_PADRAO = int(os.getenv('POKEAPI_CACHE_TTL_PADRAO', 3600))
+
+# Entradas vencidas com ETag/Last-Modified ficam no disco por este tempo (segundos) para revalidação
+POKEAPI_CACHE_RETENCAO = int(os.getenv('POKEAPI_CACHE_RETENCAO', 7 * 24 * 3600))
+# A cada quantas gravações no disco o processo apaga as entradas vencidas
+POKEAPI_CACHE_LIMPEZA_A_CADA = int(os.getenv('POKEAPI_CACHE_LIMPEZA_A_CADA', 500))
+
+def ttl_para(url):
+    """TTL configurado para a URL"""
+    for padrao, ttl in TTL_POR_ENDPOINT:
+        if padrao.search(url):
+            return ttl
+    return TTL_PADRAO
+
+class Entrada:
+    """Resposta em cache com validade e validadores HTTP para revalidação"""
+    __slots__ = ('dados', 'expira_em', 'etag', 'last_modified')
+
+    def __init__(self, dados, expira_em, etag=None, last_modified=None):
+        self.dados = dados
+        self.expira_em = expira_em
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def expirada(self):
+        return time.time() >= self.expira_em
+
+    def revalidavel(self):
+        return bool(self.etag or self.last_modified)
+
+class CacheMemoria:
+    """LRU limitado por quantidade de itens e, opcionalmente, pela soma dos tamanhos informados em set()"""
+
+    def __init__(self, max_itens, max_bytes=None):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._tamanhos = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, chave):
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is not None:
+                self._itens.move_to_end(chave)
+            return entrada
+
+    def set(self, chave, entrada, tamanho=0):
+        with self._lock:
+            self.bytes += tamanho - self._tamanhos.get(chave, 0)
+            self._tamanhos[chave] = tamanho
+            self._itens[chave] = entrada
+            self._itens.move_to_end(chave)
+            # Sempre mantém o item recém-gravado, mesmo que sozinho passe do limite
+            while len(self._itens) > 1 and (
+                len(self._itens) > self.max_itens or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                antiga, _ = self._itens.popitem(last=False)
+                self.bytes -= self._tamanhos.pop(antiga)
+                self.evictions += 1
+
+    def tamanho(self, chave):
+        with self._lock:
+            return self._tamanhos.get(chave, 0)
+
+    def remover(self, chave):
+        with self._lock:
+            if self._itens.pop(chave, None) is not None:
+                self.bytes -= self._tamanhos.pop(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._tamanhos.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+class CacheDisco:
+    """Camada persistente em SQLite, compartilhada entre processos"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._livres = []
+        self._livres_lock = threading.Lock()
+        self._pid = os.getpid()
+        self._gravacoes = 0
+        self._gravacoes_lock = threading.Lock()
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with self._conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    chave TEXT PRIMARY KEY,
+                    corpo TEXT NOT NULL,
+                    expira_em REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            """)
+            # Marca qual processo está buscando cada URL na PokeAPI (single-flight entre workers);
+            # leases são temporários, então a tabela sem a coluna do dono é só recriada
+            colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(lease)")}
+            if colunas and 'dono' not in colunas:
+                conn.execute("DROP TABLE lease")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS lease (
+                    chave TEXT PRIMARY KEY,
+                    dono TEXT NOT NULL,
+                    expira_em REAL NOT NULL
+                )
+            """)
+            conn.commit()
+
+    @contextmanager
+    def _conexao(self):
+        """Conexão livre do processo, devolvida ao fim do bloco.
+
+        Cada conexão é usada por uma thread (ou greenlet) por vez e reaproveitada
+        pelas seguintes, em vez de uma por thread: com workers gevent cada
+        requisição roda num greenlet novo. Conexões herdadas num fork são descartadas.
+        """
+        with self._livres_lock:
+            if self._pid != os.getpid():
+                self._livres = []
+                self._pid = os.getpid()
+            conn = self._livres.pop() if self._livres else None
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5, check_same_thread=False)
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            with self._livres_lock:
+                if self._pid == os.getpid():
+                    self._livres.append(conn)
+
+    def get(self, chave):
+        """(entrada, tamanho do JSON) ou None"""
+        with self._conexao() as conn:
+            row = conn.execute(
+                "SELECT corpo, expira_em, etag, last_modified FROM cache WHERE chave = ?", (chave,)
+            ).fetchone()
+        if not row:
+            return None
+        return Entrada(json.loads(row[0]), row[1], row[2], row[3]), len(row[0])
+
+    def set(self, chave, entrada, corpo):
+        with self._conexao() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (chave, corpo, expira_em, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (chave, corpo, entrada.expira_em, entrada.etag, entrada.last_modified)
+            )
+            conn.commit()
+        with self._gravacoes_lock:
+            self._gravacoes += 1
+            limpar = self._gravacoes % POKEAPI_CACHE_LIMPEZA_A_CADA == 0
+        if limpar:
+            self.remover_expirados()
+
+    def renovar(self, chave, expira_em):
+        with self._conexao() as conn:
+            conn.execute("UPDATE cache SET expira_em = ? WHERE chave = ?", (expira_em, chave))
+            conn.commit()
+
+    def adquirir_lease(self, chave, duracao, dono):
+        """Tenta reservar a busca da URL para `dono`; False se outro já a reservou"""
+        agora = time.time()
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM lease WHERE chave = ? AND expira_em < ?", (chave, agora))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO lease (chave, dono, expira_em) VALUES (?, ?, ?)", (chave, dono, agora + duracao)
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def lease_ativo(self, chave):
+        with self._conexao() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM lease WHERE chave = ? AND expira_em >= ?", (chave, time.time())
+            ).fetchone()
+        return row is not None
+
+    def liberar_lease(self, chave, dono):
+        """Libera o lease só se ainda for de `dono` (um lease vencido pode já ter outro dono)"""
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM lease WHERE chave = ? AND dono = ?", (chave, dono))
+            conn.commit()
+
+    def remover_expirados(self):
+        """Apaga entradas vencidas (as revalidáveis só após POKEAPI_CACHE_RETENCAO) e leases abandonados.
+
+        Chamado no aquecimento e a cada POKEAPI_CACHE_LIMPEZA_A_CADA gravações;
+        retorna quantas entradas saíram.
+        """
+        agora = time.time()
+        with self._conexao() as conn:
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE expira_em < ? AND ((etag IS NULL AND last_modified IS NULL) OR expira_em < ?)",
+                (agora, agora - POKEAPI_CACHE_RETENCAO)
+            )
+            conn.execute("DELETE FROM lease WHERE expira_em < ?", (agora,))
+            conn.commit()
+            return cursor.rowcount
+
+class CachePokeAPI:
+    """Fachada das duas camadas com contadores de hits, misses e evictions"""
+
+    def __init__(self, max_itens_memoria, caminho_disco=None, max_bytes_memoria=None):
+        self.memoria = CacheMemoria(max_itens_memoria, max_bytes_memoria)
+        self.disco = None
+        if caminho_disco:
+            try:
+                self.disco = CacheDisco(caminho_disco)
+            except (sqlite3.Error, OSError) as e:
+                print(f"AVISO: Cache em disco desativado: {e}")
+        self._lock = threading.Lock()
+        self._stats = {'hits_memoria': 0, 'hits_disco': 0, 'misses': 0, 'revalidacoes': 0}
+
+    def _contar(self, chave):
+        with self._lock:
+            self._stats[chave] += 1
+
+    def get(self, chave):
+        """Retorna a entrada (mesmo expirada, para revalidação) ou None"""
+        entrada = self.memoria.get(chave)
+        if entrada is not None and not entrada.expirada():
+            self._contar('hits_memoria')
+            return entrada
+
+        if self.disco is not None:
+            try:
+                do_disco = self.disco.get(chave)
+            except sqlite3.Error:
+                do_disco = None
+            if do_disco is not None:
+                # Worker frio: aquece a memória a partir da camada compartilhada
+                entrada, tamanho = do_disco
+                self.memoria.set(chave, entrada, tamanho)
+                if not entrada.expirada():
+                    self._contar('hits_disco')
+                    return entrada
+
+        self._contar('misses')
+        return entrada
+
+    def set(self, chave, dados, etag=None, last_modified=None):
+        entrada = Entrada(dados, time.time() + ttl_para(chave), etag, last_modified)
+        corpo = json.dumps(dados)
+        self.memoria.set(chave, entrada, len(corpo))
+        if self.disco is not None:
+            try:
+                self.disco.set(chave, entrada, corpo)
+            except sqlite3.Error:
+                pass
+        return entrada
+
+    def renovar(self, chave, entrada):
+        """Estende a validade de uma entrada confirmada por 304 Not Modified"""
+        self._contar('revalidacoes')
+        entrada.expira_em = time.time() + ttl_para(chave)
+        self.memoria.set(chave, entrada, self.memoria.tamanho(chave))
+        if self.disco is not None:
+            try:
+                self.disco.renovar(chave, entrada.expira_em)
+            except sqlite3.Error:
+                pass
+        return entrada
+
+    def adquirir_lease(self, chave, duracao):
+        """Reserva a busca da URL entre os workers.
+
+        Retorna o identificador do dono, a ser passado a liberar_lease, ou None
+        se outro worker já a reservou; sem camada em disco sempre consegue.
+        """
+        dono = f"{os.getpid()}-{uuid.uuid4().hex}"
+        if self.disco is None:
+            return dono
+        try:
+            return dono if self.disco.adquirir_lease(chave, duracao, dono) else None
+        except sqlite3.Error:
+            return dono
+
+    def liberar_lease(self, chave, dono):
+        if self.disco is not None:
+            try:
+                self.disco.liberar_lease(chave, dono)
+            except sqlite3.Error:
+                pass
+
+    def aguardar_outro_worker(self, chave, limite, intervalo=0.05):
+        """Espera o worker dono do lease gravar a resposta na camada compartilhada.
+
+        Retorna a entrada nova, ou None se o lease acabar sem resposta ou o tempo esgotar.
+        """
+        prazo = time.time() + limite
+        while time.time() < prazo:
+            try:
+                do_disco = self.disco.get(chave)
+                if do_disco is not None and not do_disco[0].expirada():
+                    self.memoria.set(chave, *do_disco)
+                    return do_disco[0]
+                if not self.disco.lease_ativo(chave):
+                    return None
+            except sqlite3.Error:
+                return None
+            time.sleep(intervalo)
+        return None
+
+    def remover_expirados(self):
+        """Limpa a camada em disco (ver CacheDisco.remover_expirados); retorna quantas entradas saíram"""
+        if self.disco is None:
+            return 0
+        try:
+            return self.disco.remover_expirados()
+        except sqlite3.Error as e:
+            print(f"AVISO: Falha ao limpar o cache em disco: {e}")
+            return 0
+
+    def estatisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['evictions'] = self.memoria.evictions
+        stats['itens_memoria'] = len(self.memoria)
+        stats['bytes_memoria'] = self.memoria.bytes
+        return stats
+
+cache = CachePokeAPI(POKEAPI_CACHE_MEMORIA_MAX, POKEAPI_CACHE_PATH, POKEAPI_CACHE_MEMORIA_MAX_BYTES)
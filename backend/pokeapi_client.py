@@ -0,0 +1,246 @@
+"""
+Acesso à PokeAPI compartilhado pelos blueprints
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from pokeapi_cache import cache
+
+# Buscas simultâneas por processo (threads do executor compartilhado pelas listagens)
+POKEAPI_MAX_CONCORRENCIA = int(os.getenv('POKEAPI_MAX_CONCORRENCIA', 10))
+# Conexões mantidas abertas por host. Usam o cliente ao mesmo tempo as threads do executor,
+# as threads de requisição do gunicorn (buscas avulsas) e a thread de preenchimento de tipos;
+# com o pool bloqueante, quem passar disso espera uma conexão livre em vez de abrir uma descartável
+POKEAPI_POOL_SIZE = int(os.getenv(
+    'POKEAPI_POOL_SIZE', POKEAPI_MAX_CONCORRENCIA + int(os.getenv('GUNICORN_THREADS', 4)) + 1
+))
+# Timeouts de conexão e de leitura (segundos)
+POKEAPI_CONNECT_TIMEOUT = float(os.getenv('POKEAPI_CONNECT_TIMEOUT', 3))
+POKEAPI_TIMEOUT = float(os.getenv('POKEAPI_TIMEOUT', 10))
+# Novas tentativas com backoff exponencial em falhas de conexão e respostas 429/5xx
+POKEAPI_RETRIES = int(os.getenv('POKEAPI_RETRIES', 3))
+POKEAPI_BACKOFF = float(os.getenv('POKEAPI_BACKOFF', 0.3))
+
+STATUS_REPETIVEIS = (429, 500, 502, 503, 504)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requisicoes': 0,
+    'conexoes_solicitadas': 0,
+    'pool_misses': 0,
+    'deduplicadas_processo': 0,
+    'deduplicadas_workers': 0
+}
+
+def _contar(chave):
+    with _stats_lock:
+        _stats[chave] += 1
+
+class _ContadorPoolMixin:
+    """Conta as conexões pedidas ao pool e as que precisaram ser abertas (miss)"""
+
+    def _get_conn(self, timeout=None):
+        _contar('conexoes_solicitadas')
+        return super()._get_conn(timeout=timeout)
+
+    def _new_conn(self):
+        _contar('pool_misses')
+        return super()._new_conn()
+
+class _HTTPPool(_ContadorPoolMixin, HTTPConnectionPool):
+    pass
+
+class _HTTPSPool(_ContadorPoolMixin, HTTPSConnectionPool):
+    pass
+
+class _PokeAPIAdapter(HTTPAdapter):
+    """Adapter que usa os pools instrumentados e conta cada requisição enviada"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _HTTPPool, 'https': _HTTPSPool}
+
+    def send(self, request, **kwargs):
+        _contar('requisicoes')
+        return super().send(request, **kwargs)
+
+def _criar_sessao():
+    retry = Retry(
+        total=POKEAPI_RETRIES,
+        read=0,  # Timeout de leitura não é repetido para não multiplicar a espera
+        backoff_factor=POKEAPI_BACKOFF,
+        status_forcelist=STATUS_REPETIVEIS,
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = _PokeAPIAdapter(pool_connections=POKEAPI_POOL_SIZE, pool_maxsize=POKEAPI_POOL_SIZE,
+                              pool_block=True, max_retries=retry)
+    sessao = requests.Session()
+    sessao.mount('http://', adapter)
+    sessao.mount('https://', adapter)
+    return sessao
+
+_sessao = _criar_sessao()
+
+def get(url, params=None, timeout=None):
+    """GET na PokeAPI pela sessão compartilhada (keep-alive, retries e timeouts)"""
+    return _sessao.get(url, params=params, timeout=timeout or (POKEAPI_CONNECT_TIMEOUT, POKEAPI_TIMEOUT))
+
+class _SingleFlight:
+    """Enquanto uma URL está sendo buscada, as outras threads esperam o mesmo resultado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+
+    def executar(self, chave, funcao):
+        with self._lock:
+            future = self._em_andamento.get(chave)
+            lider = future is None
+            if lider:
+                future = Future()
+                self._em_andamento[chave] = future
+        if not lider:
+            _contar('deduplicadas_processo')
+            return future.result()
+
+        try:
+            resultado = funcao()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+
+_singleflight = _SingleFlight()
+
+def _verificar_status(resp):
+    """True se a resposta é 200, False se é 404; qualquer outro status vira requests.HTTPError.
+
+    Com raise_on_status=False o Retry devolve a última resposta quando as
+    tentativas acabam: um 429/5xx não pode ser confundido com "não existe".
+    """
+    if resp.status_code == 404:
+        return False
+    if resp.status_code != 200:
+        raise requests.HTTPError(f"PokeAPI respondeu {resp.status_code}", response=resp)
+    return True
+
+def buscar_json(url, params=None, timeout=None, usar_cache=True):
+    """Busca um recurso passando pelo cache; retorna None se a PokeAPI responder 404.
+
+    Com usar_cache=False vai direto à PokeAPI, sem ler nem gravar o cache
+    (ex.: sincronização do catálogo, que precisa dos dados atuais).
+    Falhas de rede e respostas de erro (429/5xx após as novas tentativas) são
+    propagadas como requests.RequestException.
+    """
+    if not usar_cache:
+        resp = get(url, params=params, timeout=timeout)
+        return resp.json() if _verificar_status(resp) else None
+    chave = requests.Request('GET', url, params=params).prepare().url
+    entrada = cache.get(chave)
+    if entrada is not None and not entrada.expirada():
+        return entrada.dados
+    return _singleflight.executar(chave, lambda: _buscar_e_guardar(chave, entrada, timeout))
+
+def _buscar_e_guardar(chave, entrada, timeout):
+    timeout = timeout or (POKEAPI_CONNECT_TIMEOUT, POKEAPI_TIMEOUT)
+    duracao_lease = sum(timeout) if isinstance(timeout, tuple) else timeout
+
+    # Outro worker já está buscando esta URL: espera a resposta dele no cache compartilhado
+    dono = cache.adquirir_lease(chave, duracao_lease)
+    if dono is None:
+        nova = cache.aguardar_outro_worker(chave, duracao_lease)
+        if nova is not None:
+            _contar('deduplicadas_workers')
+            return nova.dados
+
+    try:
+        resp = _sessao.get(chave, headers=_cabecalhos_revalidacao(entrada), timeout=timeout)
+        return _guardar_resposta(chave, entrada, resp)
+    finally:
+        # Só libera o lease deste worker; se esperou outro e ele falhou, não há lease a liberar
+        if dono is not None:
+            cache.liberar_lease(chave, dono)
+
+def _cabecalhos_revalidacao(entrada):
+    """If-None-Match / If-Modified-Since para revalidar uma entrada vencida do cache"""
+    headers = {}
+    if entrada is not None and entrada.revalidavel():
+        if entrada.etag:
+            headers['If-None-Match'] = entrada.etag
+        if entrada.last_modified:
+            headers['If-Modified-Since'] = entrada.last_modified
+    return headers
+
+def _guardar_resposta(chave, entrada, resp):
+    """Atualiza o cache com a resposta e retorna o JSON, ou None se for 404"""
+    if resp.status_code == 304 and entrada is not None:
+        return cache.renovar(chave, entrada).dados
+    if not _verificar_status(resp):
+        return None
+    dados = resp.json()
+    cache.set(chave, dados, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+    return dados
+
+def _buscar_json(url, timeout, usar_cache):
+    """Busca um recurso e retorna o JSON, ou None em caso de falha"""
+    try:
+        return buscar_json(url, timeout=timeout, usar_cache=usar_cache)
+    except (requests.RequestException, ValueError):
+        return None
+
+_executor_lock = threading.Lock()
+_executor_atual = None
+_executor_pid = None
+
+def _executor():
+    """Executor do processo, criado no primeiro uso.
+
+    As mesmas threads atendem todas as requisições (e mantêm suas conexões com
+    o cache em disco); um executor herdado num fork não tem threads, então
+    cada processo cria o seu.
+    """
+    global _executor_atual, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor_atual = ThreadPoolExecutor(max_workers=POKEAPI_MAX_CONCORRENCIA,
+                                                     thread_name_prefix='pokeapi')
+                _executor_pid = os.getpid()
+    return _executor_atual
+
+def buscar_varios(urls, max_concorrencia=None, timeout=None, usar_cache=True):
+    """Busca vários recursos em paralelo, mantendo a ordem de entrada e ignorando falhas.
+
+    No processo todo há no máximo POKEAPI_MAX_CONCORRENCIA buscas simultâneas;
+    `max_concorrencia` limita ainda quantas desta chamada ficam em andamento.
+    """
+    janela = max_concorrencia or POKEAPI_MAX_CONCORRENCIA
+    executor = _executor()
+    pendentes = deque()
+    resultados = []
+    for url in urls:
+        if len(pendentes) >= janela:
+            resultados.append(pendentes.popleft().result())
+        pendentes.append(executor.submit(_buscar_json, url, timeout, usar_cache))
+    resultados.extend(future.result() for future in pendentes)
+    return [dados for dados in resultados if dados is not None]
+
+def estatisticas():
+    """Contadores do cliente: requisições enviadas, buscas deduplicadas, uso do pool e do cache"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['pool_hits'] = stats.pop('conexoes_solicitadas') - stats['pool_misses']
+    stats['cache'] = cache.estatisticas()
+    return stats
@@ -1,18 +1,57 @@
-from flask import Blueprint, request, jsonify
+import os
+import re
+from flask import Blueprint, current_app, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import requests
-from models import PokemonUsuario
+from models import db, Usuario
+from catalog import catalogo_disponivel, versao_catalogo, buscar_no_catalogo, indice_nomes, paginar_ids, \
+    filtrar_ids, percorrer_catalogo, json_listagem, indices_catalogo
+from detalhes import arquivo_detalhe, recortar_detalhe
+from paginacao import codificar_cursor, decodificar_cursor, com_proximo
+from http_cache import etag_condicional, revisao_usuario
+from estado_usuario import estado_usuario
+from name_index import MODOS_BUSCA
+from streaming import FORMATOS_STREAM, formato_stream, resposta_stream_json
+import pokeapi_client
+from pokeapi_client import buscar_varios
 
 bp_pokemon = Blueprint('pokemon', __name__, url_prefix='/pokemon')
 
 POKEAPI_URL = 'https://pokeapi.co/api/v2/pokemon'
 POKEAPI_GENERATION_URL = 'https://pokeapi.co/api/v2/generation'
 
-@bp_pokemon.route('', methods=['GET'])
-@jwt_required()
-def listar_pokemons():
-    """Lista pokémons com filtros de nome, ID, geração, limit e offset"""
+# Nomes da PokeAPI: letras minúsculas, dígitos e hífens
+CODIGO_VALIDO = re.compile(r'^[a-z0-9-]{1,50}$')
+
+@bp_pokemon.errorhandler(requests.RequestException)
+def pokeapi_indisponivel(e):
+    """Falha de rede ou timeout ao consultar a PokeAPI"""
+    return jsonify({'msg': 'PokeAPI indisponível no momento'}), 503
+
+def cursor_seguinte(ids, tem_mais, offset):
+    """Token da página seguinte a partir dos ids da página atual (None na última)"""
+    return codificar_cursor(id=ids[-1], pos=offset + len(ids)) if tem_mais and ids else None
+
+def pagina_com_cursor(result, ids, tem_mais, offset):
+    """Resposta da listagem com o cursor da próxima página no cabeçalho.
+
+    `ids` são os da página pedida à PokeAPI, não os de `result`: um Pokémon que
+    falhou ao carregar não pode fazer a próxima página repeti-lo nem recuar a posição.
+    """
+    return com_proximo(jsonify(result), cursor_seguinte(ids, tem_mais, offset)), 200
+
+def id_da_url(url):
+    """Id no fim de uma URL de recurso da PokeAPI (.../pokemon/25/)"""
+    return int(url.rstrip('/').rsplit('/', 1)[-1])
+
+def parametros_listagem():
+    """Lê e valida os parâmetros de /pokemon; ValueError com a mensagem do 400.
+
+    Fica fora da view porque a ETag também depende deles: um 304 só pode
+    responder a uma requisição que daria 200.
+    """
     nome = request.args.get('nome')
+    modo = request.args.get('modo', 'contem')
     pokemon_id = request.args.get('id')
     geracao = request.args.get('geracao')
     
@@ -21,109 +60,199 @@ def listar_pokemons():
         limit = int(request.args.get('limit', 20))
         offset = int(request.args.get('offset', 0))
     except (ValueError, TypeError):
-        return jsonify({'msg': 'Parâmetros inválidos'}), 400
+        raise ValueError('Parâmetros inválidos')
     
     # Limitar valores para evitar abuso
     limit = min(max(limit, 1), 100)  # Entre 1 e 100
     offset = max(offset, 0)  # Não negativo
     
+    # Paginação por cursor: o token da próxima página vem no cabeçalho X-Next-Cursor
+    apos_id = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        if 'offset' in request.args:
+            raise ValueError('Use offset ou cursor, não ambos')
+        try:
+            posicao = decodificar_cursor(cursor)
+            apos_id, offset = posicao['id'], posicao['pos']
+        except (ValueError, KeyError):
+            raise ValueError('Cursor inválido')
+    
     # Validação de entrada para filtros
     if nome and (len(nome) > 50 or not isinstance(nome, str)):
-        return jsonify({'msg': 'Nome inválido'}), 400
+        raise ValueError('Nome inválido')
+    
+    if modo not in MODOS_BUSCA:
+        raise ValueError('Modo de busca inválido')
     
     if pokemon_id and (not pokemon_id.isdigit() or int(pokemon_id) < 1 or int(pokemon_id) > 1025):
-        return jsonify({'msg': 'ID inválido. Deve ser um número entre 1 e 1025'}), 400
+        raise ValueError('ID inválido. Deve ser um número entre 1 e 1025')
     
     if geracao and (not geracao.isdigit() or int(geracao) < 1 or int(geracao) > 9):
-        return jsonify({'msg': 'Geração inválida'}), 400
+        raise ValueError('Geração inválida')
     
-    user_id = get_jwt_identity()
+    formato = formato_stream()
+    if formato is not None:
+        if formato not in FORMATOS_STREAM:
+            raise ValueError('Formato de streaming inválido')
+        if not catalogo_disponivel():
+            raise ValueError('Streaming disponível apenas com o catálogo local sincronizado')
+    
+    return nome, modo, pokemon_id, geracao, limit, offset, apos_id, formato
 
-    # Buscar favoritos e equipe do usuário
-    favoritos = set()
-    equipe = set()
-    user_pokemons = PokemonUsuario.query.filter_by(IDUsuario=int(user_id)).all()
-    for up in user_pokemons:
-        if up.Favorito:
-            favoritos.add(up.Codigo)
-        if up.GrupoBatalha:
-            equipe.add(up.Codigo)
+def etag_listagem():
+    """ETag da listagem: versão do catálogo + revisão dos favoritos/equipe do usuário (+ formato de streaming).
 
-    def enrich(poke_data):
-        """Adiciona flags de favorito e equipe ao pokémon"""
-        codigo = poke_data['name'] if 'name' in poke_data else poke_data.get('codigo')
-        return {
-            'id': poke_data['id'],
-            'nome': poke_data['name'],
-            'imagem': poke_data['sprites']['front_default'],
-            'favorito': codigo in favoritos,
-            'equipe': codigo in equipe
-        }
+    Sem catálogo local os dados vêm da PokeAPI e não há como versioná-los.
+    Só é calculada quando a view vai responder 200.
+    """
+    if not catalogo_disponivel():
+        return None
+    # Parâmetros inválidos ou id fora dos filtros: sem ETag, a view responde o 400/404
+    try:
+        nome, modo, pokemon_id, geracao, _, _, _, formato = parametros_listagem()
+    except ValueError:
+        return None
+    if pokemon_id and not filtrar_ids(nome=nome, pokemon_id=pokemon_id, geracao=geracao, modo=modo):
+        return None
+    user_id = get_jwt_identity()
+    etag = f"c{versao_catalogo()}-u{user_id}-r{revisao_usuario(user_id)}"
+    return f"{etag}-{formato}" if formato else etag
+
+def listar_da_pokeapi(nome, modo, pokemon_id, geracao, limit, offset, apos_id, enrich):
+    """Listagem de /pokemon direto da PokeAPI, para quando não há catálogo local.
 
+    Passa pelo cliente compartilhado: cache, deduplicação entre threads e
+    workers e conexões keep-alive.
+    """
     # Filtro por geração
     if geracao:
         gen_url = f"{POKEAPI_GENERATION_URL}/{geracao}"
-        gen_resp = requests.get(gen_url)
-        if gen_resp.status_code != 200:
+        gen_data = pokeapi_client.buscar_json(gen_url)
+        if gen_data is None:
             return jsonify({'msg': 'Geração não encontrada!'}), 404
-        gen_data = gen_resp.json()
-        pokemons = [p['name'] for p in gen_data['pokemon_species']]
+        # Busca pelo id da espécie (igual ao do Pokémon padrão), pois os nomes podem diferir
+        especies = sorted((id_da_url(p['url']), p['name']) for p in gen_data['pokemon_species'])
         if nome:
-            pokemons = [p for p in pokemons if nome.lower() in p.lower()]
-        paginated = pokemons[offset:offset+limit]
-        result = []
-        for poke_name in paginated:
-            poke_resp = requests.get(f"{POKEAPI_URL}/{poke_name}")
-            if poke_resp.status_code == 200:
-                poke_data = poke_resp.json()
-                result.append(enrich(poke_data))
-        return jsonify(result), 200
+            especies = [(i, p) for i, p in especies if nome.lower() in p.lower()]
+        paginated, tem_mais = paginar_ids([especie_id for especie_id, _ in especies], limit,
+                                          offset=offset, apos_id=apos_id)
+        detalhes = buscar_varios(f"{POKEAPI_URL}/{especie_id}" for especie_id in paginated)
+        return pagina_com_cursor([enrich(poke_data) for poke_data in detalhes], paginated, tem_mais, offset)
     
     # Filtro por ID específico
     if pokemon_id:
-        poke_resp = requests.get(f"{POKEAPI_URL}/{pokemon_id}")
-        if poke_resp.status_code == 200:
-            poke_data = poke_resp.json()
+        poke_data = pokeapi_client.buscar_json(f"{POKEAPI_URL}/{pokemon_id}")
+        if poke_data is not None:
             return jsonify([enrich(poke_data)]), 200
         else:
             return jsonify({'msg': 'Pokémon não encontrado com este ID'}), 404
     
-    # Filtro por nome (busca parcial)
+    # Filtro por nome (busca parcial, por prefixo ou aproximada) no índice em memória
     if nome:
-        # Buscar uma lista maior de Pokémon para fazer busca parcial
-        search_params = {'limit': 1000, 'offset': 0}  # Buscar mais Pokémon para filtrar
-        search_resp = requests.get(POKEAPI_URL, params=search_params)
-        
-        if search_resp.status_code == 200:
-            search_data = search_resp.json()
-            # Filtrar Pokémon que contêm o termo de busca no nome
-            matching_pokemon = []
-            for poke in search_data['results']:
-                if nome.lower() in poke['name'].lower():
-                    matching_pokemon.append(poke)
-            
-            # Aplicar paginação aos resultados filtrados
-            paginated_results = matching_pokemon[offset:offset+limit]
-            
-            result = []
-            for poke in paginated_results:
-                poke_resp = requests.get(poke['url'])
-                if poke_resp.status_code == 200:
-                    poke_data = poke_resp.json()
-                    result.append(enrich(poke_data))
-            
-            return jsonify(result), 200
-        else:
-            return jsonify([]), 200
+        ids, tem_mais = paginar_ids(indice_nomes().buscar(nome, modo), limit, offset=offset, apos_id=apos_id)
+        detalhes = buscar_varios(f"{POKEAPI_URL}/{poke_id}" for poke_id in ids)
+        return pagina_com_cursor([enrich(poke_data) for poke_data in detalhes], ids, tem_mais, offset)
     
     # Listagem padrão com paginação
     params = {'limit': limit, 'offset': offset}
-    resp = requests.get(POKEAPI_URL, params=params)
-    data = resp.json()
-    result = []
-    for poke in data['results']:
-        poke_resp = requests.get(poke['url'])
-        if poke_resp.status_code == 200:
-            poke_data = poke_resp.json()
-            result.append(enrich(poke_data))
-    return jsonify(result), 200
+    data = pokeapi_client.buscar_json(POKEAPI_URL, params=params) or {'results': []}
+    detalhes = buscar_varios(poke['url'] for poke in data['results'])
+    # A lista da PokeAPI só pagina por offset: o cursor guarda a posição
+    ids = [id_da_url(poke['url']) for poke in data['results']]
+    return pagina_com_cursor([enrich(poke_data) for poke_data in detalhes], ids, bool(data.get('next')), offset)
+
+@bp_pokemon.route('', methods=['GET'])
+@jwt_required()
+@etag_condicional(etag_listagem)
+def listar_pokemons():
+    """Lista pokémons com filtros de nome, ID, geração, limit e offset.
+
+    Com ?stream=json|ndjson devolve todos os resultados dos filtros em streaming
+    (sem limit/offset), a partir do catálogo local.
+    """
+    try:
+        nome, modo, pokemon_id, geracao, limit, offset, apos_id, formato = parametros_listagem()
+    except ValueError as e:
+        return jsonify({'msg': str(e)}), 400
+    
+    user_id = get_jwt_identity()
+
+    # Favoritos e equipe do usuário (em cache enquanto a revisão não muda)
+    estado = estado_usuario(user_id)
+    favoritos = estado.favoritos
+    equipe = estado.equipe
+
+    def enrich(poke_data):
+        """Adiciona flags de favorito e equipe ao pokémon"""
+        codigo = poke_data['name'] if 'name' in poke_data else poke_data.get('codigo')
+        return {
+            'id': poke_data['id'],
+            'nome': poke_data['name'],
+            'imagem': poke_data['sprites']['front_default'],
+            'favorito': codigo in favoritos,
+            'equipe': codigo in equipe
+        }
+
+    # Catálogo local sincronizado: filtros e página resolvidos em memória, e cada
+    # objeto já vem codificado do snapshot; só as flags do usuário são montadas aqui
+    if catalogo_disponivel():
+        if formato is not None:
+            ids = percorrer_catalogo(nome=nome, pokemon_id=pokemon_id, geracao=geracao, modo=modo, apos_id=apos_id)
+            return resposta_stream_json(json_listagem(ids, favoritos, equipe), formato)
+
+        ids, tem_mais = buscar_no_catalogo(nome=nome, pokemon_id=pokemon_id, geracao=geracao,
+                                           limit=limit, offset=offset, modo=modo, apos_id=apos_id)
+        if pokemon_id and not ids:
+            return jsonify({'msg': 'Pokémon não encontrado com este ID'}), 404
+        # Mesmos bytes que o jsonify geraria, inclusive a quebra de linha final
+        corpo = b'[' + b','.join(json_listagem(ids, favoritos, equipe)) + b']\n'
+        resposta = current_app.response_class(corpo, mimetype='application/json')
+        return com_proximo(resposta, cursor_seguinte(ids, tem_mais, offset)), 200
+
+    # Sem catálogo: consulta a PokeAPI
+    return listar_da_pokeapi(nome, modo, pokemon_id, geracao, limit, offset, apos_id, enrich)
+
+@bp_pokemon.route('/<codigo>', methods=['GET'])
+@jwt_required()
+def detalhar_pokemon(codigo):
+    """Detalhes de um pokémon (por número ou nome), no formato do recurso /pokemon da PokeAPI.
+
+    Servidos dos arquivos gerados pelo sync_catalog, já comprimidos conforme o
+    Accept-Encoding e enviados sem passar pelo Python (sendfile).
+    """
+    codigo = codigo.strip().lower()
+    if not CODIGO_VALIDO.match(codigo):
+        return jsonify({'msg': 'Código inválido'}), 400
+
+    if codigo.isdigit():
+        pokemon_id = int(codigo)
+    else:
+        pokemon_id = indices_catalogo().id_por_nome.get(codigo) if catalogo_disponivel() else None
+
+    arquivo = arquivo_detalhe(pokemon_id, request.accept_encodings) if pokemon_id is not None else None
+    if arquivo:
+        caminho, codificacao = arquivo
+        # download_name: o nome do .json, não o do arquivo comprimido (.gz/.br) no Content-Disposition
+        resposta = send_file(caminho, mimetype='application/json', download_name=f"{pokemon_id}.json",
+                             conditional=True, etag=True)
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    # Ainda não gerado (catálogo não sincronizado): consulta a PokeAPI
+    poke_data = pokeapi_client.buscar_json(f"{POKEAPI_URL}/{pokemon_id or codigo}")
+    if poke_data is None:
+        return jsonify({'msg': 'Pokémon não encontrado'}), 404
+    return jsonify(recortar_detalhe(poke_data)), 200
+
+@bp_pokemon.route('/pokeapi/estatisticas', methods=['GET'])
+@jwt_required()
+def estatisticas_pokeapi():
+    """Contadores do acesso à PokeAPI neste worker: pool, cache e buscas deduplicadas (apenas para administradores)"""
+    usuario = db.session.get(Usuario, int(get_jwt_identity()))
+    if not usuario or usuario.Role != 'admin':
+        return jsonify({'msg': 'Acesso negado. Apenas administradores podem acessar esta funcionalidade.'}), 403
+    # Os contadores são por processo: cada worker do gunicorn responde com os seus
+    return jsonify({'pid': os.getpid(), **pokeapi_client.estatisticas()}), 200
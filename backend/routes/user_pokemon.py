@@ -1,51 +1,77 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, PokemonUsuario, TipoPokemon
-import requests
+from sqlalchemy.exc import IntegrityError
+from models import db, Usuario, PokemonUsuario, TipoPokemon
+from tipos import tipo_local, agendar_preenchimento
+from http_cache import etag_condicional, revisao_usuario, incrementar_revisao
+from estado_usuario import invalidar_estado
+from catalog import catalogo_disponivel
+from analise_equipe import matriz_tipos, tipos_do_catalogo, descrever_perfil, resumir_perfil, ranking
 
 bp_user_pokemon = Blueprint('user_pokemon', __name__, url_prefix='/user-pokemon')
 
-POKEAPI_URL = 'https://pokeapi.co/api/v2/pokemon'
+MAX_EQUIPE = 6
+MAX_OPERACOES_LOTE = 100
+MAX_EQUIPES_ANALISE = 500
 
-def get_ou_cria_tipo(tipo_nome):
-    """Busca ou cria um tipo de pokémon no banco"""
-    tipo = TipoPokemon.query.filter_by(Descricao=tipo_nome.capitalize()).first()
-    if not tipo:
-        tipo = TipoPokemon(Descricao=tipo_nome.capitalize())
-        db.session.add(tipo)
-        db.session.commit()
-    return tipo.IDTipoPokemon
+MSG_CONFLITO = 'Pokémon alterado por outra requisição, tente novamente'
+MSG_SEM_TIPOS = 'Análise indisponível: catálogo de tipos ainda não sincronizado'
 
-def buscar_tipo_pokemon(codigo):
-    """Busca o tipo principal do pokémon na PokeAPI"""
-    try:
-        response = requests.get(f"{POKEAPI_URL}/{codigo}")
-        if response.status_code == 200:
-            data = response.json()
-            if data['types']:
-                tipo_nome = data['types'][0]['type']['name']
-                return get_ou_cria_tipo(tipo_nome)
-        return get_ou_cria_tipo('Normal')
-    except:
-        return get_ou_cria_tipo('Normal')
+def resolver_tipos(codigos):
+    """Resolve pelo catálogo local o tipo principal de vários pokémons.
+
+    Retorna {codigo: IDTipoPokemon ou None}; os None ficam pendentes e são
+    preenchidos em segundo plano, sem esperar pela PokeAPI.
+    """
+    return {codigo: tipo_local(codigo) for codigo in set(codigos)}
+
+def validar_dados_pokemon(data):
+    """Valida codigo, nome e imagem enviados para adicionar um pokémon; retorna a mensagem de erro ou None"""
+    if not isinstance(data, dict) or not all(key in data for key in ['codigo', 'nome', 'imagem']):
+        return 'Dados incompletos (codigo, nome, imagem são obrigatórios)'
+    if not all(isinstance(data[key], str) for key in ['codigo', 'nome', 'imagem']):
+        return 'Dados inválidos'
+    if len(data['codigo']) > 50 or len(data['nome']) > 100 or len(data['imagem']) > 200:
+        return 'Dados muito longos'
+    if not data['imagem'].startswith('http'):
+        return 'URL de imagem inválida'
+    return None
+
+def listar_pokemons_usuario(user_id, *filtros):
+    """Pokémons do usuário já serializados, com o nome do tipo vindo de um JOIN.
+
+    Seleciona só as colunas da resposta: uma única consulta, sem carregar
+    objetos ORM nem disparar o lazy load de `tipo` para cada linha.
+    """
+    linhas = db.session.query(
+        PokemonUsuario.IDPokemonUsuario, PokemonUsuario.Codigo, PokemonUsuario.Nome,
+        PokemonUsuario.ImagemUrl, TipoPokemon.Descricao
+    ).outerjoin(TipoPokemon, PokemonUsuario.IDTipoPokemon == TipoPokemon.IDTipoPokemon) \
+        .filter(PokemonUsuario.IDUsuario == int(user_id), *filtros) \
+        .order_by(PokemonUsuario.IDPokemonUsuario).all()
+    return [
+        {
+            'id': pokemon_id,
+            'codigo': codigo,
+            'nome': nome,
+            'imagem': imagem,
+            'tipo': tipo
+        } for pokemon_id, codigo, nome, imagem, tipo in linhas
+    ]
+
+def etag_usuario():
+    """ETag das listagens do usuário: muda só quando os favoritos/equipe mudam"""
+    return f"u{get_jwt_identity()}-r{revisao_usuario(get_jwt_identity())}"
 
 # ========== FAVORITOS ==========
 
 @bp_user_pokemon.route('/favoritos', methods=['GET'])
 @jwt_required()
+@etag_condicional(etag_usuario)
 def listar_favoritos():
     """Lista todos os pokémons favoritos do usuário"""
     user_id = get_jwt_identity()
-    favoritos = PokemonUsuario.query.filter_by(IDUsuario=int(user_id), Favorito=True).all()
-    return jsonify([
-        {
-            'id': p.IDPokemonUsuario,
-            'codigo': p.Codigo,
-            'nome': p.Nome,
-            'imagem': p.ImagemUrl,
-            'tipo': p.tipo.Descricao if p.tipo else None
-        } for p in favoritos
-    ]), 200
+    return jsonify(listar_pokemons_usuario(user_id, PokemonUsuario.Favorito.is_(True))), 200
 
 @bp_user_pokemon.route('/favoritos', methods=['POST'])
 @jwt_required()
@@ -72,7 +98,8 @@ def adicionar_favorito():
         poke = PokemonUsuario.query.filter_by(IDUsuario=int(user_id), Codigo=data['codigo']).first()
         
         if not poke:
-            tipo_id = buscar_tipo_pokemon(data['codigo'])
+            # Tipo vem do catálogo local; sem ele, o registro fica pendente e é preenchido depois
+            tipo_id = tipo_local(data['codigo'])
             poke = PokemonUsuario(
                 IDUsuario=int(user_id),
                 IDTipoPokemon=tipo_id,
@@ -86,8 +113,17 @@ def adicionar_favorito():
         else:
             poke.Favorito = True
         
+        pendente = poke.Codigo if poke.IDTipoPokemon is None else None
+        incrementar_revisao(user_id)
         db.session.commit()
+        invalidar_estado(user_id)
+        if pendente:
+            agendar_preenchimento(pendente)
         return jsonify({'msg': 'Favorito adicionado!'}), 201
+    except IntegrityError:
+        # Outra requisição inseriu o mesmo pokémon ao mesmo tempo (UNIQUE IDUsuario + Codigo)
+        db.session.rollback()
+        return jsonify({'msg': MSG_CONFLITO}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Erro interno do servidor'}), 500
@@ -107,26 +143,20 @@ def remover_favorito(codigo):
     if not poke.GrupoBatalha:
         db.session.delete(poke)
     
+    incrementar_revisao(user_id)
     db.session.commit()
+    invalidar_estado(user_id)
     return jsonify({'msg': 'Favorito removido!'}), 200
 
 # ========== EQUIPE (GRUPO DE BATALHA) ==========
 
 @bp_user_pokemon.route('/equipe', methods=['GET'])
 @jwt_required()
+@etag_condicional(etag_usuario)
 def listar_equipe():
     """Lista todos os pokémons da equipe do usuário"""
     user_id = get_jwt_identity()
-    equipe = PokemonUsuario.query.filter_by(IDUsuario=int(user_id), GrupoBatalha=True).all()
-    return jsonify([
-        {
-            'id': p.IDPokemonUsuario,
-            'codigo': p.Codigo,
-            'nome': p.Nome,
-            'imagem': p.ImagemUrl,
-            'tipo': p.tipo.Descricao if p.tipo else None
-        } for p in equipe
-    ]), 200
+    return jsonify(listar_pokemons_usuario(user_id, PokemonUsuario.GrupoBatalha.is_(True))), 200
 
 @bp_user_pokemon.route('/equipe', methods=['POST'])
 @jwt_required()
@@ -138,14 +168,15 @@ def adicionar_equipe():
     if not data or not all(key in data for key in ['codigo', 'nome', 'imagem']):
         return jsonify({'msg': 'Dados incompletos (codigo, nome, imagem são obrigatórios)'}), 400
     
-    equipe_count = PokemonUsuario.query.filter_by(IDUsuario=int(user_id), GrupoBatalha=True).count()
-    if equipe_count >= 6:
+    equipe_count = PokemonUsuario.query.filter(PokemonUsuario.IDUsuario == int(user_id),
+                                               PokemonUsuario.GrupoBatalha.is_(True)).count()
+    if equipe_count >= MAX_EQUIPE:
         return jsonify({'msg': 'Equipe já possui 6 Pokémon!'}), 400
     
     poke = PokemonUsuario.query.filter_by(IDUsuario=int(user_id), Codigo=data['codigo']).first()
     
     if not poke:
-        tipo_id = buscar_tipo_pokemon(data['codigo'])
+        tipo_id = tipo_local(data['codigo'])
         poke = PokemonUsuario(
             IDUsuario=int(user_id),
             IDTipoPokemon=tipo_id,
@@ -161,7 +192,16 @@ def adicionar_equipe():
             return jsonify({'msg': 'Pokémon já está na equipe'}), 400
         poke.GrupoBatalha = True
     
-    db.session.commit()
+    pendente = poke.Codigo if poke.IDTipoPokemon is None else None
+    try:
+        incrementar_revisao(user_id)
+        db.session.commit()
+        invalidar_estado(user_id)
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'msg': MSG_CONFLITO}), 409
+    if pendente:
+        agendar_preenchimento(pendente)
     return jsonify({'msg': 'Pokémon adicionado à equipe!'}), 201
 
 @bp_user_pokemon.route('/equipe/<codigo>', methods=['DELETE'])
@@ -179,5 +219,206 @@ def remover_equipe(codigo):
     if not poke.Favorito:
         db.session.delete(poke)
     
+    incrementar_revisao(user_id)
     db.session.commit()
+    invalidar_estado(user_id)
     return jsonify({'msg': 'Pokémon removido da equipe!'}), 200
+
+# ========== ANÁLISE DA EQUIPE ==========
+
+@bp_user_pokemon.route('/equipe/analise', methods=['GET'])
+@jwt_required()
+def analisar_equipe():
+    """Fraquezas, resistências e cobertura de tipos da equipe do usuário"""
+    user_id = get_jwt_identity()
+    matriz = matriz_tipos()
+    if not len(matriz):
+        return jsonify({'msg': MSG_SEM_TIPOS}), 503
+
+    linhas = db.session.query(PokemonUsuario.Codigo, TipoPokemon.Descricao) \
+        .outerjoin(TipoPokemon, PokemonUsuario.IDTipoPokemon == TipoPokemon.IDTipoPokemon) \
+        .filter(PokemonUsuario.IDUsuario == int(user_id), PokemonUsuario.GrupoBatalha.is_(True)) \
+        .order_by(PokemonUsuario.IDPokemonUsuario).all()
+    membros = []
+    for codigo, tipo in linhas:
+        # Fora do catálogo, só o tipo principal salvo no registro é conhecido
+        tipos = tipos_do_catalogo(codigo) if catalogo_disponivel() else None
+        membros.append({'codigo': codigo, 'tipos': list(tipos or ([tipo.lower()] if tipo else []))})
+
+    perfis = matriz.perfis(matriz.codificar([[m['tipos'] for m in membros]], MAX_EQUIPE))
+    return jsonify({'membros': membros, **descrever_perfil(matriz, perfis, 0)}), 200
+
+@bp_user_pokemon.route('/equipe/analise', methods=['POST'])
+@jwt_required()
+def pontuar_equipes():
+    """Pontua várias equipes candidatas de uma vez, da melhor para a pior.
+
+    Corpo: {"equipes": [["pikachu", "charizard", ...], ...], "limite": 10}
+    Os membros são nomes ou números do catálogo, até MAX_EQUIPE por equipe.
+    """
+    data = request.get_json(silent=True)
+    equipes = data.get('equipes') if isinstance(data, dict) else None
+    if not isinstance(equipes, list) or not equipes:
+        return jsonify({'msg': 'Lista de equipes obrigatória'}), 400
+    if len(equipes) > MAX_EQUIPES_ANALISE:
+        return jsonify({'msg': f'Máximo de {MAX_EQUIPES_ANALISE} equipes por análise'}), 400
+    if not all(isinstance(e, list) and 0 < len(e) <= MAX_EQUIPE and all(isinstance(c, (str, int)) for c in e)
+               for e in equipes):
+        return jsonify({'msg': f'Cada equipe deve ter de 1 a {MAX_EQUIPE} pokémons'}), 400
+    try:
+        limite = int(data.get('limite', len(equipes)))
+    except (ValueError, TypeError):
+        return jsonify({'msg': 'Parâmetros inválidos'}), 400
+
+    matriz = matriz_tipos()
+    if not len(matriz) or not catalogo_disponivel():
+        return jsonify({'msg': MSG_SEM_TIPOS}), 503
+
+    tipos_por_codigo = {}
+    for codigo in {c for e in equipes for c in e}:
+        tipos = tipos_do_catalogo(codigo)
+        if tipos is None:
+            return jsonify({'msg': f'Pokémon não encontrado no catálogo: {codigo}'}), 400
+        tipos_por_codigo[codigo] = tipos
+
+    # Todas as equipes em um único cálculo sobre arrays (equipes x membros x tipos)
+    perfis = matriz.perfis(matriz.codificar([[tipos_por_codigo[c] for c in e] for e in equipes], MAX_EQUIPE))
+    return jsonify([
+        {'indice': e, 'equipe': equipes[e], **resumir_perfil(matriz, perfis, e)}
+        for e in ranking(perfis, max(limite, 0))
+    ]), 200
+
+# ========== OPERAÇÕES EM LOTE ==========
+
+@bp_user_pokemon.route('/batch', methods=['POST'])
+@jwt_required()
+def operacoes_em_lote():
+    """Aplica várias inclusões/remoções de favoritos e equipe em uma única transação.
+
+    Corpo: {"operacoes": [{"acao": "adicionar"|"remover", "lista": "favoritos"|"equipe",
+                           "codigo": ..., "nome": ..., "imagem": ...}, ...]}
+    Retorna o resultado de cada operação, na mesma ordem.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+
+    if not data or not isinstance(data.get('operacoes'), list) or not data['operacoes']:
+        return jsonify({'msg': 'Lista de operações obrigatória'}), 400
+    operacoes = data['operacoes']
+    if len(operacoes) > MAX_OPERACOES_LOTE:
+        return jsonify({'msg': f'Máximo de {MAX_OPERACOES_LOTE} operações por lote'}), 400
+
+    # Valida tudo antes de tocar no banco
+    resultados = [None] * len(operacoes)
+    validas = []
+    for i, op in enumerate(operacoes):
+        if not isinstance(op, dict) or op.get('acao') not in ('adicionar', 'remover') \
+                or op.get('lista') not in ('favoritos', 'equipe'):
+            resultados[i] = {'status': 400, 'msg': 'Operação inválida'}
+            continue
+        if op['acao'] == 'adicionar':
+            erro = validar_dados_pokemon(op)
+        else:
+            erro = None if isinstance(op.get('codigo'), str) and op['codigo'] else 'Código obrigatório'
+        if erro:
+            resultados[i] = {'status': 400, 'msg': erro}
+            continue
+        validas.append((i, op))
+
+    try:
+        # Trava a linha do usuário para que lotes concorrentes respeitem o limite da equipe
+        # (bancos sem SELECT ... FOR UPDATE, como o SQLite, já serializam as escritas)
+        Usuario.query.filter_by(IDUsuario=user_id).with_for_update().first()
+
+        codigos = {op['codigo'].strip() for _, op in validas}
+        existentes = {
+            p.Codigo: p for p in PokemonUsuario.query.filter(
+                PokemonUsuario.IDUsuario == user_id, PokemonUsuario.Codigo.in_(codigos)
+            )
+        } if codigos else {}
+        equipe_count = PokemonUsuario.query.filter(PokemonUsuario.IDUsuario == user_id,
+                                                   PokemonUsuario.GrupoBatalha.is_(True)).count()
+
+        novos_codigos = {op['codigo'].strip() for _, op in validas
+                         if op['acao'] == 'adicionar' and op['codigo'].strip() not in existentes}
+        tipos = resolver_tipos(novos_codigos)
+
+        # codigo -> registro (existente ou novo); None quando não há registro
+        estado = dict(existentes)
+        for i, op in validas:
+            codigo = op['codigo'].strip()
+            poke = estado.get(codigo)
+            favoritos = op['lista'] == 'favoritos'
+
+            if op['acao'] == 'adicionar':
+                if not favoritos:
+                    if poke is not None and poke.GrupoBatalha:
+                        resultados[i] = {'status': 400, 'msg': 'Pokémon já está na equipe'}
+                        continue
+                    if equipe_count >= MAX_EQUIPE:
+                        resultados[i] = {'status': 400, 'msg': f'Equipe já possui {MAX_EQUIPE} Pokémon!'}
+                        continue
+                if poke is None:
+                    poke = PokemonUsuario(
+                        IDUsuario=user_id,
+                        IDTipoPokemon=tipos[codigo],
+                        Codigo=codigo,
+                        Nome=op['nome'].strip(),
+                        ImagemUrl=op['imagem'].strip(),
+                        Favorito=False,
+                        GrupoBatalha=False
+                    )
+                    estado[codigo] = poke
+                if favoritos:
+                    poke.Favorito = True
+                    resultados[i] = {'status': 201, 'msg': 'Favorito adicionado!'}
+                else:
+                    poke.GrupoBatalha = True
+                    equipe_count += 1
+                    resultados[i] = {'status': 201, 'msg': 'Pokémon adicionado à equipe!'}
+            else:
+                if favoritos:
+                    if poke is None or not poke.Favorito:
+                        resultados[i] = {'status': 404, 'msg': 'Pokémon não encontrado nos favoritos'}
+                        continue
+                    poke.Favorito = False
+                    resultados[i] = {'status': 200, 'msg': 'Favorito removido!'}
+                else:
+                    if poke is None or not poke.GrupoBatalha:
+                        resultados[i] = {'status': 404, 'msg': 'Pokémon não encontrado na equipe'}
+                        continue
+                    poke.GrupoBatalha = False
+                    equipe_count -= 1
+                    resultados[i] = {'status': 200, 'msg': 'Pokémon removido da equipe!'}
+
+        # Só no fim decide o que inserir e o que apagar, para que remover e
+        # adicionar o mesmo pokémon no lote não gere DELETE + INSERT
+        pendentes = []
+        for codigo, poke in estado.items():
+            ativo = poke.Favorito or poke.GrupoBatalha
+            if codigo in existentes:
+                if not ativo:
+                    db.session.delete(poke)
+            elif ativo:
+                db.session.add(poke)
+                if poke.IDTipoPokemon is None:
+                    pendentes.append(codigo)
+
+        if any(resultado['status'] in (200, 201) for resultado in resultados if resultado):
+            incrementar_revisao(user_id)
+        db.session.commit()
+        invalidar_estado(user_id)
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'msg': MSG_CONFLITO}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'msg': 'Erro interno do servidor'}), 500
+
+    # Tipos que o catálogo não conhecia são preenchidos em segundo plano
+    for codigo in pendentes:
+        agendar_preenchimento(codigo)
+
+    return jsonify({
+        'resultados': [dict(resultado, indice=i) for i, resultado in enumerate(resultados)]
+    }), 200
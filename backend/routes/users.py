@@ -1,13 +1,30 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Usuario
+from paginacao import codificar_cursor, decodificar_cursor, com_proximo
+from streaming import FORMATOS_STREAM, LINHAS_POR_LEITURA, formato_stream, resposta_stream
 
 bp_users = Blueprint('users', __name__, url_prefix='/usuarios')
 
+LIMITE_PADRAO_USUARIOS = 100
+LIMITE_MAXIMO_USUARIOS = 500
+
+def serializar_usuario(u):
+    """Dados do usuário na listagem (aceita o modelo ou uma linha com as mesmas colunas)"""
+    return {
+        'id': u.IDUsuario,
+        'nome': u.Nome,
+        'login': u.Login,
+        'email': u.Email,
+        'role': u.Role,
+        'dtInclusao': u.DtInclusao.isoformat() if u.DtInclusao else None,
+        'dtAlteracao': u.DtAlteracao.isoformat() if u.DtAlteracao else None
+    }
+
 @bp_users.route('', methods=['GET'])
 @jwt_required()
 def listar_usuarios():
-    """Lista todos os usuários (apenas para administradores)"""
+    """Lista os usuários em páginas por cursor, ou todos em streaming com ?stream=json|ndjson (apenas para administradores)"""
     user_id = get_jwt_identity()
     current_user = Usuario.query.get(user_id)
     
@@ -15,19 +32,32 @@ def listar_usuarios():
     if not current_user or current_user.Role != 'admin':
         return jsonify({'msg': 'Acesso negado. Apenas administradores podem acessar esta funcionalidade.'}), 403
     
-    usuarios = Usuario.query.all()
-    
-    return jsonify([
-        {
-            'id': u.IDUsuario,
-            'nome': u.Nome,
-            'login': u.Login,
-            'email': u.Email,
-            'role': u.Role,
-            'dtInclusao': u.DtInclusao.isoformat() if u.DtInclusao else None,
-            'dtAlteracao': u.DtAlteracao.isoformat() if u.DtAlteracao else None
-        } for u in usuarios
-    ]), 200
+    try:
+        limit = min(max(int(request.args.get('limit', LIMITE_PADRAO_USUARIOS)), 1), LIMITE_MAXIMO_USUARIOS)
+        cursor = request.args.get('cursor')
+        apos_id = decodificar_cursor(cursor)['id'] if cursor else 0
+    except (ValueError, TypeError, KeyError):
+        return jsonify({'msg': 'Parâmetros inválidos'}), 400
+    
+    formato = formato_stream()
+    if formato is not None:
+        if formato not in FORMATOS_STREAM:
+            return jsonify({'msg': 'Formato de streaming inválido'}), 400
+        # Exportação completa: as linhas saem do cursor do banco direto para a resposta
+        consulta = db.select(
+            Usuario.IDUsuario, Usuario.Nome, Usuario.Login, Usuario.Email, Usuario.Role,
+            Usuario.DtInclusao, Usuario.DtAlteracao
+        ).where(Usuario.IDUsuario > apos_id).order_by(Usuario.IDUsuario) \
+            .execution_options(yield_per=LINHAS_POR_LEITURA)
+        return resposta_stream(db.session.execute(consulta), serializar_usuario, formato)
+    
+    # Keyset sobre a chave primária: cada página é uma leitura ordenada do índice
+    usuarios = Usuario.query.filter(Usuario.IDUsuario > apos_id) \
+        .order_by(Usuario.IDUsuario).limit(limit + 1).all()
+    proximo = codificar_cursor(id=usuarios[limit - 1].IDUsuario) if len(usuarios) > limit else None
+    usuarios = usuarios[:limit]
+    
+    return com_proximo(jsonify([serializar_usuario(u) for u in usuarios]), proximo), 200
 
 @bp_users.route('/<int:user_id>', methods=['GET'])
 @jwt_required()
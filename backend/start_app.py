@@ -1,40 +1,41 @@
 #!/usr/bin/env python3
 """
-Script de inicialização da aplicação com migração automática
+Script de inicialização da aplicação.
+
+Em produção sobe o gunicorn (gunicorn.conf.py), que migra o banco uma vez e
+depois cria os workers. Com --dev, migra e usa o servidor de desenvolvimento do Flask.
 """
-import subprocess
-import sys
 import os
+import sys
 
 def run_migration():
     """Executa a migração do banco de dados"""
     print("=== Executando migração do banco de dados ===")
-    try:
-        # Executar migração sem capturar saída para ver logs em tempo real
-        result = subprocess.run([sys.executable, 'migrate_db.py'], check=True)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"ERRO na migração: {e}")
-        return False
-
-def start_app():
-    """Inicia a aplicação Flask"""
-    print("=== Iniciando aplicação Flask ===")
-    try:
-        # Executar a aplicação Flask sem capturar saída
-        subprocess.run([sys.executable, 'app.py'], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"ERRO ao iniciar aplicação: {e}")
-        sys.exit(1)
-    except KeyboardInterrupt:
-        print("\nAplicação interrompida pelo usuário")
-        sys.exit(0)
+    from migrate_db import migrate_database
+    return migrate_database()
 
-if __name__ == '__main__':
-    # Executar migração primeiro
+def start_dev():
+    """Inicia o servidor de desenvolvimento do Flask (com reloader)"""
     if not run_migration():
         print("ERRO: Falha na migração do banco de dados")
         sys.exit(1)
-    
-    # Iniciar aplicação
-    start_app()
+
+    print("=== Iniciando aplicação Flask (desenvolvimento) ===")
+    from app import app
+    from tipos import iniciar_preenchimento
+    # Com o reloader, só no processo que atende as requisições
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_preenchimento(app)
+    app.run(debug=True, host='0.0.0.0', port=5000)
+
+def start_app():
+    """Substitui este processo pelo gunicorn, que recebe os sinais de parada do container"""
+    print("=== Iniciando gunicorn ===")
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    os.execvp('gunicorn', ['gunicorn', '-c', config, 'app:app'])
+
+if __name__ == '__main__':
+    if '--dev' in sys.argv[1:]:
+        start_dev()
+    else:
+        start_app()
@@ -0,0 +1,60 @@
+"""
+Respostas em streaming para listagens grandes: array JSON ou NDJSON montado à medida que as linhas chegam
+"""
+from flask import current_app, request, stream_with_context
+
+FORMATOS_STREAM = ('json', 'ndjson')
+
+MIMETYPE_NDJSON = 'application/x-ndjson'
+
+# Linhas serializadas por bloco enviado ao cliente (evita um write por linha)
+LINHAS_POR_BLOCO = 200
+
+# Linhas lidas por vez do cursor do banco
+LINHAS_POR_LEITURA = 500
+
+def formato_stream():
+    """Formato de streaming pedido (?stream=json|ndjson ou Accept: application/x-ndjson), ou None"""
+    formato = request.args.get('stream')
+    if formato is None and request.accept_mimetypes.best == MIMETYPE_NDJSON:
+        return 'ndjson'
+    return formato
+
+def _blocos(partes):
+    """Agrupa as partes serializadas em blocos de LINHAS_POR_BLOCO"""
+    bloco = []
+    for parte in partes:
+        bloco.append(parte)
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield b''.join(bloco)
+            bloco = []
+    if bloco:
+        yield b''.join(bloco)
+
+def resposta_stream(linhas, serializar, formato):
+    """Resposta que serializa `linhas` (iterável preguiçoso) sem montar a lista inteira na memória.
+
+    O iterável só é consumido durante o envio, com o contexto da requisição
+    ainda ativo, então pode ser um cursor do banco.
+    """
+    dumps = current_app.json.dumps
+    return resposta_stream_json((dumps(serializar(linha)).encode() for linha in linhas), formato)
+
+def resposta_stream_json(objetos, formato):
+    """Como resposta_stream, mas para objetos já codificados em JSON (bytes)"""
+    def gerar_ndjson():
+        yield from _blocos(objeto + b'\n' for objeto in objetos)
+
+    def gerar_json():
+        # O colchete sai antes da primeira leitura do banco
+        yield b'['
+        yield from _blocos((b',' if i else b'') + objeto for i, objeto in enumerate(objetos))
+        yield b']'
+
+    if formato == 'ndjson':
+        resposta = current_app.response_class(stream_with_context(gerar_ndjson()), mimetype=MIMETYPE_NDJSON)
+    else:
+        resposta = current_app.response_class(stream_with_context(gerar_json()), mimetype='application/json')
+    # O formato também pode vir do Accept
+    resposta.vary.add('Accept')
+    return resposta
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Sincroniza o catálogo local de Pokémon a partir da PokeAPI ou de um dump local
+
+Uso:
+    python -m sync_catalog                               # PokeAPI online
+    python -m sync_catalog --fonte /dados/api-data       # diretório com o dump JSON
+    python -m sync_catalog --fonte api-data.tar.gz       # tarball do dump JSON
+
+O dump segue o layout do repositório PokeAPI/api-data
+(<raiz>/api/v2/<recurso>/<id>/index.json). Uma execução interrompida retoma
+do último lote gravado, e registros que não mudaram desde a última
+sincronização não são regravados.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import threading
+import requests
+from sqlalchemy import insert, update
+import pokeapi_client
+from models import db, PokemonCatalogo, CatalogoVersao, TipoCatalogo
+from catalog import TOTAL_POKEMON, gerar_snapshot, caminho_snapshot
+from detalhes import gravar_detalhes
+
+POKEAPI_BASE_URL = 'https://pokeapi.co/api/v2'
+
+# Tipos com id >= 10000 ('unknown', 'shadow') não existem nos jogos principais
+ID_MAXIMO_TIPO = 10000
+
+CHECKPOINT_PADRAO = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'instance', 'sync_catalog.checkpoint.json'
+)
+
+def id_da_url(url):
+    """Extrai o id numérico do final de uma URL da PokeAPI"""
+    return int(url.rstrip('/').rsplit('/', 1)[-1])
+
+def calcular_hash(registro):
+    return hashlib.sha1(json.dumps(registro, sort_keys=True).encode('utf-8')).hexdigest()
+
+# ========== FONTES DE DADOS ==========
+
+class FontePokeAPI:
+    """Busca os recursos na PokeAPI em paralelo.
+
+    Não usa o cache do pokeapi_client: com TTLs de dias ele republicaria dados
+    antigos, e cada resposta gravada custaria um commit no SQLite do cache.
+    """
+
+    def __init__(self, base_url=POKEAPI_BASE_URL, workers=None):
+        self.base_url = base_url.rstrip('/')
+        self.workers = workers
+
+    def listar_ids(self, recurso):
+        dados = pokeapi_client.buscar_json(f"{self.base_url}/{recurso}", params={'limit': 100000, 'offset': 0},
+                                           usar_cache=False)
+        if dados is None:
+            raise requests.RequestException(f"Lista de '{recurso}' indisponível na PokeAPI")
+        return sorted(id_da_url(item['url']) for item in dados['results'])
+
+    def buscar_varios(self, recurso, ids):
+        return pokeapi_client.buscar_varios(
+            (f"{self.base_url}/{recurso}/{i}" for i in ids), max_concorrencia=self.workers, usar_cache=False
+        )
+
+class FonteDiretorio:
+    """Lê os recursos de um dump local da PokeAPI"""
+
+    def __init__(self, raiz, workers=None):
+        self.raiz = self._localizar_api(raiz)
+        self.workers = workers or pokeapi_client.POKEAPI_MAX_CONCORRENCIA
+
+    @staticmethod
+    def _localizar_api(raiz):
+        for candidato in (raiz, os.path.join(raiz, 'api', 'v2'), os.path.join(raiz, 'data', 'api', 'v2')):
+            if os.path.isdir(os.path.join(candidato, 'pokemon')):
+                return candidato
+        raise FileNotFoundError(f"Dump da PokeAPI não encontrado em {raiz}")
+
+    def listar_ids(self, recurso):
+        pasta = os.path.join(self.raiz, recurso)
+        return sorted(int(nome) for nome in os.listdir(pasta) if nome.isdigit())
+
+    def _ler(self, recurso, id_recurso):
+        caminho = os.path.join(self.raiz, recurso, str(id_recurso), 'index.json')
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+    def buscar_varios(self, recurso, ids):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            resultados = executor.map(lambda i: self._ler(recurso, i), ids)
+            return [dados for dados in resultados if dados is not None]
+
+class FonteTarball:
+    """Lê os recursos de um tarball (.tar, .tar.gz, ...) com o dump da PokeAPI"""
+
+    def __init__(self, caminho):
+        self._tar = tarfile.open(caminho, 'r:*')
+        self._lock = threading.Lock()  # TarFile não é thread-safe
+        # (recurso, id) -> membro do tar
+        self._membros = {}
+        for membro in self._tar.getmembers():
+            partes = membro.name.strip('/').split('/')
+            if len(partes) >= 3 and partes[-1] == 'index.json' and partes[-2].isdigit():
+                self._membros[(partes[-3], int(partes[-2]))] = membro
+        if not any(recurso == 'pokemon' for recurso, _ in self._membros):
+            raise FileNotFoundError(f"Dump da PokeAPI não encontrado em {caminho}")
+
+    def listar_ids(self, recurso):
+        return sorted(i for r, i in self._membros if r == recurso)
+
+    def buscar_varios(self, recurso, ids):
+        resultados = []
+        with self._lock:
+            for i in ids:
+                membro = self._membros.get((recurso, i))
+                if membro is None:
+                    continue
+                try:
+                    resultados.append(json.load(self._tar.extractfile(membro)))
+                except ValueError:
+                    continue
+        return resultados
+
+def abrir_fonte(origem, workers=None):
+    """Escolhe a fonte pelo argumento --fonte: URL, diretório ou tarball"""
+    if not origem or origem.startswith(('http://', 'https://')):
+        return FontePokeAPI(origem or POKEAPI_BASE_URL, workers)
+    if os.path.isdir(origem):
+        return FonteDiretorio(origem, workers)
+    if os.path.isfile(origem):
+        return FonteTarball(origem)
+    raise FileNotFoundError(f"Fonte não encontrada: {origem}")
+
+# ========== CHECKPOINT ==========
+
+class Checkpoint:
+    """Ids já gravados, para retomar uma sincronização interrompida"""
+
+    def __init__(self, caminho, origem):
+        self.caminho = caminho
+        self.origem = origem
+        self.concluidos = set()
+        if caminho and os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+            # Checkpoint de outra fonte não vale para esta execução
+            if dados.get('fonte') == origem:
+                self.concluidos = set(dados.get('pokemon', []))
+
+    def marcar(self, ids):
+        self.concluidos.update(ids)
+        if not self.caminho:
+            return
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'fonte': self.origem, 'pokemon': sorted(self.concluidos)}, arquivo)
+        os.replace(temporario, self.caminho)
+
+    def remover(self):
+        if self.caminho and os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+# ========== SINCRONIZAÇÃO ==========
+
+def mapear_geracoes(fonte):
+    """Monta o mapa id da espécie -> geração.
+
+    Usa o id e não o nome porque o nome da espécie nem sempre é igual ao do
+    Pokémon (ex.: espécie 'deoxys', Pokémon 'deoxys-normal').
+    """
+    geracoes = {}
+    ids = fonte.listar_ids('generation')
+    for gen_data in fonte.buscar_varios('generation', ids):
+        for especie in gen_data['pokemon_species']:
+            geracoes[id_da_url(especie['url'])] = gen_data['id']
+    return geracoes
+
+def extrair_registro(poke_data, geracoes):
+    """Extrai do JSON da PokeAPI apenas os campos guardados no catálogo"""
+    tipos = sorted(poke_data['types'], key=lambda t: t['slot'])
+    return {
+        'IDPokemon': poke_data['id'],
+        'Nome': poke_data['name'],
+        'ImagemUrl': poke_data['sprites']['front_default'],
+        'Tipos': ','.join(t['type']['name'] for t in tipos),
+        'Geracao': geracoes.get(id_da_url(poke_data['species']['url']))
+    }
+
+def extrair_tipo(tipo_data):
+    """Extrai o nome e a tabela de dano causado de um tipo"""
+    relacoes = tipo_data['damage_relations']
+    return {
+        'IDTipo': tipo_data['id'],
+        'Nome': tipo_data['name'],
+        'RelacoesDano': json.dumps({
+            chave: sorted(t['name'] for t in relacoes[chave])
+            for chave in ('double_damage_to', 'half_damage_to', 'no_damage_to')
+        }, sort_keys=True)
+    }
+
+def gravar_em_lote(modelo, chave, registros, hashes):
+    """Insere ou atualiza em uma única transação só os registros que mudaram.
+
+    Retorna quantos registros foram gravados.
+    """
+    novos, alterados = [], []
+    agora = datetime.utcnow()
+    for registro in registros:
+        registro['HashOrigem'] = calcular_hash(registro)
+        atual = hashes.get(registro[chave], False)
+        if atual == registro['HashOrigem']:
+            continue
+        registro['DtAtualizacao'] = agora
+        (alterados if atual is not False else novos).append(registro)
+        hashes[registro[chave]] = registro['HashOrigem']
+
+    if novos:
+        db.session.execute(insert(modelo), novos)
+    if alterados:
+        db.session.execute(update(modelo), alterados)
+    db.session.commit()
+    return len(novos) + len(alterados)
+
+def sincronizar_tipos(fonte):
+    ids = [i for i in fonte.listar_ids('type') if i < ID_MAXIMO_TIPO]
+    hashes = dict(db.session.query(TipoCatalogo.IDTipo, TipoCatalogo.HashOrigem).all())
+    return gravar_em_lote(TipoCatalogo, 'IDTipo', [extrair_tipo(t) for t in fonte.buscar_varios('type', ids)], hashes)
+
+def pendente_de_publicacao():
+    """True se há registros gravados depois da última versão publicada (ou nenhuma versão).
+
+    Compara as datas em vez de contar as alterações desta execução: uma
+    execução interrompida pode ter gravado mudanças sem publicá-las, e na
+    retomada esses registros já não aparecem como alterados.
+    """
+    ultima = db.session.query(CatalogoVersao.DtSincronizacao) \
+        .order_by(CatalogoVersao.IDCatalogoVersao.desc()).first()
+    if ultima is None:
+        return True
+    return any(
+        db.session.query(modelo.DtAtualizacao).filter(modelo.DtAtualizacao > ultima[0]).first() is not None
+        for modelo in (PokemonCatalogo, TipoCatalogo)
+    )
+
+def sincronizar_catalogo(fonte, origem=None, tamanho_lote=100, caminho_checkpoint=CHECKPOINT_PADRAO):
+    """Baixa Pokémon, tipos e gerações e grava no catálogo local.
+
+    Retorna True se todos os Pokémon foram sincronizados.
+    """
+    checkpoint = Checkpoint(caminho_checkpoint, origem or POKEAPI_BASE_URL)
+    if checkpoint.concluidos:
+        print(f"INFO: Retomando sincronização ({len(checkpoint.concluidos)} Pokémon já gravados)")
+
+    geracoes = mapear_geracoes(fonte)
+    print(f"INFO: {len(geracoes)} espécies mapeadas em {len(set(geracoes.values()))} gerações")
+
+    alterados = sincronizar_tipos(fonte)
+    print(f"INFO: Tipos sincronizados ({alterados} alterados)")
+
+    ids = [i for i in fonte.listar_ids('pokemon') if i <= TOTAL_POKEMON and i not in checkpoint.concluidos]
+    hashes = dict(db.session.query(PokemonCatalogo.IDPokemon, PokemonCatalogo.HashOrigem).all())
+    falhas = 0
+    for inicio in range(0, len(ids), tamanho_lote):
+        lote = ids[inicio:inicio + tamanho_lote]
+        dados = fonte.buscar_varios('pokemon', lote)
+        falhas += len(lote) - len(dados)
+        alterados += gravar_em_lote(PokemonCatalogo, 'IDPokemon',
+                                    [extrair_registro(p, geracoes) for p in dados], hashes)
+        gravar_detalhes(dados)
+        checkpoint.marcar(p['id'] for p in dados)
+        print(f"INFO: {min(inicio + tamanho_lote, len(ids))}/{len(ids)} Pokémon processados")
+
+    # Publica a nova versão só se algo mudou (nesta execução ou numa interrompida antes):
+    # os workers remontam seus índices ao percebê-la
+    if pendente_de_publicacao():
+        versao = CatalogoVersao(TotalPokemon=len(hashes))
+        db.session.add(versao)
+        db.session.commit()
+        print(f"INFO: {alterados} registros alterados, catálogo publicado na versão {versao.IDCatalogoVersao}")
+        gerar_snapshot(versao.IDCatalogoVersao)
+        print(f"INFO: Snapshot do catálogo gravado em {caminho_snapshot(versao.IDCatalogoVersao)}")
+    else:
+        print("INFO: Nenhuma alteração desde a última sincronização")
+
+    if falhas:
+        print(f"AVISO: {falhas} Pokémon não puderam ser obtidos; execute novamente para retomar")
+        return False
+    checkpoint.remover()
+    print("INFO: Catálogo sincronizado com sucesso!")
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sincroniza o catálogo local de Pokémon')
+    parser.add_argument('--fonte', default=POKEAPI_BASE_URL,
+                        help='URL da PokeAPI, diretório ou tarball com o dump JSON')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Buscas simultâneas (na PokeAPI, até POKEAPI_MAX_CONCORRENCIA)')
+    parser.add_argument('--lote', type=int, default=100, help='Pokémon gravados por transação')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PADRAO, help='Arquivo de progresso')
+    parser.add_argument('--reiniciar', action='store_true', help='Ignora o progresso salvo')
+    args = parser.parse_args(argv)
+
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        try:
+            fonte = abrir_fonte(args.fonte, args.workers)
+            if args.reiniciar:
+                Checkpoint(args.checkpoint, args.fonte).remover()
+            sucesso = sincronizar_catalogo(fonte, args.fonte, args.lote, args.checkpoint)
+        except (requests.RequestException, OSError, tarfile.TarError) as e:
+            db.session.rollback()
+            print(f"ERRO durante a sincronização: {e}")
+            return 1
+    return 0 if sucesso else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Fixtures dos testes: banco, caches e diretórios temporários, usuário autenticado,
+catálogo sincronizado a partir de um dump pequeno e uma PokeAPI falsa local
+"""
+import http.server
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Antes de importar a aplicação: tudo em um diretório temporário, nunca no banco real
+_TMP = tempfile.mkdtemp(prefix='pokeapi-testes-')
+os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(_TMP, 'pokeapi.db')}"
+os.environ['POKEAPI_CACHE_PATH'] = os.path.join(_TMP, 'pokeapi_cache.db')
+os.environ['CATALOGO_SNAPSHOT_DIR'] = os.path.join(_TMP, 'snapshots')
+os.environ['POKEMON_DETALHES_DIR'] = os.path.join(_TMP, 'detalhes')
+os.environ['JWT_SECRET_KEY'] = 'chave-dos-testes-com-mais-de-32-bytes'
+os.environ.setdefault('POKEAPI_BACKOFF', '0')
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from flask_jwt_extended import create_access_token
+
+from app import app as aplicacao
+from models import db, Usuario
+import analise_equipe
+import catalog
+import estado_usuario
+import tipos
+from pokeapi_cache import cache as cache_pokeapi
+from sync_catalog import FonteDiretorio, sincronizar_catalogo
+
+POKEAPI_BASE = 'https://pokeapi.co/api/v2'
+
+# Dump mínimo: (nome, tipos, geração)
+POKEMONS_DUMP = [
+    ('bulbasaur', ['grass', 'poison'], 1), ('ivysaur', ['grass', 'poison'], 1),
+    ('venusaur', ['grass', 'poison'], 1), ('charmander', ['fire'], 1),
+    ('charmeleon', ['fire'], 1), ('charizard', ['fire', 'flying'], 1),
+    ('squirtle', ['water'], 1), ('wartortle', ['water'], 1), ('blastoise', ['water'], 1),
+    ('pikachu', ['electric'], 1), ('raichu', ['electric'], 1), ('pichu', ['electric'], 2),
+]
+
+# atacante -> (superefetivo contra, pouco efetivo contra, sem efeito contra)
+RELACOES_DUMP = {
+    'normal': ([], [], []),
+    'fire': (['grass'], ['fire', 'water'], []),
+    'water': (['fire'], ['water', 'grass'], []),
+    'grass': (['water'], ['fire', 'grass', 'poison', 'flying'], []),
+    'electric': (['water', 'flying'], ['grass', 'electric'], []),
+    'poison': (['grass'], ['poison'], []),
+    'flying': (['grass'], ['electric'], []),
+}
+
+def escrever_dump(raiz):
+    """Grava um dump da PokeAPI (api/v2/<recurso>/<id>/index.json) com os dados acima"""
+    def gravar(recurso, id_recurso, dados):
+        pasta = os.path.join(raiz, 'api', 'v2', recurso, str(id_recurso))
+        os.makedirs(pasta, exist_ok=True)
+        with open(os.path.join(pasta, 'index.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo)
+
+    for i, (nome, (dobro, metade, nulo)) in enumerate(RELACOES_DUMP.items(), 1):
+        gravar('type', i, {'id': i, 'name': nome, 'damage_relations': {
+            'double_damage_to': [{'name': t} for t in dobro],
+            'half_damage_to': [{'name': t} for t in metade],
+            'no_damage_to': [{'name': t} for t in nulo],
+        }})
+    geracoes = {}
+    for i, (nome, tipos_pokemon, geracao) in enumerate(POKEMONS_DUMP, 1):
+        especie = {'name': nome, 'url': f"{POKEAPI_BASE}/pokemon-species/{i}/"}
+        geracoes.setdefault(geracao, []).append(especie)
+        gravar('pokemon', i, {
+            'id': i, 'name': nome, 'height': i, 'weight': 10 * i,
+            'sprites': {'front_default': f"https://img.pokedex/{i}.png"},
+            'types': [{'slot': s, 'type': {'name': t, 'url': f"{POKEAPI_BASE}/type/{t}/"}}
+                      for s, t in enumerate(tipos_pokemon, 1)],
+            'stats': [{'base_stat': 40 + i, 'effort': 0, 'stat': {'name': 'hp', 'url': f"{POKEAPI_BASE}/stat/1/"}}],
+            'species': especie,
+        })
+    for geracao, especies in geracoes.items():
+        gravar('generation', geracao, {'id': geracao, 'pokemon_species': especies})
+    return raiz
+
+def limpar_caches():
+    """Zera os caches em memória por processo e os diretórios gerados"""
+    catalog._versao_lida_em = None
+    catalog._indices = None
+    catalog._indice_pokeapi = None
+    analise_equipe._matriz = None
+    estado_usuario._cache.limpar()
+    tipos._tipos.clear()
+    cache_pokeapi.memoria.limpar()
+    if cache_pokeapi.disco is not None:
+        with cache_pokeapi.disco._conexao() as conn:
+            conn.execute("DELETE FROM cache")
+            conn.execute("DELETE FROM lease")
+            conn.commit()
+    for pasta in (catalog.CATALOGO_SNAPSHOT_DIR, os.environ['POKEMON_DETALHES_DIR']):
+        shutil.rmtree(pasta, ignore_errors=True)
+
+@pytest.fixture(scope='session')
+def app():
+    aplicacao.config['TESTING'] = True
+    return aplicacao
+
+@pytest.fixture(autouse=True)
+def banco_limpo(app):
+    """Cada teste começa com o banco vazio e os caches limpos"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    limpar_caches()
+    yield
+    with app.app_context():
+        db.session.remove()
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+def criar_usuario(app, login='ash', role='user'):
+    with app.app_context():
+        usuario = Usuario(Nome=login.capitalize(), Login=login, Email=f"{login}@pokedex.com",
+                          Senha=generate_password_hash('pikachu'), Role=role)
+        db.session.add(usuario)
+        db.session.commit()
+        token = create_access_token(identity=str(usuario.IDUsuario))
+        return SimpleNamespace(id=usuario.IDUsuario, headers={'Authorization': f"Bearer {token}"})
+
+@pytest.fixture
+def usuario(app):
+    """Usuário comum já autenticado: .id e .headers (Authorization)"""
+    return criar_usuario(app)
+
+@pytest.fixture
+def catalogo(app, tmp_path):
+    """Catálogo local sincronizado a partir do dump de teste"""
+    raiz = escrever_dump(str(tmp_path / 'dump'))
+    with app.app_context():
+        assert sincronizar_catalogo(FonteDiretorio(raiz), raiz, caminho_checkpoint=str(tmp_path / 'checkpoint'))
+    # A versão publicada é lida de novo na próxima consulta
+    catalog._versao_lida_em = None
+    return raiz
+
+@contextmanager
+def registrar_consultas(engine):
+    """Lista com o SQL de cada comando executado no engine dentro do bloco"""
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        yield consultas
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+
+@pytest.fixture
+def consultas(app):
+    """Context manager que registra as consultas SQL da aplicação"""
+    def contexto():
+        with app.app_context():
+            engine = db.engine
+        return registrar_consultas(engine)
+    return contexto
+
+class _HandlerPokeAPI(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        servidor = self.server.pokeapi
+        caminho = self.path.split('?', 1)[0].rstrip('/')
+        with servidor.lock:
+            servidor.hits[caminho] = servidor.hits.get(caminho, 0) + 1
+            servidor.conexoes.add(self.client_address)
+            respostas = servidor.rotas.get(caminho)
+            if isinstance(respostas, list):
+                resposta = respostas.pop(0) if len(respostas) > 1 else respostas[0]
+            else:
+                resposta = respostas
+        if callable(resposta):
+            resposta = resposta(self)
+        status, corpo, headers = resposta if resposta is not None else (404, None, {})
+        dados = json.dumps(corpo).encode() if corpo is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in headers.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def pokeapi_falsa():
+    """Servidor HTTP local no lugar da PokeAPI.
+
+    `rotas[caminho]` é (status, corpo JSON, cabeçalhos), uma lista delas (uma
+    por requisição, a última se repete) ou uma função que recebe o handler;
+    `hits[caminho]` conta as requisições e `conexoes` os sockets de origem.
+    """
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _HandlerPokeAPI)
+    servidor.daemon_threads = True
+    servidor.pokeapi = SimpleNamespace(
+        url=f"http://127.0.0.1:{servidor.server_port}", rotas={}, hits={}, conexoes=set(), lock=threading.Lock()
+    )
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor.pokeapi
+    servidor.shutdown()
+    servidor.server_close()
@@ -0,0 +1,118 @@
+"""
+Análise de equipes: cálculo vetorizado da matriz de efetividade comparado a um cálculo membro a membro,
+e as rotas /user-pokemon/equipe/analise
+"""
+import itertools
+import json
+import random
+import numpy as np
+import pytest
+from analise_equipe import MatrizTipos, ranking
+from conftest import RELACOES_DUMP
+
+# As relações do dump mais um tipo com imunidades nos dois sentidos
+RELACOES = {
+    **{tipo: {'double_damage_to': s, 'half_damage_to': p, 'no_damage_to': n}
+       for tipo, (s, p, n) in RELACOES_DUMP.items()},
+    'ghost': {'double_damage_to': ['ghost'], 'half_damage_to': [], 'no_damage_to': ['normal']},
+}
+RELACOES['normal'] = {'double_damage_to': [], 'half_damage_to': [], 'no_damage_to': ['ghost']}
+
+@pytest.fixture(scope='module')
+def matriz():
+    return MatrizTipos(1, [(nome, json.dumps(relacoes)) for nome, relacoes in RELACOES.items()])
+
+def efetividade(atacante, defensor):
+    relacoes = RELACOES[atacante]
+    if defensor in relacoes['double_damage_to']:
+        return 2.0
+    if defensor in relacoes['half_damage_to']:
+        return 0.5
+    if defensor in relacoes['no_damage_to']:
+        return 0.0
+    return 1.0
+
+def perfil_ingenuo(membros):
+    """Mesmo perfil de MatrizTipos.perfis, membro a membro e tipo a tipo"""
+    tipos = list(RELACOES)
+    danos = {a: [np.prod([efetividade(a, t) for t in m]) for m in membros] for a in tipos}
+    fracos = [sum(d > 1 for d in danos[a]) for a in tipos]
+    resistentes = [sum(d < 1 for d in danos[a]) for a in tipos]
+    imunes = [sum(d == 0 for d in danos[a]) for a in tipos]
+    cobertura = [max(efetividade(t, d) for m in membros for t in m) for d in tipos]
+    pontuacao = sum(c > 1 for c in cobertura) - sum(f > r for f, r in zip(fracos, resistentes))
+    return fracos, resistentes, imunes, cobertura, pontuacao
+
+def test_perfis_vetorizados_iguais_ao_calculo_ingenuo(matriz):
+    sorteio = random.Random(25)
+    combinacoes = [(t,) for t in RELACOES] + list(itertools.combinations(RELACOES, 2))
+    equipes = [[sorteio.choice(combinacoes) for _ in range(sorteio.randint(1, 6))] for _ in range(200)]
+
+    perfis = matriz.perfis(matriz.codificar(equipes, 6))
+
+    for e, membros in enumerate(equipes):
+        fracos, resistentes, imunes, cobertura, pontuacao = perfil_ingenuo(membros)
+        assert perfis['fracos'][e].tolist() == fracos
+        assert perfis['resistentes'][e].tolist() == resistentes
+        assert perfis['imunes'][e].tolist() == imunes
+        assert perfis['cobertura'][e].tolist() == cobertura
+        assert perfis['pontuacao'][e] == pontuacao
+
+def test_tipo_desconhecido_e_neutro(matriz):
+    perfis = matriz.perfis(matriz.codificar([[('water',)], [('water', 'shadow')]], 6))
+    for chave in ('fracos', 'resistentes', 'imunes', 'cobertura'):
+        assert perfis[chave][0].tolist() == perfis[chave][1].tolist()
+
+def test_ranking_estavel_por_pontuacao():
+    perfis = {'pontuacao': np.array([1, 3, 1, 3, 0])}
+    assert ranking(perfis) == [1, 3, 0, 2, 4]
+    assert ranking(perfis, 2) == [1, 3]
+
+def pontuar(cliente, usuario, equipes, **extra):
+    return cliente.post('/user-pokemon/equipe/analise', headers=usuario.headers, json={'equipes': equipes, **extra})
+
+def test_pontuar_equipes_em_ordem(cliente, usuario, catalogo):
+    equipes = [['charmander'], ['squirtle', 'pikachu', 'bulbasaur'], ['7', 'Raichu']]
+
+    resp = pontuar(cliente, usuario, equipes)
+
+    assert resp.status_code == 200
+    resultado = resp.get_json()
+    assert [r['indice'] for r in resultado] == [1, 2, 0]
+    assert resultado[0]['equipe'] == equipes[1]
+    assert resultado[0]['superEfetivo'] == ['fire', 'water', 'grass', 'flying']
+    assert [r['pontuacao'] for r in resultado] == sorted((r['pontuacao'] for r in resultado), reverse=True)
+    assert len(pontuar(cliente, usuario, equipes, limite=1).get_json()) == 1
+
+@pytest.mark.parametrize('equipes', [
+    [], [[]], [['pikachu'] * 7], [[{'nome': 'pikachu'}]], 'pikachu',
+])
+def test_equipes_invalidas(cliente, usuario, catalogo, equipes):
+    assert pontuar(cliente, usuario, equipes).status_code == 400
+
+@pytest.mark.parametrize('codigo', ['mewtwo', '²', '999'])
+def test_pokemon_fora_do_catalogo(cliente, usuario, catalogo, codigo):
+    resp = pontuar(cliente, usuario, [['pikachu', codigo]])
+    assert resp.status_code == 400
+    assert codigo in resp.get_json()['msg']
+
+def test_sem_catalogo_de_tipos(cliente, usuario):
+    assert pontuar(cliente, usuario, [['pikachu']]).status_code == 503
+
+def test_analise_da_equipe_do_usuario(cliente, usuario, catalogo):
+    for codigo, numero in (('squirtle', 7), ('charizard', 6)):
+        cliente.post('/user-pokemon/equipe', headers=usuario.headers, json={
+            'codigo': codigo, 'nome': codigo.capitalize(), 'imagem': f"https://img.pokedex/{numero}.png"
+        })
+
+    resp = cliente.get('/user-pokemon/equipe/analise', headers=usuario.headers)
+
+    assert resp.status_code == 200
+    analise = resp.get_json()
+    assert analise['membros'] == [{'codigo': 'squirtle', 'tipos': ['water']},
+                                  {'codigo': 'charizard', 'tipos': ['fire', 'flying']}]
+    # Elétrico acerta os dois com superefetivo e nenhum resiste
+    assert analise['fraquezas'][0] == {'tipo': 'electric', 'fracos': 2, 'resistentes': 0}
+    assert analise['fraquezasExpostas'] == ['electric']
+    assert analise['superEfetivo'] == ['fire', 'grass']
+    assert {'tipo': 'fire', 'resistentes': 2, 'imunes': 0} in analise['resistencias']
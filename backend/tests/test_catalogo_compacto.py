@@ -0,0 +1,91 @@
+"""
+Catálogo compacto: arrays paralelos, snapshot binário aberto com mmap e fragmentos JSON da listagem
+"""
+import json
+import pytest
+from flask import jsonify
+from catalogo_compacto import CatalogoCompacto
+from conftest import POKEMONS_DUMP
+
+LINHAS = [
+    # (id, nome, imagem, tipos, geração) fora de ordem, como podem vir do banco
+    (25, 'pikachu', 'https://img.pokedex/25.png', 'electric', 1),
+    (6, 'charizard', 'https://img.pokedex/6.png', 'fire,flying', 1),
+    (172, 'pichu', None, 'electric', 2),
+    (1008, 'miraidon', 'https://img.pokedex/1008.png', None, None),
+    (29, 'nidoran-♀', 'https://img.pokedex/29.png', 'poison', 1),
+]
+
+@pytest.fixture(params=['memoria', 'mmap'])
+def compacto(request, tmp_path):
+    catalogo = CatalogoCompacto.de_linhas(7, LINHAS)
+    if request.param == 'mmap':
+        caminho = str(tmp_path / 'snapshot' / 'catalogo.bin')
+        catalogo.salvar(caminho)
+        catalogo = CatalogoCompacto.abrir(caminho)
+    return catalogo
+
+def test_consultas_por_posicao(compacto):
+    assert compacto.versao == 7
+    assert len(compacto) == 5
+    assert list(compacto.ids) == [6, 25, 29, 172, 1008]
+
+    i = compacto.posicao(6)
+    assert (compacto.nome(i), compacto.tipos(i), compacto.geracao(i)) == ('charizard', ('fire', 'flying'), 1)
+    i = compacto.posicao(29)
+    assert compacto.nome(i) == 'nidoran-♀'
+    i = compacto.posicao(172)
+    assert (compacto.nome(i), compacto.geracao(i)) == ('pichu', 2)
+    assert json.loads(compacto.json_listagem(i, False, False))['imagem'] is None
+    i = compacto.posicao(1008)
+    assert (compacto.tipos(i), compacto.geracao(i)) == ((), None)
+
+def test_id_fora_do_catalogo(compacto):
+    assert compacto.posicao(7) is None
+    assert compacto.posicao(0) is None
+    assert compacto.posicao(2000) is None
+
+@pytest.mark.parametrize('favorito, equipe', [(False, False), (True, False), (False, True), (True, True)])
+def test_json_listagem_igual_ao_jsonify(app, compacto, favorito, equipe):
+    i = compacto.posicao(29)
+    esperado = {'id': 29, 'nome': 'nidoran-♀', 'imagem': 'https://img.pokedex/29.png',
+                'favorito': favorito, 'equipe': equipe}
+    fragmento = compacto.json_listagem(i, favorito, equipe)
+    assert json.loads(fragmento) == esperado
+    with app.app_context():
+        assert fragmento == app.json.dumps(esperado, separators=(',', ':'), sort_keys=True).encode()
+
+@pytest.mark.parametrize('url, ids', [
+    ('/pokemon?limit=100', list(range(1, len(POKEMONS_DUMP) + 1))), ('/pokemon?nome=char&limit=2', [4, 5]),
+    ('/pokemon?geracao=2', [12]), ('/pokemon?id=7', [7]),
+])
+def test_listagem_da_rota_igual_ao_jsonify(app, cliente, usuario, catalogo, url, ids):
+    for lista, codigo in (('favoritos', 'charmander'), ('favoritos', 'squirtle'), ('equipe', 'squirtle')):
+        cliente.post(f"/user-pokemon/{lista}", headers=usuario.headers,
+                     json={'codigo': codigo, 'nome': codigo, 'imagem': 'https://img.pokedex/x.png'})
+
+    resp = cliente.get(url, headers=usuario.headers)
+
+    assert resp.status_code == 200
+    esperado = [{'id': i, 'nome': POKEMONS_DUMP[i - 1][0], 'imagem': f"https://img.pokedex/{i}.png",
+                 'favorito': i in (4, 7), 'equipe': i == 7} for i in ids]
+    with app.test_request_context():
+        referencia = jsonify(esperado)
+    assert resp.get_data() == referencia.get_data()
+    assert resp.mimetype == referencia.mimetype
+
+def test_snapshot_com_magic_invalido():
+    dados = bytearray(CatalogoCompacto.serializar(1, LINHAS))
+    dados[:8] = b'PKCAT001'
+    with pytest.raises(ValueError):
+        CatalogoCompacto(bytes(dados))
+
+def test_snapshot_truncado():
+    dados = CatalogoCompacto.serializar(1, LINHAS)
+    with pytest.raises(ValueError):
+        CatalogoCompacto(dados[:len(dados) // 2])
+
+def test_catalogo_vazio():
+    vazio = CatalogoCompacto.de_linhas(1, [])
+    assert len(vazio) == 0
+    assert vazio.posicao(1) is None
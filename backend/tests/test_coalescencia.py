@@ -0,0 +1,89 @@
+"""
+Coalescência de buscas idênticas: entre threads (single-flight) e entre workers (leases no cache em disco)
+"""
+import json
+import os
+import threading
+import time
+import pytest
+import requests
+import pokeapi_client
+from conftest import criar_usuario
+from pokeapi_cache import Entrada
+
+def test_threads_simultaneas_fazem_uma_unica_requisicao(pokeapi_falsa):
+    def lenta(handler):
+        time.sleep(0.3)
+        return 200, {'id': 25}, {}
+    pokeapi_falsa.rotas['/pokemon/25'] = lenta
+    url = f"{pokeapi_falsa.url}/pokemon/25"
+    largada = threading.Barrier(8)
+    resultados = []
+
+    def buscar():
+        largada.wait()
+        resultados.append(pokeapi_client.buscar_json(url))
+
+    threads = [threading.Thread(target=buscar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert resultados == [{'id': 25}] * 8
+    assert pokeapi_falsa.hits['/pokemon/25'] == 1
+
+def test_espera_o_worker_dono_do_lease_sem_liberar_o_lease_dele(pokeapi_falsa):
+    url = f"{pokeapi_falsa.url}/pokemon/25"
+    disco = pokeapi_client.cache.disco
+    assert disco.adquirir_lease(url, 5, 'outro-worker')
+
+    def outro_worker():
+        time.sleep(0.2)
+        entrada = Entrada({'id': 25}, time.time() + 60)
+        disco.set(url, entrada, json.dumps(entrada.dados))
+    threading.Thread(target=outro_worker).start()
+
+    assert pokeapi_client.buscar_json(url) == {'id': 25}
+    assert '/pokemon/25' not in pokeapi_falsa.hits
+    # O lease continua do outro worker até ele mesmo liberar
+    assert disco.lease_ativo(url)
+    disco.liberar_lease(url, 'outro-worker')
+    assert not disco.lease_ativo(url)
+
+def test_liberar_lease_so_apaga_o_do_proprio_dono():
+    cache = pokeapi_client.cache
+    url = 'https://pokeapi.co/api/v2/pokemon/1'
+    vencido = cache.adquirir_lease(url, 0.01)
+    time.sleep(0.05)
+    atual = cache.adquirir_lease(url, 5)
+    assert vencido and atual and vencido != atual
+    assert cache.adquirir_lease(url, 5) is None
+
+    cache.liberar_lease(url, vencido)
+    assert cache.disco.lease_ativo(url)
+    cache.liberar_lease(url, atual)
+    assert not cache.disco.lease_ativo(url)
+
+def test_lease_e_liberado_mesmo_quando_a_busca_falha(pokeapi_falsa):
+    url = f"{pokeapi_falsa.url}/pokemon/1"
+    pokeapi_falsa.rotas['/pokemon/1'] = (500, None, {})
+
+    with pytest.raises(requests.HTTPError):
+        pokeapi_client.buscar_json(url)
+    assert not pokeapi_client.cache.disco.lease_ativo(url)
+
+def test_estatisticas_para_administradores(app, cliente, usuario, pokeapi_falsa):
+    pokeapi_falsa.rotas['/pokemon/1'] = (200, {'id': 1}, {})
+    pokeapi_client.buscar_json(f"{pokeapi_falsa.url}/pokemon/1")
+    pokeapi_client.buscar_json(f"{pokeapi_falsa.url}/pokemon/1")
+    admin = criar_usuario(app, login='oak', role='admin')
+
+    resp = cliente.get('/pokemon/pokeapi/estatisticas', headers=admin.headers)
+
+    assert resp.status_code == 200
+    stats = resp.get_json()
+    assert stats['pid'] == os.getpid()
+    assert {'requisicoes', 'pool_hits', 'pool_misses', 'deduplicadas_processo', 'deduplicadas_workers'} <= set(stats)
+    assert stats['cache']['hits_memoria'] >= 1
+    assert cliente.get('/pokemon/pokeapi/estatisticas', headers=usuario.headers).status_code == 403
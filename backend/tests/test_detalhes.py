@@ -0,0 +1,69 @@
+"""
+/pokemon/<codigo>: detalhes servidos dos arquivos pré-gerados pelo sync_catalog, comprimidos conforme o Accept-Encoding
+"""
+import gzip
+import json
+import os
+import detalhes
+from detalhes import caminho_detalhe, gravar_detalhes
+
+def buscar(cliente, url, headers):
+    resp = cliente.get(url, headers=headers)
+    try:
+        return resp.status_code, resp.headers, resp.get_data()
+    finally:
+        resp.close()
+
+def test_detalhe_em_gzip(cliente, usuario, catalogo):
+    status, headers, corpo = buscar(cliente, '/pokemon/6', {**usuario.headers, 'Accept-Encoding': 'gzip'})
+
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in headers['Vary']
+    assert headers['Content-Type'] == 'application/json'
+    dados = json.loads(gzip.decompress(corpo))
+    assert (dados['id'], dados['name']) == (6, 'charizard')
+    assert [t['type']['name'] for t in dados['types']] == ['fire', 'flying']
+    assert dados['sprites'] == {'front_default': 'https://img.pokedex/6.png'}
+
+def test_nome_do_arquivo_e_o_json(cliente, usuario, catalogo):
+    _, headers, _ = buscar(cliente, '/pokemon/6', {**usuario.headers, 'Accept-Encoding': 'gzip'})
+    assert headers['Content-Disposition'] == 'inline; filename=6.json'
+
+def test_sem_compressao_quando_gzip_recusado(cliente, usuario, catalogo):
+    status, headers, corpo = buscar(cliente, '/pokemon/pikachu', {**usuario.headers, 'Accept-Encoding': 'gzip;q=0'})
+
+    assert status == 200
+    assert 'Content-Encoding' not in headers
+    assert json.loads(corpo)['id'] == 10
+
+def test_busca_por_nome_igual_a_por_numero(cliente, usuario, catalogo):
+    assert buscar(cliente, '/pokemon/Pikachu', usuario.headers)[2] == buscar(cliente, '/pokemon/10', usuario.headers)[2]
+
+def test_revalidacao_com_etag(cliente, usuario, catalogo):
+    cabecalhos = {**usuario.headers, 'Accept-Encoding': 'gzip'}
+    _, headers, _ = buscar(cliente, '/pokemon/7', cabecalhos)
+
+    status, _, corpo = buscar(cliente, '/pokemon/7', {**cabecalhos, 'If-None-Match': headers['ETag']})
+
+    assert status == 304
+    assert corpo == b''
+
+def test_codigo_invalido(cliente, usuario, catalogo):
+    assert buscar(cliente, '/pokemon/pika%20chu', usuario.headers)[0] == 400
+    assert buscar(cliente, '/pokemon/' + 'a' * 51, usuario.headers)[0] == 400
+
+def ler_arquivo(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+def test_detalhes_sem_mudanca_nao_sao_regravados(catalogo):
+    dados = json.loads(ler_arquivo(caminho_detalhe(1)))
+    antes = {c: os.stat(caminho_detalhe(1, c)).st_mtime_ns for c in (None, *detalhes.codificacoes_disponiveis())}
+
+    assert gravar_detalhes([dados]) == 0
+    assert {c: os.stat(caminho_detalhe(1, c)).st_mtime_ns for c in antes} == antes
+
+    dados['weight'] += 1
+    assert gravar_detalhes([dados]) == 1
+    assert json.loads(gzip.decompress(ler_arquivo(caminho_detalhe(1, 'gzip'))))['weight'] == dados['weight']
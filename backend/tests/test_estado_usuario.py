@@ -0,0 +1,68 @@
+"""
+Favoritos/equipe por usuário em memória: /pokemon só lê PokemonUsuario quando a revisão do usuário muda
+"""
+import estado_usuario
+from conftest import criar_usuario
+from http_cache import incrementar_revisao
+from models import db, PokemonUsuario
+
+def listar(cliente, consultas, headers):
+    with consultas() as executadas:
+        resp = cliente.get('/pokemon?geracao=1', headers=headers)
+    assert resp.status_code == 200
+    return {p['nome']: (p['favorito'], p['equipe']) for p in resp.get_json()}, executadas
+
+def leituras_de_pokemonusuario(executadas):
+    return sum('FROM pokemonusuario' in sql for sql in executadas)
+
+def test_segunda_listagem_nao_consulta_pokemonusuario(cliente, usuario, catalogo, consultas):
+    _, primeira = listar(cliente, consultas, usuario.headers)
+    _, segunda = listar(cliente, consultas, usuario.headers)
+
+    assert leituras_de_pokemonusuario(primeira) == 1
+    assert leituras_de_pokemonusuario(segunda) == 0
+
+def test_flags_acompanham_favoritos_e_equipe(cliente, usuario, catalogo, consultas):
+    listar(cliente, consultas, usuario.headers)
+    cliente.post('/user-pokemon/favoritos', headers=usuario.headers, json={
+        'codigo': 'pikachu', 'nome': 'Pikachu', 'imagem': 'https://img.pokedex/10.png'
+    })
+    cliente.post('/user-pokemon/equipe', headers=usuario.headers, json={
+        'codigo': 'squirtle', 'nome': 'Squirtle', 'imagem': 'https://img.pokedex/7.png'
+    })
+
+    flags, executadas = listar(cliente, consultas, usuario.headers)
+
+    assert leituras_de_pokemonusuario(executadas) == 1
+    assert flags['pikachu'] == (True, False)
+    assert flags['squirtle'] == (False, True)
+    assert flags['bulbasaur'] == (False, False)
+
+    cliente.delete('/user-pokemon/favoritos/pikachu', headers=usuario.headers)
+    flags, _ = listar(cliente, consultas, usuario.headers)
+    assert flags['pikachu'] == (False, False)
+
+def test_escrita_de_outro_worker_invalida_pela_revisao(app, cliente, usuario, catalogo, consultas):
+    listar(cliente, consultas, usuario.headers)
+    assert estado_usuario._cache.get(usuario.id) is not None
+    # Outro processo grava direto no banco: o cache deste não é avisado, mas a revisão muda
+    with app.app_context():
+        db.session.add(PokemonUsuario(IDUsuario=usuario.id, Codigo='charmander', Nome='Charmander',
+                                      ImagemUrl='https://img.pokedex/4.png', Favorito=True, GrupoBatalha=False))
+        incrementar_revisao(usuario.id)
+        db.session.commit()
+
+    flags, _ = listar(cliente, consultas, usuario.headers)
+    assert flags['charmander'] == (True, False)
+
+def test_estado_separado_por_usuario(app, cliente, usuario, catalogo, consultas):
+    outro = criar_usuario(app, login='misty')
+    cliente.post('/user-pokemon/favoritos', headers=outro.headers, json={
+        'codigo': 'squirtle', 'nome': 'Squirtle', 'imagem': 'https://img.pokedex/7.png'
+    })
+
+    flags_outro, _ = listar(cliente, consultas, outro.headers)
+    flags, _ = listar(cliente, consultas, usuario.headers)
+
+    assert flags_outro['squirtle'] == (True, False)
+    assert flags['squirtle'] == (False, False)
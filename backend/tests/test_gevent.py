@@ -0,0 +1,70 @@
+"""
+Workers gevent: com o gunicorn.conf.py carregado, milhares de esperas pela PokeAPI cabem em
+poucas threads do sistema e continuam passando pelo cache, single-flight e pool keep-alive
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import pytest
+
+pytest.importorskip('gevent')
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Roda num processo separado: o monkey patch não pode vazar para os outros testes
+SCRIPT = """
+import json, os, runpy, sys, time
+runpy.run_path(os.path.join(sys.argv[1], 'gunicorn.conf.py'))
+from gevent import monkey
+if not monkey.is_module_patched('socket'):
+    print(json.dumps({'patch': False}))
+    sys.exit()
+import gevent
+sys.path.insert(0, sys.argv[1])
+import pokeapi_client
+url, total = sys.argv[2], int(sys.argv[3])
+inicio = time.monotonic()
+# Metade das buscas repete uma URL: o single-flight as junta
+greenlets = [gevent.spawn(pokeapi_client.buscar_json, f"{url}/pokemon/{i if i % 2 else 0}") for i in range(total)]
+gevent.joinall(greenlets)
+print(json.dumps({
+    'patch': True,
+    'ok': sum(g.value is not None for g in greenlets),
+    'segundos': time.monotonic() - inicio,
+    'threads_sistema': len(os.listdir('/proc/self/task')),
+    'conexoes_cache': len(pokeapi_client.cache.disco._livres),
+    **pokeapi_client.estatisticas(),
+}))
+"""
+
+def rodar(tmp_path, classe, *args):
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=classe, POKEAPI_CACHE_PATH=str(tmp_path / 'cache.db'))
+    saida = subprocess.run([sys.executable, '-c', SCRIPT, BACKEND, *args], env=env, cwd=BACKEND,
+                           capture_output=True, text=True, timeout=60)
+    assert saida.returncode == 0, saida.stderr
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/task'), reason='conta as threads pelo /proc')
+def test_esperas_pela_pokeapi_nao_ocupam_threads(tmp_path, pokeapi_falsa):
+    def lenta(handler):
+        time.sleep(0.1)
+        return 200, {'id': 1}, {}
+    for i in range(400):
+        pokeapi_falsa.rotas[f"/pokemon/{i}"] = lenta
+
+    resultado = rodar(tmp_path, 'gevent', pokeapi_falsa.url, '400')
+
+    assert resultado['patch']
+    assert resultado['ok'] == 400
+    assert resultado['deduplicadas_processo'] == 199
+    assert pokeapi_falsa.hits['/pokemon/0'] == 1
+    # 201 buscas de 0,1 s em sequência levariam 20 s; em paralelo, limitadas pelo pool
+    assert resultado['segundos'] < 10
+    assert resultado['threads_sistema'] < 10
+    assert resultado['pool_misses'] <= int(os.getenv('POKEAPI_POOL_SIZE', 15))
+    assert resultado['conexoes_cache'] < 50
+
+def test_gthread_nao_aplica_o_monkey_patch(tmp_path):
+    assert rodar(tmp_path, 'gthread', 'http://127.0.0.1:1', '0') == {'patch': False}
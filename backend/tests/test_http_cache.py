@@ -0,0 +1,83 @@
+"""
+ETag e 304 Not Modified nas listagens: só revalida o que daria 200, e toda escrita do usuário muda a ETag
+"""
+import pytest
+from models import db, Usuario
+from conftest import criar_usuario
+
+def etag_de(cliente, usuario, url):
+    resp = cliente.get(url, headers=usuario.headers)
+    assert resp.status_code == 200
+    return resp.headers['ETag']
+
+def revalidar(cliente, usuario, url, etag):
+    return cliente.get(url, headers={**usuario.headers, 'If-None-Match': etag})
+
+def revisao(app, usuario):
+    with app.app_context():
+        return db.session.get(Usuario, usuario.id).RevisaoPokemon
+
+@pytest.mark.parametrize('url', ['/pokemon', '/pokemon?nome=char&limit=2', '/pokemon?id=6',
+                                 '/user-pokemon/favoritos', '/user-pokemon/equipe'])
+def test_304_quando_a_etag_bate(cliente, usuario, catalogo, url):
+    etag = etag_de(cliente, usuario, url)
+
+    resp = revalidar(cliente, usuario, url, etag)
+
+    assert resp.status_code == 304
+    assert resp.get_data() == b''
+    assert resp.headers['ETag'] == etag
+
+@pytest.mark.parametrize('url', [
+    '/pokemon?cursor=lixo', '/pokemon?modo=xyz', '/pokemon?limit=abc', '/pokemon?id=99999',
+    '/pokemon?geracao=10', '/pokemon?offset=0&cursor=eyJpZCI6MSwicG9zIjoxfQ', '/pokemon?stream=xml',
+])
+def test_parametros_invalidos_nao_viram_304(cliente, usuario, catalogo, url):
+    # A ETag da listagem sem filtros é a mesma que esses parâmetros teriam se fossem aceitos
+    etag = etag_de(cliente, usuario, '/pokemon')
+
+    resp = revalidar(cliente, usuario, url, etag)
+
+    assert resp.status_code == 400
+    assert 'ETag' not in resp.headers
+
+def test_id_fora_do_catalogo_nao_vira_304(cliente, usuario, catalogo):
+    etag = etag_de(cliente, usuario, '/pokemon?id=6')
+
+    # 500 é um id válido, mas não está no catálogo de teste; charizard não tem "pika" no nome
+    for url in ('/pokemon?id=500', '/pokemon?id=6&nome=pika'):
+        resp = revalidar(cliente, usuario, url, etag)
+        assert resp.status_code == 404
+        assert 'ETag' not in resp.headers
+
+def pokemon(codigo, numero):
+    return {'codigo': codigo, 'nome': codigo.capitalize(), 'imagem': f"https://img.pokedex/{numero}.png"}
+
+@pytest.mark.parametrize('metodo, url, corpo', [
+    ('post', '/user-pokemon/favoritos', pokemon('pikachu', 10)),
+    ('post', '/user-pokemon/equipe', pokemon('pikachu', 10)),
+    ('delete', '/user-pokemon/favoritos/bulbasaur', None),
+    ('delete', '/user-pokemon/equipe/bulbasaur', None),
+    ('post', '/user-pokemon/batch', {'operacoes': [
+        {'acao': 'remover', 'lista': 'favoritos', 'codigo': 'bulbasaur'},
+        {'acao': 'adicionar', 'lista': 'equipe', **pokemon('squirtle', 7)},
+    ]}),
+])
+def test_escritas_mudam_a_etag(app, cliente, usuario, catalogo, metodo, url, corpo):
+    for lista in ('favoritos', 'equipe'):
+        cliente.post(f"/user-pokemon/{lista}", headers=usuario.headers, json=pokemon('bulbasaur', 1))
+    antes = revisao(app, usuario)
+    etags = {u: etag_de(cliente, usuario, u) for u in ('/pokemon', '/user-pokemon/favoritos', '/user-pokemon/equipe')}
+
+    resp = getattr(cliente, metodo)(url, headers=usuario.headers, json=corpo)
+
+    assert resp.status_code in (200, 201)
+    assert revisao(app, usuario) == antes + 1
+    for u, etag in etags.items():
+        assert revalidar(cliente, usuario, u, etag).status_code == 200
+
+def test_etag_e_por_usuario(app, cliente, usuario, catalogo):
+    outro = criar_usuario(app, 'misty')
+    etag = etag_de(cliente, usuario, '/user-pokemon/favoritos')
+
+    assert revalidar(cliente, outro, '/user-pokemon/favoritos', etag).status_code == 200
@@ -0,0 +1,87 @@
+"""
+Índices de pokemonusuario: as consultas das rotas usam os índices parciais (EXPLAIN QUERY PLAN)
+e o migrate_db cria/recria os índices declarados nos modelos
+"""
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from migrate_db import migrate_database
+from models import db, PokemonUsuario
+
+def inserir(user_id, codigo, favorito=False, equipe=False, tipo=None):
+    db.session.add(PokemonUsuario(IDUsuario=user_id, IDTipoPokemon=tipo, Codigo=codigo, Nome=codigo.capitalize(),
+                                  ImagemUrl=f"https://img.pokedex/{codigo}.png", Favorito=favorito,
+                                  GrupoBatalha=equipe))
+
+def planos_das_consultas(app, cliente, metodo, url, headers):
+    """Faz a requisição e devolve o EXPLAIN QUERY PLAN de cada SELECT em pokemonusuario que ela executou"""
+    executadas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'pokemonusuario' in statement:
+            executadas.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        resp = getattr(cliente, metodo)(url, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+    assert resp.status_code in (200, 304)
+
+    with engine.connect() as conn:
+        return [
+            ' | '.join(linha[-1] for linha in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params).all())
+            for sql, params in executadas
+        ]
+
+@pytest.fixture
+def pokemons_do_usuario(app, usuario):
+    outro = usuario.id + 1000
+    with app.app_context():
+        for i in range(30):
+            inserir(usuario.id, f"poke{i}", favorito=i % 3 == 0, equipe=i < 6, tipo=1)
+            inserir(outro, f"poke{i}", favorito=True, tipo=1)
+        db.session.commit()
+    return usuario
+
+def test_listagem_de_favoritos_usa_o_indice_parcial(app, cliente, pokemons_do_usuario):
+    planos = planos_das_consultas(app, cliente, 'get', '/user-pokemon/favoritos', pokemons_do_usuario.headers)
+    assert any('USING INDEX ix_pokemonusuario_favorito' in plano for plano in planos), planos
+
+def test_listagem_da_equipe_usa_o_indice_parcial(app, cliente, pokemons_do_usuario):
+    planos = planos_das_consultas(app, cliente, 'get', '/user-pokemon/equipe', pokemons_do_usuario.headers)
+    assert any('USING INDEX ix_pokemonusuario_equipe' in plano for plano in planos), planos
+
+def test_tipos_pendentes_usam_o_indice_parcial(app, usuario):
+    with app.app_context():
+        consulta = db.session.query(PokemonUsuario.Codigo).filter(PokemonUsuario.IDTipoPokemon.is_(None)) \
+            .distinct().statement.compile(db.engine)
+        plano = db.session.execute(text(f"EXPLAIN QUERY PLAN {consulta}")).all()
+    assert any('ix_pokemonusuario_tipo_pendente' in linha[-1] for linha in plano), plano
+
+def test_codigo_e_unico_por_usuario(app, usuario):
+    with app.app_context():
+        inserir(usuario.id, 'pikachu', favorito=True)
+        db.session.commit()
+        inserir(usuario.id, 'pikachu', equipe=True)
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+def test_migracao_recria_indice_parcial_com_predicado_antigo(app):
+    with app.app_context():
+        engine = db.engine
+    with engine.begin() as conn:
+        conn.exec_driver_sql('DROP INDEX ix_pokemonusuario_favorito')
+        conn.exec_driver_sql('CREATE INDEX ix_pokemonusuario_favorito ON pokemonusuario ("IDUsuario") '
+                             'WHERE "Favorito" = 1')
+
+    assert migrate_database()
+
+    with engine.connect() as conn:
+        sql = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE name = 'ix_pokemonusuario_favorito'"
+        ).scalar()
+    assert sql.endswith('WHERE "Favorito" IS 1')
@@ -0,0 +1,53 @@
+"""
+/pokemon sem catálogo local: listagem direto da PokeAPI, com o cursor avançando pelos ids pedidos
+mesmo quando o detalhe de algum Pokémon falha
+"""
+import pytest
+import catalog
+import routes.pokemon
+from paginacao import decodificar_cursor
+
+NOMES = ['bulbasaur', 'ivysaur', 'venusaur', 'charmander', 'charmeleon']
+
+@pytest.fixture
+def pokeapi(pokeapi_falsa, monkeypatch):
+    url = f"{pokeapi_falsa.url}/pokemon"
+    monkeypatch.setattr(routes.pokemon, 'POKEAPI_URL', url)
+    monkeypatch.setattr(catalog, 'POKEAPI_URL', url)
+
+    def lista(handler):
+        params = dict(p.split('=') for p in handler.path.split('?', 1)[1].split('&'))
+        limit, offset = int(params['limit']), int(params['offset'])
+        pagina = [{'name': nome, 'url': f"{url}/{i}/"} for i, nome in enumerate(NOMES, 1)][offset:offset + limit]
+        return 200, {'results': pagina, 'next': 'mais' if offset + limit < len(NOMES) else None}, {}
+
+    pokeapi_falsa.rotas['/pokemon'] = lista
+    for i, nome in enumerate(NOMES, 1):
+        pokeapi_falsa.rotas[f"/pokemon/{i}"] = (200, {
+            'id': i, 'name': nome, 'sprites': {'front_default': f"https://img.pokedex/{i}.png"}
+        }, {})
+    # O detalhe do 2 falha em todas as tentativas
+    pokeapi_falsa.rotas['/pokemon/2'] = (500, None, {})
+    return pokeapi_falsa
+
+def listar(cliente, usuario, url):
+    resp = cliente.get(url, headers=usuario.headers)
+    assert resp.status_code == 200
+    return [p['id'] for p in resp.get_json()], resp.headers.get('X-Next-Cursor')
+
+def test_cursor_da_listagem_padrao_conta_o_pokemon_que_falhou(cliente, usuario, pokeapi):
+    ids, cursor = listar(cliente, usuario, '/pokemon?limit=3')
+
+    assert ids == [1, 3]
+    assert decodificar_cursor(cursor) == {'id': 3, 'pos': 3}
+    ids, cursor = listar(cliente, usuario, f"/pokemon?limit=3&cursor={cursor}")
+    assert (ids, cursor) == ([4, 5], None)
+
+def test_cursor_da_busca_por_nome_nao_repete_a_pagina(cliente, usuario, pokeapi):
+    # "saur": 1, 2, 3; a página de 2 pede 1 e 2, e o 2 falha
+    ids, cursor = listar(cliente, usuario, '/pokemon?nome=saur&limit=2')
+
+    assert ids == [1]
+    assert decodificar_cursor(cursor) == {'id': 2, 'pos': 2}
+    ids, cursor = listar(cliente, usuario, f"/pokemon?nome=saur&limit=2&cursor={cursor}")
+    assert (ids, cursor) == ([3], None)
@@ -0,0 +1,47 @@
+"""
+Listagens de favoritos e equipe: uma única consulta com o nome do tipo, qualquer que seja o tamanho da lista
+"""
+import pytest
+from models import db, PokemonUsuario, TipoPokemon
+
+def adicionar(app, user_id, quantidade, **marcacoes):
+    with app.app_context():
+        tipo = TipoPokemon.query.filter_by(Descricao='Electric').first() or TipoPokemon(Descricao='Electric')
+        db.session.add(tipo)
+        db.session.flush()
+        inicio = PokemonUsuario.query.filter_by(IDUsuario=user_id).count()
+        for i in range(inicio, inicio + quantidade):
+            db.session.add(PokemonUsuario(IDUsuario=user_id, IDTipoPokemon=tipo.IDTipoPokemon, Codigo=f"poke{i}",
+                                          Nome=f"Poke {i}", ImagemUrl=f"https://img.pokedex/{i}.png", **marcacoes))
+        db.session.commit()
+
+def consultas_da_listagem(cliente, consultas, url, headers):
+    with consultas() as executadas:
+        resp = cliente.get(url, headers=headers)
+    assert resp.status_code == 200
+    return resp.get_json(), executadas
+
+@pytest.mark.parametrize('url, marcacoes', [
+    ('/user-pokemon/favoritos', {'Favorito': True, 'GrupoBatalha': False}),
+    ('/user-pokemon/equipe', {'Favorito': False, 'GrupoBatalha': True}),
+])
+def test_numero_de_consultas_nao_cresce_com_a_lista(app, cliente, usuario, consultas, url, marcacoes):
+    adicionar(app, usuario.id, 1, **marcacoes)
+    poucos, consultas_poucos = consultas_da_listagem(cliente, consultas, url, usuario.headers)
+    adicionar(app, usuario.id, 5, **marcacoes)
+    muitos, consultas_muitos = consultas_da_listagem(cliente, consultas, url, usuario.headers)
+
+    assert (len(poucos), len(muitos)) == (1, 6)
+    assert len(consultas_muitos) == len(consultas_poucos)
+    assert sum('FROM pokemonusuario' in sql for sql in consultas_muitos) == 1
+    assert {p['tipo'] for p in muitos} == {'Electric'}
+
+def test_listagem_traz_pokemon_com_tipo_pendente(app, cliente, usuario):
+    with app.app_context():
+        db.session.add(PokemonUsuario(IDUsuario=usuario.id, Codigo='mew', Nome='Mew', ImagemUrl='https://img/151.png',
+                                      Favorito=True, GrupoBatalha=False))
+        db.session.commit()
+
+    resp = cliente.get('/user-pokemon/favoritos', headers=usuario.headers)
+
+    assert [(p['codigo'], p['tipo']) for p in resp.get_json()] == [('mew', None)]
@@ -0,0 +1,156 @@
+"""
+/user-pokemon/batch: várias inclusões/remoções numa transação, com resultado por item,
+limite da equipe contado ao longo do lote e número de consultas que não cresce com o lote
+"""
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+import routes.user_pokemon
+from models import db, PokemonUsuario
+from conftest import POKEMONS_DUMP
+
+def pokemon(codigo):
+    numero = [nome for nome, _, _ in POKEMONS_DUMP].index(codigo) + 1
+    return {'codigo': codigo, 'nome': codigo.capitalize(), 'imagem': f"https://img.pokedex/{numero}.png"}
+
+def op(acao, lista, codigo, **extra):
+    dados = pokemon(codigo) if acao == 'adicionar' else {'codigo': codigo}
+    return {'acao': acao, 'lista': lista, **dados, **extra}
+
+def lote(cliente, usuario, *operacoes):
+    return cliente.post('/user-pokemon/batch', headers=usuario.headers, json={'operacoes': list(operacoes)})
+
+def status(resp):
+    assert resp.status_code == 200
+    return [r['status'] for r in resp.get_json()['resultados']]
+
+def registros(app, user_id):
+    with app.app_context():
+        return {p.Codigo: (p.IDPokemonUsuario, p.Favorito, p.GrupoBatalha)
+                for p in PokemonUsuario.query.filter_by(IDUsuario=user_id)}
+
+def test_resultado_por_item(app, cliente, usuario, catalogo):
+    resp = lote(cliente, usuario,
+                op('adicionar', 'favoritos', 'pikachu'),
+                {'acao': 'trocar', 'lista': 'favoritos', 'codigo': 'raichu'},
+                op('adicionar', 'equipe', 'squirtle', imagem='ftp://img/7.png'),
+                {'acao': 'remover', 'lista': 'equipe'},
+                op('remover', 'favoritos', 'charmander'),
+                op('remover', 'equipe', 'pikachu'),
+                op('adicionar', 'favoritos', 'pikachu'))
+
+    resultados = resp.get_json()['resultados']
+    assert [r['status'] for r in resultados] == [201, 400, 400, 400, 404, 404, 201]
+    assert [r['indice'] for r in resultados] == list(range(7))
+    assert resultados[2]['msg'] == 'URL de imagem inválida'
+    assert {codigo: marcas for codigo, (_, *marcas) in registros(app, usuario.id).items()} == \
+        {'pikachu': [True, False]}
+
+@pytest.mark.parametrize('operacoes', [None, [], 'pikachu', [op('adicionar', 'favoritos', 'pikachu')] * 101])
+def test_lote_invalido(cliente, usuario, operacoes):
+    resp = cliente.post('/user-pokemon/batch', headers=usuario.headers, json={'operacoes': operacoes})
+    assert resp.status_code == 400
+
+def test_limite_da_equipe_conta_o_lote_inteiro(app, cliente, usuario, catalogo):
+    iniciais = ['bulbasaur', 'ivysaur', 'venusaur', 'charmander']
+    assert status(lote(cliente, usuario, *(op('adicionar', 'equipe', c) for c in iniciais))) == [201] * 4
+
+    resp = lote(cliente, usuario,
+                op('adicionar', 'equipe', 'charmeleon'),
+                op('adicionar', 'equipe', 'charizard'),
+                op('adicionar', 'equipe', 'squirtle'),
+                op('remover', 'equipe', 'bulbasaur'),
+                op('adicionar', 'equipe', 'wartortle'),
+                op('adicionar', 'equipe', 'blastoise'))
+
+    # A sétima não cabe; a remoção no meio do lote libera uma vaga para a seguinte
+    assert status(resp) == [201, 201, 400, 200, 201, 400]
+    equipe = {c for c, (_, _, na_equipe) in registros(app, usuario.id).items() if na_equipe}
+    assert equipe == {'ivysaur', 'venusaur', 'charmander', 'charmeleon', 'charizard', 'wartortle'}
+
+def test_adicionar_repetido_na_equipe_no_mesmo_lote(cliente, usuario, catalogo):
+    resp = lote(cliente, usuario, op('adicionar', 'equipe', 'pikachu'), op('adicionar', 'equipe', 'pikachu'))
+    assert status(resp) == [201, 400]
+
+def test_remover_e_adicionar_o_mesmo_pokemon_mantem_o_registro(app, cliente, usuario, catalogo, consultas):
+    lote(cliente, usuario, op('adicionar', 'favoritos', 'pikachu'), op('adicionar', 'equipe', 'squirtle'))
+    antes = registros(app, usuario.id)
+
+    with consultas() as executadas:
+        resp = lote(cliente, usuario,
+                    op('remover', 'favoritos', 'pikachu'), op('adicionar', 'favoritos', 'pikachu'),
+                    op('remover', 'equipe', 'squirtle'), op('adicionar', 'equipe', 'squirtle'))
+
+    assert status(resp) == [200, 201, 200, 201]
+    assert registros(app, usuario.id) == antes
+    assert not any(sql.lstrip().upper().startswith(('DELETE', 'INSERT')) for sql in executadas)
+
+def test_remover_de_todas_as_listas_apaga_o_registro(app, cliente, usuario, catalogo):
+    lote(cliente, usuario, op('adicionar', 'favoritos', 'pikachu'), op('adicionar', 'equipe', 'pikachu'))
+
+    resp = lote(cliente, usuario, op('remover', 'favoritos', 'pikachu'), op('remover', 'equipe', 'pikachu'))
+
+    assert status(resp) == [200, 200]
+    assert registros(app, usuario.id) == {}
+
+def test_trava_a_linha_do_usuario_antes_de_ler(app, cliente, usuario, catalogo):
+    comandos = []
+
+    def registrar(estado):
+        if estado.is_select:
+            comandos.append(str(estado.statement.compile(dialect=postgresql.dialect())))
+
+    event.listen(Session, 'do_orm_execute', registrar)
+    try:
+        lote(cliente, usuario, op('adicionar', 'equipe', 'pikachu'))
+    finally:
+        event.remove(Session, 'do_orm_execute', registrar)
+
+    # O SQLite ignora o FOR UPDATE; no PostgreSQL é o que serializa lotes concorrentes do mesmo usuário
+    leituras = [sql for sql in comandos if 'pokemonusuario' in sql or 'FOR UPDATE' in sql]
+    assert 'FROM usuario' in leituras[0] and leituras[0].rstrip().endswith('FOR UPDATE')
+    assert all('FOR UPDATE' not in sql for sql in leituras[1:])
+
+def test_conflito_com_outra_requisicao(app, cliente, usuario, catalogo, monkeypatch):
+    resolver = routes.user_pokemon.resolver_tipos
+
+    def inserir_antes(codigos):
+        # Outra requisição grava o mesmo pokémon entre a leitura do lote e o commit
+        with app.app_context():
+            engine = create_engine(db.engine.url)
+        with engine.begin() as conn:
+            conn.execute(insert(PokemonUsuario.__table__).values(
+                IDUsuario=usuario.id, Codigo='pikachu', Nome='Pikachu', ImagemUrl='https://img.pokedex/10.png',
+                Favorito=True, GrupoBatalha=False))
+        engine.dispose()
+        return resolver(codigos)
+
+    monkeypatch.setattr(routes.user_pokemon, 'resolver_tipos', inserir_antes)
+
+    resp = lote(cliente, usuario, op('adicionar', 'equipe', 'pikachu'), op('adicionar', 'favoritos', 'raichu'))
+
+    assert resp.status_code == 409
+    assert resp.get_json()['msg'] == routes.user_pokemon.MSG_CONFLITO
+    # Nada do lote foi gravado: só o registro da outra requisição
+    assert {c: marcas for c, (_, *marcas) in registros(app, usuario.id).items()} == {'pikachu': [True, False]}
+
+def test_numero_de_consultas_nao_cresce_com_o_lote(app, cliente, usuario, catalogo, consultas):
+    # Todos elétricos/água: o tipo já existe depois do primeiro lote
+    lote(cliente, usuario, op('adicionar', 'favoritos', 'pikachu'), op('adicionar', 'favoritos', 'squirtle'))
+
+    def executar(adicionar, remover):
+        with consultas() as executadas:
+            resp = lote(cliente, usuario, *(op('adicionar', 'favoritos', c) for c in adicionar),
+                        *(op('remover', 'favoritos', c) for c in remover))
+        assert set(status(resp)) <= {200, 201}
+        # O SQLite recebe um INSERT ... RETURNING por linha de um mesmo executemany
+        # (no PostgreSQL vira um só); repetições seguidas do mesmo comando contam uma vez
+        return [sql for i, sql in enumerate(executadas) if i == 0 or sql != executadas[i - 1]]
+
+    pequeno = executar(['raichu'], ['pikachu'])
+    grande = executar(['pikachu', 'pichu', 'wartortle', 'blastoise'], ['raichu', 'squirtle'])
+
+    assert len(grande) == len(pequeno)
+    assert sum(sql.startswith('INSERT') for sql in grande) == 1
+    assert sum(sql.startswith('DELETE') for sql in grande) == 1
@@ -0,0 +1,159 @@
+"""
+Índice de nomes: buscas por trecho, prefixo e aproximada comparadas a uma varredura de todos os nomes
+"""
+import random
+import string
+import pytest
+from name_index import IndiceNomes, distancia_edicao, MODOS_BUSCA, TAMANHO_NGRAMA
+from conftest import POKEMONS_DUMP
+
+NOMES = [nome for nome, _, _ in POKEMONS_DUMP] + [
+    'mew', 'mewtwo', 'mr-mime', 'nidoran-f', 'ho-oh', 'porygon-z', 'abra', 'kadabra', 'alakazam',
+    'muk', 'onix', 'jynx', 'xatu', 'eevee', 'ekans', 'unown',
+]
+
+@pytest.fixture(scope='module')
+def indice():
+    # Fora de ordem e com maiúsculas, como podem vir da PokeAPI
+    entradas = list(enumerate(NOMES, 1))
+    random.Random(6).shuffle(entradas)
+    return IndiceNomes([(str(i), nome.upper() if i % 5 == 0 else nome) for i, nome in entradas])
+
+def ids(*nomes):
+    return sorted(NOMES.index(nome) + 1 for nome in nomes)
+
+def levenshtein(a, b):
+    """Distância de edição sem limite, para conferir distancia_edicao"""
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = atual
+    return anterior[-1]
+
+def aproximado_ingenuo(termo):
+    """Mesmo critério de IndiceNomes.aproximado, nome a nome e sem o filtro de bigramas"""
+    max_erros = 1 if len(termo) <= 5 else 2
+    encontrados = []
+    for i, nome in enumerate(NOMES, 1):
+        perto = len(termo) > max_erros and any(
+            0 < tamanho <= len(nome) and levenshtein(termo, nome[:tamanho]) <= max_erros
+            for tamanho in range(len(termo) - max_erros, len(termo) + max_erros + 1))
+        if termo in nome or perto:
+            encontrados.append(i)
+    return encontrados
+
+def termos_com_erros(quantidade, semente=6):
+    """Trechos iniciais dos nomes com até 3 inserções, remoções ou trocas de letra"""
+    sorteio = random.Random(semente)
+    for _ in range(quantidade):
+        nome = sorteio.choice(NOMES)
+        letras = list(nome[:sorteio.randint(1, len(nome))])
+        for _ in range(sorteio.randint(0, 3)):
+            k = sorteio.randrange(len(letras) + 1)
+            acao = sorteio.choice(('inserir', 'remover', 'trocar'))
+            if acao == 'inserir':
+                letras.insert(k, sorteio.choice(string.ascii_lowercase + '-'))
+            elif letras:
+                k = min(k, len(letras) - 1)
+                if acao == 'remover':
+                    letras.pop(k)
+                else:
+                    letras[k] = sorteio.choice(string.ascii_lowercase)
+        if letras:
+            yield ''.join(letras)
+
+def test_ids_em_ordem_de_pokedex(indice):
+    assert indice.ids == list(range(1, len(NOMES) + 1))
+    assert len(indice) == len(NOMES)
+    assert indice.contem('') == indice.ids
+
+@pytest.mark.parametrize('termo, esperado', [
+    ('saur', ids('bulbasaur', 'ivysaur', 'venusaur')),
+    ('CHAR', ids('charmander', 'charmeleon', 'charizard')),
+    ('chu', ids('pikachu', 'raichu', 'pichu')),
+    ('a', [i for i, nome in enumerate(NOMES, 1) if 'a' in nome]),
+    ('-', ids('mr-mime', 'nidoran-f', 'ho-oh', 'porygon-z')),
+    ('abra', ids('abra', 'kadabra')),
+    ('pikachu', ids('pikachu')),
+    ('pikachuu', []),
+    ('zz', []),
+])
+def test_contem(indice, termo, esperado):
+    assert indice.contem(termo) == esperado
+
+def test_contem_igual_a_varredura(indice):
+    termos = {nome[i:j] for nome in NOMES for i in range(len(nome)) for j in range(i + 1, len(nome) + 1)}
+    for termo in termos | set(termos_com_erros(500)):
+        assert indice.contem(termo) == [i for i, nome in enumerate(NOMES, 1) if termo in nome], termo
+
+@pytest.mark.parametrize('termo, esperado', [
+    ('char', ids('charmander', 'charmeleon', 'charizard')),
+    ('Mew', ids('mew', 'mewtwo')),
+    ('mewtwo', ids('mewtwo')),
+    ('saur', []),
+    ('zzz', []),
+    ('', list(range(1, len(NOMES) + 1))),
+])
+def test_prefixo(indice, termo, esperado):
+    assert indice.prefixo(termo) == esperado
+
+@pytest.mark.parametrize('termo, esperado', [
+    ('pikachv', ids('pikachu')),
+    ('charmandr', ids('charmander')),
+    ('blastoies', ids('blastoise')),
+    ('sqirtle', ids('squirtle')),
+    ('bulbsaur', ids('bulbasaur')),
+    ('pichu', ids('pichu')),
+    ('mwe', ids('mew', 'mewtwo')),
+])
+def test_aproximado_tolera_erros_de_digitacao(indice, termo, esperado):
+    assert indice.aproximado(termo) == esperado
+
+def test_aproximado_inclui_os_exatos(indice):
+    assert set(indice.contem('chu')) <= set(indice.aproximado('chu'))
+
+def test_termo_menor_que_o_ngrama(indice):
+    # Com um só erro permitido, "ml" está a uma edição de qualquer nome que comece com "m" ou "?l",
+    # mesmo sem nenhum bigrama em comum
+    assert indice.aproximado('ml') == ids('blastoise', 'mew', 'mewtwo', 'mr-mime', 'alakazam', 'muk')
+    # Uma letra só: o erro permitido apagaria o termo inteiro, então fica só o que contém
+    assert indice.aproximado('x') == indice.contem('x') == ids('onix', 'jynx', 'xatu')
+    for termo in ('ek', 'ho', 'xa', 'zu'):
+        assert len(termo) < TAMANHO_NGRAMA
+        assert indice.aproximado(termo) == aproximado_ingenuo(termo), termo
+
+def test_aproximado_igual_a_varredura(indice):
+    # O filtro por bigramas compartilhados só pode descartar quem está longe demais
+    for termo in termos_com_erros(3000):
+        assert indice.aproximado(termo) == aproximado_ingenuo(termo), termo
+
+def test_distancia_edicao_com_limite():
+    sorteio = random.Random(3)
+    for _ in range(2000):
+        a = ''.join(sorteio.choice('abc') for _ in range(sorteio.randint(0, 7)))
+        b = ''.join(sorteio.choice('abc') for _ in range(sorteio.randint(0, 7)))
+        limite = sorteio.randint(0, 3)
+        real, distancia = levenshtein(a, b), distancia_edicao(a, b, limite)
+        # Dentro do limite é exata; acima dele só importa que passe do limite
+        assert distancia == real if real <= limite else distancia > limite, (a, b, limite)
+
+def test_buscar_por_modo(indice):
+    assert indice.buscar('chu') == indice.contem('chu')
+    assert indice.buscar('pi', 'prefixo') == ids('pikachu', 'pichu')
+    assert indice.buscar('pikachv', 'aproximado') == ids('pikachu')
+    assert set(MODOS_BUSCA) == {'contem', 'prefixo', 'aproximado'}
+
+@pytest.mark.parametrize('nome, modo, esperado', [
+    ('pikachv', 'aproximado', [10]),
+    ('charmandr', 'aproximado', [4]),
+    ('chu', 'contem', [10, 11, 12]),
+    ('pi', 'prefixo', [10, 12]),
+    ('pikachv', 'contem', []),
+])
+def test_rota_com_modo_de_busca(cliente, usuario, catalogo, nome, modo, esperado):
+    resp = cliente.get(f"/pokemon?nome={nome}&modo={modo}", headers=usuario.headers)
+
+    assert resp.status_code == 200
+    assert [p['id'] for p in resp.get_json()] == esperado
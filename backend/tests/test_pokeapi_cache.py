@@ -0,0 +1,96 @@
+"""
+Cache das respostas da PokeAPI: LRU em memória limitado por itens e bytes, camada em disco e revalidação
+"""
+import json
+import sqlite3
+import time
+import pokeapi_cache
+import pokeapi_client
+from pokeapi_cache import CacheMemoria, CachePokeAPI, Entrada
+
+def test_lru_descarta_o_menos_usado_ao_passar_do_limite_de_bytes():
+    memoria = CacheMemoria(max_itens=100, max_bytes=250)
+    for chave in 'abc':
+        memoria.set(chave, Entrada(chave, time.time() + 60), tamanho=100)
+
+    assert memoria.get('a') is None
+    assert memoria.get('b') is not None and memoria.get('c') is not None
+    assert memoria.bytes == 200
+    assert memoria.evictions == 1
+
+def test_lru_mantem_item_maior_que_o_limite_ate_o_proximo():
+    memoria = CacheMemoria(max_itens=100, max_bytes=50)
+    memoria.set('grande', Entrada('x', time.time() + 60), tamanho=500)
+    assert memoria.get('grande') is not None
+
+    memoria.set('outro', Entrada('y', time.time() + 60), tamanho=10)
+    assert memoria.get('grande') is None
+    assert memoria.bytes == 10
+
+def test_regravar_a_mesma_chave_nao_soma_o_tamanho_duas_vezes():
+    memoria = CacheMemoria(max_itens=100, max_bytes=1000)
+    memoria.set('a', Entrada(1, time.time() + 60), tamanho=300)
+    memoria.set('a', Entrada(2, time.time() + 60), tamanho=400)
+    memoria.remover('a')
+    assert memoria.bytes == 0 and len(memoria) == 0
+
+def test_cache_limita_a_memoria_pelo_tamanho_do_json(tmp_path):
+    cache = CachePokeAPI(1000, str(tmp_path / 'cache.db'), max_bytes_memoria=1000)
+    dados = {'sprites': 'x' * 400}
+    for i in range(5):
+        cache.set(f"https://pokeapi.co/api/v2/pokemon/{i}", dados)
+
+    assert cache.memoria.bytes <= 1000
+    assert len(cache.memoria) == 1000 // len(json.dumps(dados))
+    # O que saiu da memória continua no disco
+    assert cache.get("https://pokeapi.co/api/v2/pokemon/0").dados == dados
+
+def test_remover_expirados_apaga_vencidos_e_mantem_revalidaveis_recentes(tmp_path):
+    cache = CachePokeAPI(100, str(tmp_path / 'cache.db'))
+    for chave, etag in (('sem-etag', None), ('com-etag', '"v1"'), ('com-etag-antiga', '"v1"'), ('valida', None)):
+        cache.set(f"https://pokeapi.co/api/v2/{chave}", {}, etag=etag)
+    conn = sqlite3.connect(cache.disco.caminho)
+    agora = time.time()
+    conn.execute("UPDATE cache SET expira_em = ? WHERE chave LIKE '%/sem-etag' OR chave LIKE '%/com-etag'",
+                 (agora - 10,))
+    conn.execute("UPDATE cache SET expira_em = ? WHERE chave LIKE '%/com-etag-antiga'",
+                 (agora - pokeapi_cache.POKEAPI_CACHE_RETENCAO - 10,))
+    conn.commit()
+
+    assert cache.remover_expirados() == 2
+    restantes = {linha[0].rsplit('/', 1)[-1] for linha in conn.execute("SELECT chave FROM cache")}
+    assert restantes == {'com-etag', 'valida'}
+    conn.close()
+
+def test_limpeza_roda_a_cada_n_gravacoes(tmp_path, monkeypatch):
+    monkeypatch.setattr(pokeapi_cache, 'POKEAPI_CACHE_LIMPEZA_A_CADA', 3)
+    cache = CachePokeAPI(100, str(tmp_path / 'cache.db'))
+    cache.set('https://pokeapi.co/api/v2/vencida', {})
+    conn = sqlite3.connect(cache.disco.caminho)
+    conn.execute("UPDATE cache SET expira_em = 0")
+    conn.commit()
+
+    cache.set('https://pokeapi.co/api/v2/a', {})
+    assert conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 2
+    cache.set('https://pokeapi.co/api/v2/b', {})
+    assert conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 2
+
+def test_buscar_json_usa_o_cache_e_revalida_com_etag(pokeapi_falsa):
+    url = f"{pokeapi_falsa.url}/pokemon/25"
+
+    def responder(handler):
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return 304, None, {}
+        return 200, {'id': 25}, {'ETag': '"v1"'}
+    pokeapi_falsa.rotas['/pokemon/25'] = responder
+
+    assert pokeapi_client.buscar_json(url) == {'id': 25}
+    assert pokeapi_client.buscar_json(url) == {'id': 25}
+    assert pokeapi_falsa.hits['/pokemon/25'] == 1
+
+    # Vencida: revalida com If-None-Match e o 304 renova a entrada
+    pokeapi_client.cache.memoria.get(url).expira_em = 0
+    pokeapi_client.cache.disco.renovar(url, 0)
+    assert pokeapi_client.buscar_json(url) == {'id': 25}
+    assert pokeapi_falsa.hits['/pokemon/25'] == 2
+    assert not pokeapi_client.cache.get(url).expirada()
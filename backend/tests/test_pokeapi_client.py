@@ -0,0 +1,126 @@
+"""
+Sessão compartilhada da PokeAPI: novas tentativas, timeouts e reuso de conexões (keep-alive)
+"""
+import threading
+import time
+import pytest
+import requests
+import pokeapi_client
+
+def test_repete_respostas_503_ate_conseguir(pokeapi_falsa):
+    pokeapi_falsa.rotas['/pokemon/1'] = [(503, None, {}), (503, None, {}), (200, {'id': 1}, {})]
+
+    resp = pokeapi_client.get(f"{pokeapi_falsa.url}/pokemon/1")
+
+    assert resp.status_code == 200
+    assert resp.json() == {'id': 1}
+    assert pokeapi_falsa.hits['/pokemon/1'] == 3
+
+def test_desiste_apos_o_limite_de_tentativas(pokeapi_falsa):
+    pokeapi_falsa.rotas['/pokemon/1'] = (503, None, {})
+
+    resp = pokeapi_client.get(f"{pokeapi_falsa.url}/pokemon/1")
+
+    assert resp.status_code == 503
+    assert pokeapi_falsa.hits['/pokemon/1'] == pokeapi_client.POKEAPI_RETRIES + 1
+
+def test_404_nao_e_repetido(pokeapi_falsa):
+    assert pokeapi_client.buscar_json(f"{pokeapi_falsa.url}/pokemon/9999") is None
+    assert pokeapi_falsa.hits['/pokemon/9999'] == 1
+
+def test_timeout_de_leitura_nao_e_repetido(pokeapi_falsa):
+    def lenta(handler):
+        time.sleep(0.5)
+        return 200, {'id': 1}, {}
+    pokeapi_falsa.rotas['/pokemon/1'] = lenta
+
+    # Com read=0 o urllib3 desiste na primeira leitura lenta (o requests a reporta como erro de conexão)
+    with pytest.raises(requests.RequestException):
+        pokeapi_client.get(f"{pokeapi_falsa.url}/pokemon/1", timeout=(1, 0.1))
+    assert pokeapi_falsa.hits['/pokemon/1'] == 1
+
+def test_requisicoes_seguidas_reusam_a_conexao(pokeapi_falsa):
+    for i in range(1, 6):
+        pokeapi_falsa.rotas[f"/pokemon/{i}"] = (200, {'id': i}, {})
+    antes = pokeapi_client.estatisticas()
+
+    for i in range(1, 6):
+        assert pokeapi_client.get(f"{pokeapi_falsa.url}/pokemon/{i}").status_code == 200
+
+    depois = pokeapi_client.estatisticas()
+    assert len(pokeapi_falsa.conexoes) == 1
+    assert depois['pool_misses'] - antes['pool_misses'] == 1
+    assert depois['pool_hits'] - antes['pool_hits'] == 4
+
+def test_buscar_varios_mantem_a_ordem_e_ignora_falhas(pokeapi_falsa):
+    pokeapi_falsa.rotas['/pokemon/1'] = (200, {'id': 1}, {})
+    pokeapi_falsa.rotas['/pokemon/3'] = (200, {'id': 3}, {})
+
+    dados = pokeapi_client.buscar_varios(f"{pokeapi_falsa.url}/pokemon/{i}" for i in (3, 2, 1))
+
+    assert [d['id'] for d in dados] == [3, 1]
+
+def test_buscar_varios_reusa_as_threads_do_processo(pokeapi_falsa, monkeypatch):
+    threads = []
+    buscar = pokeapi_client._buscar_json
+
+    def registrar(url, timeout, usar_cache):
+        threads.append(threading.get_ident())
+        return buscar(url, timeout, usar_cache)
+    monkeypatch.setattr(pokeapi_client, '_buscar_json', registrar)
+    pokeapi_falsa.rotas.update({f"/pokemon/{i}": (200, {'id': i}, {}) for i in range(1, 31)})
+
+    for inicio in (1, 11, 21):
+        urls = [f"{pokeapi_falsa.url}/pokemon/{i}" for i in range(inicio, inicio + 10)]
+        assert len(pokeapi_client.buscar_varios(urls, usar_cache=False)) == 10
+
+    assert len(set(threads)) <= pokeapi_client.POKEAPI_MAX_CONCORRENCIA
+    assert pokeapi_client._executor() is pokeapi_client._executor()
+
+def test_buscar_varios_respeita_o_limite_da_chamada(pokeapi_falsa):
+    em_andamento = []
+    maximo = []
+
+    def lenta(handler):
+        with pokeapi_falsa.lock:
+            em_andamento.append(1)
+            maximo.append(len(em_andamento))
+        time.sleep(0.05)
+        with pokeapi_falsa.lock:
+            em_andamento.pop()
+        return 200, {'id': 1}, {}
+    for i in range(8):
+        pokeapi_falsa.rotas[f"/pokemon/{i}"] = lenta
+
+    urls = [f"{pokeapi_falsa.url}/pokemon/{i}" for i in range(8)]
+    assert len(pokeapi_client.buscar_varios(urls, max_concorrencia=2, usar_cache=False)) == 8
+    assert max(maximo) <= 2
+
+def test_pool_nao_descarta_conexoes_sob_concorrencia(pokeapi_falsa):
+    def lenta(handler):
+        time.sleep(0.02)
+        return 200, {'id': 1}, {}
+    pokeapi_falsa.rotas['/pokemon/1'] = lenta
+    antes = pokeapi_client.estatisticas()
+
+    # Mais threads que conexões no pool: as excedentes esperam uma conexão livre
+    def buscar():
+        for _ in range(5):
+            assert pokeapi_client.get(f"{pokeapi_falsa.url}/pokemon/1").status_code == 200
+    threads = [threading.Thread(target=buscar) for _ in range(pokeapi_client.POKEAPI_POOL_SIZE * 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    depois = pokeapi_client.estatisticas()
+    assert depois['pool_misses'] - antes['pool_misses'] <= pokeapi_client.POKEAPI_POOL_SIZE
+    assert len(pokeapi_falsa.conexoes) <= pokeapi_client.POKEAPI_POOL_SIZE
+
+def test_erro_apos_as_tentativas_nao_vira_inexistente(pokeapi_falsa):
+    pokeapi_falsa.rotas['/pokemon/1'] = (503, None, {})
+
+    for usar_cache in (True, False):
+        with pytest.raises(requests.HTTPError):
+            pokeapi_client.buscar_json(f"{pokeapi_falsa.url}/pokemon/1", usar_cache=usar_cache)
+    assert pokeapi_client.buscar_json(f"{pokeapi_falsa.url}/pokemon/9999", usar_cache=False) is None
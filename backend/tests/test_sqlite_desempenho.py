@@ -0,0 +1,83 @@
+"""
+Modo de desempenho do SQLite: PRAGMAs aplicados a cada conexão do pool e carga concorrente sem "database is locked"
+"""
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+import db_config
+from db_config import configurar_sqlite
+
+@pytest.fixture
+def engine_desempenho(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_config, 'SQLITE_PERFORMANCE', True)
+    engine = create_engine(f"sqlite:///{tmp_path / 'carga.db'}")
+    configurar_sqlite(engine)
+    yield engine
+    engine.dispose()
+
+def test_pragmas_aplicados_em_cada_conexao(engine_desempenho):
+    with engine_desempenho.connect() as a, engine_desempenho.connect() as b:
+        for conn in (a, b):
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == db_config.SQLITE_BUSY_TIMEOUT
+
+def test_sem_modo_de_desempenho_nada_muda(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'padrao.db'}")
+    configurar_sqlite(engine)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'delete'
+    engine.dispose()
+
+def test_escrita_nao_espera_leitura_em_andamento(engine_desempenho):
+    with engine_desempenho.begin() as conn:
+        conn.exec_driver_sql('CREATE TABLE item (id INTEGER PRIMARY KEY, valor TEXT)')
+        conn.exec_driver_sql("INSERT INTO item (valor) VALUES ('a')")
+
+    with engine_desempenho.connect() as leitor:
+        leitor.exec_driver_sql('BEGIN')
+        assert leitor.exec_driver_sql('SELECT COUNT(*) FROM item').scalar() == 1
+        # Sem WAL o commit esperaria o leitor terminar (até o busy_timeout); com WAL segue na hora
+        with engine_desempenho.begin() as escritor:
+            escritor.exec_driver_sql("INSERT INTO item (valor) VALUES ('b')")
+        # O leitor continua vendo o snapshot do início da sua transação
+        assert leitor.exec_driver_sql('SELECT COUNT(*) FROM item').scalar() == 1
+        leitor.exec_driver_sql('COMMIT')
+        assert leitor.exec_driver_sql('SELECT COUNT(*) FROM item').scalar() == 2
+
+def test_carga_concorrente_de_leituras_e_escritas(engine_desempenho):
+    with engine_desempenho.begin() as conn:
+        conn.exec_driver_sql('CREATE TABLE item (id INTEGER PRIMARY KEY, thread INTEGER, valor INTEGER)')
+
+    threads_escrita, threads_leitura, escritas_por_thread = 6, 6, 40
+    erros = []
+    largada = threading.Barrier(threads_escrita + threads_leitura)
+
+    def escrever(n):
+        largada.wait()
+        try:
+            for i in range(escritas_por_thread):
+                with engine_desempenho.begin() as conn:
+                    conn.execute(text('INSERT INTO item (thread, valor) VALUES (:t, :v)'), {'t': n, 'v': i})
+        except Exception as e:
+            erros.append(e)
+
+    def ler():
+        largada.wait()
+        try:
+            for _ in range(escritas_por_thread):
+                with engine_desempenho.connect() as conn:
+                    conn.exec_driver_sql('SELECT thread, COUNT(*) FROM item GROUP BY thread').all()
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=escrever, args=(n,)) for n in range(threads_escrita)]
+    threads += [threading.Thread(target=ler) for _ in range(threads_leitura)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert erros == []
+    with engine_desempenho.connect() as conn:
+        assert conn.exec_driver_sql('SELECT COUNT(*) FROM item').scalar() == threads_escrita * escritas_por_thread
@@ -0,0 +1,89 @@
+"""
+Streaming das listagens grandes (/usuarios e /pokemon): mesmo conteúdo da resposta comum, em array JSON ou NDJSON
+"""
+import json
+import pytest
+import streaming
+from conftest import criar_usuario
+from paginacao import codificar_cursor
+
+def ler(cliente, url, headers):
+    resp = cliente.get(url, headers=headers)
+    try:
+        return resp.status_code, resp.headers, resp.get_data()
+    finally:
+        resp.close()
+
+def linhas_ndjson(corpo):
+    assert corpo.endswith(b'\n')
+    return [json.loads(linha) for linha in corpo.splitlines()]
+
+@pytest.fixture
+def admin(app):
+    admin = criar_usuario(app, login='oak', role='admin')
+    for i in range(7):
+        criar_usuario(app, login=f"treinador{i}")
+    return admin
+
+@pytest.fixture
+def blocos_pequenos(monkeypatch):
+    # Força vários blocos mesmo com poucas linhas
+    monkeypatch.setattr(streaming, 'LINHAS_POR_BLOCO', 3)
+
+def test_usuarios_em_json_igual_a_listagem(cliente, admin, blocos_pequenos):
+    _, _, comum = ler(cliente, '/usuarios?limit=500', admin.headers)
+    status, headers, corpo = ler(cliente, '/usuarios?stream=json', admin.headers)
+
+    assert status == 200
+    assert headers['Content-Type'] == 'application/json'
+    assert 'Accept' in headers['Vary']
+    assert json.loads(corpo) == json.loads(comum)
+    assert len(json.loads(corpo)) == 8
+
+def test_usuarios_em_ndjson_pelo_accept(cliente, admin, blocos_pequenos):
+    _, _, comum = ler(cliente, '/usuarios?limit=500', admin.headers)
+    status, headers, corpo = ler(cliente, '/usuarios', {**admin.headers, 'Accept': 'application/x-ndjson'})
+
+    assert status == 200
+    assert headers['Content-Type'] == streaming.MIMETYPE_NDJSON
+    assert linhas_ndjson(corpo) == json.loads(comum)
+
+def test_stream_continua_do_cursor(cliente, admin):
+    resp = cliente.get('/usuarios?limit=3', headers=admin.headers)
+    _, _, corpo = ler(cliente, f"/usuarios?stream=ndjson&cursor={resp.headers['X-Next-Cursor']}", admin.headers)
+
+    assert [u['login'] for u in linhas_ndjson(corpo)] == [f"treinador{i}" for i in range(2, 7)]
+
+def test_stream_vazio_e_json_valido(cliente, admin):
+    # Depois do último usuário não há linhas
+    _, _, corpo = ler(cliente, f"/usuarios?stream=json&cursor={codificar_cursor(id=10 ** 6)}", admin.headers)
+    assert json.loads(corpo) == []
+
+def test_formato_invalido(cliente, admin, usuario, catalogo):
+    assert ler(cliente, '/usuarios?stream=xml', admin.headers)[0] == 400
+    assert ler(cliente, '/pokemon?stream=xml', usuario.headers)[0] == 400
+
+def test_usuarios_em_stream_so_para_administradores(cliente, usuario):
+    assert ler(cliente, '/usuarios?stream=json', usuario.headers)[0] == 403
+
+def test_pokemon_em_stream_igual_as_paginas(cliente, usuario, catalogo, blocos_pequenos):
+    cliente.post('/user-pokemon/favoritos', headers=usuario.headers, json={
+        'codigo': 'pikachu', 'nome': 'Pikachu', 'imagem': 'https://img.pokedex/10.png'
+    })
+    _, _, comum = ler(cliente, '/pokemon?geracao=1&limit=100', usuario.headers)
+    status, headers, corpo = ler(cliente, '/pokemon?geracao=1&stream=json', usuario.headers)
+    _, _, ndjson = ler(cliente, '/pokemon?geracao=1&stream=ndjson', usuario.headers)
+
+    assert status == 200
+    assert 'Accept' in headers['Vary']
+    assert json.loads(corpo) == json.loads(comum) == linhas_ndjson(ndjson)
+    assert len(json.loads(corpo)) == 11
+    assert [p['nome'] for p in json.loads(corpo) if p['favorito']] == ['pikachu']
+
+def test_etag_depende_do_formato(cliente, usuario, catalogo):
+    etags = {ler(cliente, url, usuario.headers)[1]['ETag']
+             for url in ('/pokemon', '/pokemon?stream=json', '/pokemon?stream=ndjson')}
+    assert len(etags) == 3
+
+def test_pokemon_em_stream_exige_catalogo(cliente, usuario):
+    assert ler(cliente, '/pokemon?stream=json', usuario.headers)[0] == 400
@@ -0,0 +1,150 @@
+"""
+Sincronização do catálogo local (sync_catalog) a partir de um dump e da PokeAPI
+"""
+import json
+import os
+import tarfile
+import pytest
+import requests
+import catalog
+import pokeapi_client
+from models import db, PokemonCatalogo, TipoCatalogo, CatalogoVersao
+from sync_catalog import FonteDiretorio, FontePokeAPI, FonteTarball, abrir_fonte, sincronizar_catalogo
+from conftest import POKEMONS_DUMP, RELACOES_DUMP, escrever_dump
+
+def test_sincroniza_pokemons_tipos_e_geracoes(app, catalogo):
+    with app.app_context():
+        assert db.session.query(PokemonCatalogo).count() == len(POKEMONS_DUMP)
+        assert db.session.query(TipoCatalogo).count() == len(RELACOES_DUMP)
+        pichu = db.session.get(PokemonCatalogo, 12)
+        assert (pichu.Nome, pichu.Tipos, pichu.Geracao) == ('pichu', 'electric', 2)
+        assert db.session.get(PokemonCatalogo, 1).Tipos == 'grass,poison'
+
+def test_nova_sincronizacao_sem_mudancas_nao_publica_versao(app, catalogo, tmp_path):
+    with app.app_context():
+        versoes = db.session.query(CatalogoVersao).count()
+        assert sincronizar_catalogo(FonteDiretorio(catalogo), catalogo,
+                                    caminho_checkpoint=str(tmp_path / 'checkpoint'))
+        assert db.session.query(CatalogoVersao).count() == versoes
+
+def test_fonte_pokeapi_busca_sem_passar_pelo_cache(pokeapi_falsa):
+    pokeapi_falsa.rotas['/pokemon'] = (200, {'results': [
+        {'name': 'bulbasaur', 'url': f"{pokeapi_falsa.url}/pokemon/1/"},
+    ]}, {})
+    pokeapi_falsa.rotas['/pokemon/1'] = (200, {'id': 1, 'name': 'bulbasaur'}, {})
+    fonte = FontePokeAPI(pokeapi_falsa.url)
+
+    for _ in range(2):
+        assert fonte.listar_ids('pokemon') == [1]
+        assert fonte.buscar_varios('pokemon', [1]) == [{'id': 1, 'name': 'bulbasaur'}]
+
+    assert pokeapi_falsa.hits['/pokemon'] == 2
+    assert pokeapi_falsa.hits['/pokemon/1'] == 2
+    assert pokeapi_client.cache.get(f"{pokeapi_falsa.url}/pokemon/1") is None
+
+class FonteInterrompida:
+    """Repassa para `fonte` e cai (erro de rede) depois de `lotes` lotes de Pokémon"""
+
+    def __init__(self, fonte, lotes):
+        self.fonte = fonte
+        self.lotes = lotes
+        self.buscados = []
+
+    def listar_ids(self, recurso):
+        return self.fonte.listar_ids(recurso)
+
+    def buscar_varios(self, recurso, ids):
+        if recurso == 'pokemon':
+            if self.lotes == 0:
+                raise requests.ConnectionError('conexão perdida')
+            self.lotes -= 1
+            self.buscados.extend(ids)
+        return self.fonte.buscar_varios(recurso, ids)
+
+def alterar_sprite(raiz, pokemon_id, sprite):
+    caminho = os.path.join(raiz, 'api', 'v2', 'pokemon', str(pokemon_id), 'index.json')
+    with open(caminho, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+    dados['sprites']['front_default'] = sprite
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo)
+
+def imagem_listada(cliente, usuario, pokemon_id):
+    catalog._versao_lida_em = None
+    return cliente.get(f"/pokemon?id={pokemon_id}", headers=usuario.headers).get_json()[0]['imagem']
+
+def test_retomada_publica_mudancas_de_execucao_interrompida(app, cliente, usuario, catalogo, tmp_path):
+    checkpoint = str(tmp_path / 'retomada')
+    alterar_sprite(catalogo, 1, 'https://img.pokedex/1-novo.png')
+
+    with app.app_context():
+        interrompida = FonteInterrompida(FonteDiretorio(catalogo), lotes=1)
+        with pytest.raises(requests.ConnectionError):
+            sincronizar_catalogo(interrompida, catalogo, tamanho_lote=5, caminho_checkpoint=checkpoint)
+        db.session.rollback()
+        # A mudança já está no banco, mas ainda não foi publicada
+        assert db.session.get(PokemonCatalogo, 1).ImagemUrl == 'https://img.pokedex/1-novo.png'
+        assert db.session.query(CatalogoVersao).count() == 1
+
+        retomada = FonteInterrompida(FonteDiretorio(catalogo), lotes=100)
+        assert sincronizar_catalogo(retomada, catalogo, tamanho_lote=5, caminho_checkpoint=checkpoint)
+        # Só os Pokémon que faltavam foram buscados, e nenhum deles mudou
+        assert retomada.buscados == list(range(6, len(POKEMONS_DUMP) + 1))
+        assert db.session.query(CatalogoVersao).count() == 2
+
+    assert not os.path.exists(checkpoint)
+    assert imagem_listada(cliente, usuario, 1) == 'https://img.pokedex/1-novo.png'
+
+def test_checkpoint_de_outra_fonte_e_ignorado(app, catalogo, tmp_path):
+    checkpoint = str(tmp_path / 'outra')
+    with app.app_context():
+        with pytest.raises(requests.ConnectionError):
+            sincronizar_catalogo(FonteInterrompida(FonteDiretorio(catalogo), lotes=1), 'outra-origem',
+                                 tamanho_lote=5, caminho_checkpoint=checkpoint)
+        db.session.rollback()
+        completa = FonteInterrompida(FonteDiretorio(catalogo), lotes=100)
+        assert sincronizar_catalogo(completa, catalogo, tamanho_lote=5, caminho_checkpoint=checkpoint)
+    assert len(completa.buscados) == len(POKEMONS_DUMP)
+
+@pytest.fixture
+def tarball(tmp_path):
+    raiz = escrever_dump(str(tmp_path / 'api-data'))
+    caminho = str(tmp_path / 'api-data.tar.gz')
+    with tarfile.open(caminho, 'w:gz') as tar:
+        tar.add(raiz, arcname='api-data/data')
+    return caminho
+
+def test_sincroniza_a_partir_de_tarball(app, cliente, usuario, tarball, tmp_path):
+    fonte = abrir_fonte(tarball)
+    assert isinstance(fonte, FonteTarball)
+    assert fonte.listar_ids('pokemon') == list(range(1, len(POKEMONS_DUMP) + 1))
+
+    with app.app_context():
+        assert sincronizar_catalogo(fonte, tarball, tamanho_lote=5, caminho_checkpoint=str(tmp_path / 'cp'))
+        assert db.session.query(PokemonCatalogo).count() == len(POKEMONS_DUMP)
+        assert db.session.query(TipoCatalogo).count() == len(RELACOES_DUMP)
+        assert db.session.get(PokemonCatalogo, 6).Tipos == 'fire,flying'
+    assert imagem_listada(cliente, usuario, 12) == 'https://img.pokedex/12.png'
+
+def test_tarball_interrompido_retoma_do_checkpoint(app, tarball, tmp_path):
+    checkpoint = str(tmp_path / 'cp')
+    with app.app_context():
+        with pytest.raises(requests.ConnectionError):
+            sincronizar_catalogo(FonteInterrompida(FonteTarball(tarball), lotes=2), tarball,
+                                 tamanho_lote=5, caminho_checkpoint=checkpoint)
+        db.session.rollback()
+        assert db.session.query(PokemonCatalogo).count() == 10
+        assert db.session.query(CatalogoVersao).count() == 0
+
+        retomada = FonteInterrompida(FonteTarball(tarball), lotes=100)
+        assert sincronizar_catalogo(retomada, tarball, tamanho_lote=5, caminho_checkpoint=checkpoint)
+        assert retomada.buscados == [11, 12]
+        assert db.session.query(PokemonCatalogo).count() == len(POKEMONS_DUMP)
+        assert db.session.query(CatalogoVersao).count() == 1
+
+def test_tarball_sem_dump_e_rejeitado(tmp_path):
+    caminho = str(tmp_path / 'vazio.tar')
+    with tarfile.open(caminho, 'w'):
+        pass
+    with pytest.raises(FileNotFoundError):
+        FonteTarball(caminho)
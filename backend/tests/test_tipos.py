@@ -0,0 +1,92 @@
+"""
+Tipo dos pokémons do usuário: resolvido pelo catálogo na escrita e fila de preenchimento em segundo plano
+"""
+import threading
+import time
+import pytest
+import requests
+import tipos
+from catalog import tipo_principal
+from models import db, PokemonUsuario, TipoPokemon
+from tipos import _FilaAgendada
+
+def test_fila_entrega_primeiro_o_que_ja_venceu():
+    fila = _FilaAgendada()
+    inicio = time.monotonic()
+    fila.put('nova tentativa', atraso=0.3)
+    fila.put('novo')
+
+    assert fila.get() == 'novo'
+    assert time.monotonic() - inicio < 0.1
+    assert fila.get() == 'nova tentativa'
+    assert time.monotonic() - inicio >= 0.3
+
+def test_item_novo_nao_espera_uma_tentativa_agendada():
+    fila = _FilaAgendada()
+    fila.put('nova tentativa', atraso=5)
+    threading.Timer(0.1, fila.put, args=('novo',)).start()
+
+    inicio = time.monotonic()
+    assert fila.get() == 'novo'
+    assert time.monotonic() - inicio < 1
+
+def test_favorito_recebe_o_tipo_do_catalogo_sem_consultar_a_pokeapi(app, cliente, usuario, catalogo):
+    resp = cliente.post('/user-pokemon/favoritos', headers=usuario.headers, json={
+        'codigo': 'charizard', 'nome': 'Charizard', 'imagem': 'https://img.pokedex/6.png'
+    })
+
+    assert resp.status_code == 201
+    with app.app_context():
+        poke = PokemonUsuario.query.filter_by(IDUsuario=usuario.id, Codigo='charizard').one()
+        assert db.session.get(TipoPokemon, poke.IDTipoPokemon).Descricao == 'Fire'
+
+def test_tipo_principal_por_nome_ou_numero(app, catalogo):
+    with app.app_context():
+        assert tipo_principal('Pikachu') == 'electric'
+        assert tipo_principal('6') == 'fire'
+        # Dígitos Unicode não são números de Pokédex
+        assert tipo_principal('²') is None
+
+@pytest.fixture
+def pendente(app, usuario, pokeapi_falsa, monkeypatch):
+    """Pokémon fora do catálogo com o tipo pendente; a PokeAPI é o servidor falso"""
+    monkeypatch.setattr(tipos, 'POKEAPI_URL', f"{pokeapi_falsa.url}/pokemon")
+    with app.app_context():
+        db.session.add(PokemonUsuario(IDUsuario=usuario.id, Codigo='mew', Nome='Mew', ImagemUrl='https://img/151.png',
+                                      Favorito=True, GrupoBatalha=False))
+        db.session.commit()
+    return pokeapi_falsa
+
+def tipo_de(app, codigo):
+    with app.app_context():
+        poke = PokemonUsuario.query.filter_by(Codigo=codigo).one()
+        return db.session.get(TipoPokemon, poke.IDTipoPokemon).Descricao if poke.IDTipoPokemon else None
+
+def test_pokeapi_indisponivel_nao_grava_normal(app, pendente):
+    pendente.rotas['/pokemon/mew'] = (503, None, {})
+
+    with app.app_context():
+        with pytest.raises(requests.RequestException):
+            tipos._preencher('mew')
+        db.session.rollback()
+
+    assert tipo_de(app, 'mew') is None
+
+def test_pokemon_inexistente_vira_normal(app, pendente):
+    with app.app_context():
+        tipos._preencher('mew')
+
+    assert tipo_de(app, 'mew') == 'Normal'
+
+def test_worker_retoma_pendentes_ao_iniciar(app, pendente, monkeypatch):
+    pendente.rotas['/pokemon/mew'] = (200, {'types': [{'slot': 1, 'type': {'name': 'psychic'}}]}, {})
+    # Processo novo: nenhuma thread de preenchimento ainda
+    monkeypatch.setattr(tipos, '_worker_pid', None)
+    monkeypatch.setattr(tipos, '_fila', tipos._FilaAgendada())
+
+    tipos.iniciar_preenchimento(app)
+
+    prazo = time.monotonic() + 5
+    while tipo_de(app, 'mew') is None and time.monotonic() < prazo:
+        time.sleep(0.05)
+    assert tipo_de(app, 'mew') == 'Psychic'
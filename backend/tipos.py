@@ -0,0 +1,159 @@
+"""
+Tipos de Pokémon dos registros do usuário: resolução local e preenchimento em segundo plano
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+import requests
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, PokemonUsuario, TipoPokemon
+from catalog import tipo_principal
+from http_cache import incrementar_revisao
+import pokeapi_client
+
+POKEAPI_URL = 'https://pokeapi.co/api/v2/pokemon'
+
+MAX_TENTATIVAS = 5
+
+# Descricao -> IDTipoPokemon; são só ~18 tipos e eles nunca são apagados
+_tipos = {}
+_tipos_lock = threading.Lock()
+
+class _FilaAgendada:
+    """Fila em que cada item só sai a partir do horário agendado (heap por horário).
+
+    Novas tentativas esperam na fila, não na thread que a consome, então os
+    outros pokémons continuam sendo preenchidos enquanto isso.
+    """
+
+    def __init__(self):
+        self._itens = []
+        self._sequencia = itertools.count()  # desempate: mesma hora sai na ordem de chegada
+        self._cond = threading.Condition()
+
+    def put(self, item, atraso=0):
+        with self._cond:
+            heapq.heappush(self._itens, (time.monotonic() + atraso, next(self._sequencia), item))
+            self._cond.notify()
+
+    def get(self):
+        with self._cond:
+            while True:
+                if not self._itens:
+                    self._cond.wait()
+                    continue
+                espera = self._itens[0][0] - time.monotonic()
+                if espera <= 0:
+                    return heapq.heappop(self._itens)[2]
+                self._cond.wait(espera)
+
+_fila = _FilaAgendada()
+_worker_lock = threading.Lock()
+_worker_pid = None
+
+def carregar_tipos(conn=None):
+    """(Re)carrega o cache de tipos a partir do banco"""
+    consulta = db.select(TipoPokemon.Descricao, TipoPokemon.IDTipoPokemon)
+    linhas = (conn or db.session).execute(consulta).all()
+    with _tipos_lock:
+        _tipos.clear()
+        _tipos.update(linhas)
+
+def _inserir_se_nao_existir(conn, descricao):
+    """INSERT que não falha se outro processo criou o tipo ao mesmo tempo (UNIQUE em Descricao)"""
+    dialeto = conn.dialect.name
+    if dialeto == 'sqlite':
+        stmt = sqlite_insert(TipoPokemon).on_conflict_do_nothing(index_elements=['Descricao'])
+    elif dialeto == 'postgresql':
+        stmt = pg_insert(TipoPokemon).on_conflict_do_nothing(index_elements=['Descricao'])
+    else:
+        stmt = insert(TipoPokemon).prefix_with('IGNORE')
+    conn.execute(stmt.values(Descricao=descricao))
+
+def get_ou_cria_tipo(tipo_nome):
+    """Id de um tipo de pokémon, criando-o se ainda não existir"""
+    descricao = tipo_nome.capitalize()
+    if not _tipos:
+        carregar_tipos()
+    tipo_id = _tipos.get(descricao)
+    if tipo_id is None:
+        # Transação própria: o tipo fica gravado mesmo se a requisição que o pediu falhar
+        with db.engine.begin() as conn:
+            _inserir_se_nao_existir(conn, descricao)
+            carregar_tipos(conn)
+        tipo_id = _tipos[descricao]
+    return tipo_id
+
+def tipo_local(codigo):
+    """IDTipoPokemon do tipo principal segundo o catálogo local, ou None se o catálogo não souber"""
+    tipo_nome = tipo_principal(codigo)
+    return get_ou_cria_tipo(tipo_nome) if tipo_nome else None
+
+def buscar_tipo_pokemon(codigo):
+    """Busca na PokeAPI o nome do tipo principal do pokémon.
+
+    Só um pokémon inexistente (404) ou sem tipo vira 'normal'; falhas de rede e
+    respostas 429/5xx são propagadas para que o preenchimento tente de novo mais tarde.
+    """
+    data = pokeapi_client.buscar_json(f"{POKEAPI_URL}/{codigo}")
+    if data is not None and data['types']:
+        return data['types'][0]['type']['name']
+    return 'normal'
+
+def agendar_preenchimento(codigo):
+    """Coloca o pokémon na fila para ter o tipo preenchido em segundo plano"""
+    iniciar_preenchimento(current_app._get_current_object())
+    _fila.put((codigo, 1))
+
+def iniciar_preenchimento(app):
+    """Inicia a thread de preenchimento deste processo, se ainda não existir.
+
+    Ao iniciar ela retoma os registros que ficaram sem tipo em execuções
+    anteriores, então deve ser chamada quando o processo sobe (post_fork do
+    gunicorn) e não só quando um novo pokémon é agendado.
+    """
+    # A thread não sobrevive a um fork: cada processo inicia a sua
+    global _worker_pid
+    with _worker_lock:
+        if _worker_pid != os.getpid():
+            _worker_pid = os.getpid()
+            threading.Thread(target=_executar, args=(app,), name='preenchimento-tipos', daemon=True).start()
+
+def _executar(app):
+    with app.app_context():
+        # Retoma registros que ficaram pendentes de execuções anteriores
+        pendentes = db.session.query(PokemonUsuario.Codigo).filter(PokemonUsuario.IDTipoPokemon.is_(None)) \
+            .distinct().all()
+        for (codigo,) in pendentes:
+            _fila.put((codigo, 1))
+        db.session.remove()
+
+        while True:
+            codigo, tentativa = _fila.get()
+            try:
+                _preencher(codigo)
+            except requests.RequestException:
+                if tentativa < MAX_TENTATIVAS:
+                    _fila.put((codigo, tentativa + 1), atraso=min(2 ** tentativa, 60))
+                else:
+                    print(f"AVISO: Tipo de '{codigo}' continua pendente após {MAX_TENTATIVAS} tentativas")
+            except Exception as e:
+                db.session.rollback()
+                print(f"ERRO ao preencher o tipo de '{codigo}': {e}")
+            finally:
+                db.session.remove()
+
+def _preencher(codigo):
+    tipo_id = tipo_local(codigo) or get_ou_cria_tipo(buscar_tipo_pokemon(codigo))
+    pendentes = PokemonUsuario.query.filter(
+        PokemonUsuario.Codigo == codigo, PokemonUsuario.IDTipoPokemon.is_(None)
+    )
+    # O tipo aparece nas listagens: os usuários afetados ganham uma nova revisão (ETag)
+    incrementar_revisao(*{user_id for (user_id,) in pendentes.with_entities(PokemonUsuario.IDUsuario)})
+    pendentes.update({PokemonUsuario.IDTipoPokemon: tipo_id}, synchronize_session=False)
+    db.session.commit()
@@ -24,6 +24,8 @@ export class GestaoUsuariosComponent implements OnInit {
   usuarios: User[] = [];
   currentUser: any = null;
   isLoading = false;
+  isLoadingMore = false;
+  proximoCursor: string | null = null;
   errorMessage = '';
 
   constructor(
@@ -42,8 +44,9 @@ export class GestaoUsuariosComponent implements OnInit {
     this.errorMessage = '';
 
     this.userService.getUsuarios().subscribe({
-      next: (data) => {
-        this.usuarios = data;
+      next: (pagina) => {
+        this.usuarios = pagina.usuarios;
+        this.proximoCursor = pagina.proximo;
         this.isLoading = false;
       },
       error: (error) => {
@@ -54,6 +57,26 @@ export class GestaoUsuariosComponent implements OnInit {
     });
   }
 
+  carregarMais(): void {
+    if (!this.proximoCursor) {
+      return;
+    }
+    this.isLoadingMore = true;
+
+    this.userService.getUsuarios(this.proximoCursor).subscribe({
+      next: (pagina) => {
+        this.usuarios = [...this.usuarios, ...pagina.usuarios];
+        this.proximoCursor = pagina.proximo;
+        this.isLoadingMore = false;
+      },
+      error: (error) => {
+        console.error('Erro ao carregar usuários:', error);
+        this.errorMessage = 'Erro ao carregar usuários. Tente novamente.';
+        this.isLoadingMore = false;
+      }
+    });
+  }
+
   deletarUsuario(id: number, nome: string): void {
     if (id === this.currentUser?.id) {
       this.modalService.showError('Você não pode deletar seu próprio usuário.');
@@ -33,7 +33,7 @@ export class PokemonService {
   }
 
   getPokemonDetails(name: string): Observable<any> {
-    return this.http.get(`https://pokeapi.co/api/v2/pokemon/${name}`);
+    return this.http.get(`${this.apiUrl}/pokemon/${name}`, { headers: this.getHeaders() });
   }
 
   getFavoritos(): Observable<any> {
@@ -1,6 +1,7 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpHeaders } from '@angular/common/http';
+import { HttpClient, HttpHeaders, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
+import { map } from 'rxjs/operators';
 
 export interface User {
   id: number;
@@ -9,6 +10,11 @@ export interface User {
   email: string;
 }
 
+export interface PaginaUsuarios {
+  usuarios: User[];
+  proximo: string | null;  // cursor da próxima página; null na última
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -25,8 +31,17 @@ export class UserService {
     });
   }
 
-  getUsuarios(): Observable<User[]> {
-    return this.http.get<User[]>(this.apiUrl, { headers: this.getHeaders() });
+  getUsuarios(cursor?: string | null): Observable<PaginaUsuarios> {
+    let params = new HttpParams();
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    return this.http.get<User[]>(this.apiUrl, { headers: this.getHeaders(), params, observe: 'response' }).pipe(
+      map(response => ({
+        usuarios: response.body ?? [],
+        proximo: response.headers.get('X-Next-Cursor')
+      }))
+    );
   }
 
   getUsuarioById(id: number): Observable<User> {